@@ -1,11 +1,12 @@
 import tkinter as tk
 from tkinter import ttk
-from datetime import datetime
+from watering_adherence import WateringAdherence
 
 class AchievementsManager:
-    def __init__(self, app):
+    def __init__(self, app, species_db):
         self.app = app
         self.data_manager = app.data_manager
+        self.adherence = WateringAdherence(self.data_manager, species_db)
 
     def show_achievements(self):
         """Display achievements"""
@@ -37,7 +38,9 @@ class AchievementsManager:
                   foreground="green" if achievements["repotting_master"]["completed"] else "black").pack(pady=2)
 
         ttk.Label(frame, text="Рост мастер: 5 измерений роста для одного кактуса").pack(pady=2)
-        growth_status = "Достигнуто" if achievements["growth_master"]["completed"] else "Прогресс: см. профиль кактуса"
+        best_growths = max(achievements["growth_master"]["growths"].values(), default=0)
+        growth_status = "Достигнуто" if achievements["growth_master"]["completed"] else \
+                        f"Прогресс: {best_growths}/5 измерений"
         ttk.Label(frame, text=growth_status,
                   foreground="green" if achievements["growth_master"]["completed"] else "black").pack(pady=2)
 
@@ -45,19 +48,20 @@ class AchievementsManager:
         """Check and update achievements"""
         achievements = self.data_manager.data["achievements"]
 
-        # Stable watering achievement
-        all_watered_on_time = True
-        for cactus_data in self.data_manager.data["cactuses"].values():
-            if cactus_data["watering"]:
-                last_watering = datetime.strptime(cactus_data["watering"][-1]["date"], "%Y-%m-%d %H:%M")
-                days_since = (datetime.now() - last_watering).days
-                if days_since > cactus_data["watering_frequency"] + 1:
-                    all_watered_on_time = False
-                    achievements["stable_watering"]["days"] = 0
-                    break
-        if all_watered_on_time and not achievements["stable_watering"]["completed"]:
-            achievements["stable_watering"]["days"] += 1
-            if achievements["stable_watering"]["days"] >= 30:
-                achievements["stable_watering"]["completed"] = True
+        # Stable watering achievement: the current run of days on which no plant was overdue,
+        # derived from the watering histories against their seasonal targets. This runs after
+        # every watering, so it stays on the hot window and never reads archived years.
+        _, collection = self.adherence.analyze(full=False)
+        achievements["stable_watering"]["days"] = collection["current_streak"]
+        if collection["longest_streak"] >= 30:
+            achievements["stable_watering"]["completed"] = True
 
+        self.data_manager.save_data()
+
+    def check_growth_master(self, cactus_name):
+        """Update growth measurement progress of a cactus from its rollup totals"""
+        growth_master = self.data_manager.data["achievements"]["growth_master"]
+        growth_master["growths"][cactus_name] = self.data_manager.rollups.totals(cactus_name)["growth"]
+        if growth_master["growths"][cactus_name] >= 5:
+            growth_master["completed"] = True
         self.data_manager.save_data()
\ No newline at end of file
@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs, unquote
+from data_manager import DataManager, EVENT_TYPES
+from species_database import SpeciesDatabase
+from utils import normalize_event_date
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BatchPersister:
+    """Coalesce saves requested by concurrent handlers into a single save_data call"""
+
+    def __init__(self, data_manager, delay=0.05):
+        self.data_manager = data_manager
+        self.delay = delay
+        self._pending = None
+        self._tasks = set()
+        self.saves = 0
+
+    async def commit(self):
+        """Wait until the current batch of changes is written to disk"""
+        if self._pending is None:
+            self._pending = asyncio.get_running_loop().create_future()
+            # The loop only keeps a weak reference to tasks; hold one until the flush is done
+            task = asyncio.create_task(self._flush())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        await asyncio.shield(self._pending)
+
+    async def _flush(self):
+        await asyncio.sleep(self.delay)
+        future, self._pending = self._pending, None
+        try:
+            self.data_manager.save_data()
+            self.saves += 1
+            future.set_result(None)
+        except Exception as e:
+            future.set_exception(e)
+
+
+class CactusApiServer:
+    """Headless JSON API over HTTP/1.1 (TCP or Unix socket) for a DataManager"""
+
+    STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+                   405: "Method Not Allowed", 500: "Internal Server Error"}
+
+    def __init__(self, data_manager, species_db=None, batch_delay=0.05):
+        self.data_manager = data_manager
+        self.species_db = species_db or SpeciesDatabase()
+        self.persister = BatchPersister(data_manager, batch_delay)
+        self.server = None
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        """Start listening on a TCP port or, if unix_path is given, on a Unix socket"""
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+
+    async def stop(self):
+        """Stop accepting connections and flush pending changes"""
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.persister._pending is not None:
+            await self.persister.commit()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        key, _, value = line.decode("latin-1").partition(":")
+                        headers[key.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    # The rest of the stream cannot be framed; answer and drop the connection
+                    await self.respond(writer, 400, {"error": "Malformed request"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                status, payload = await self.dispatch(method, target, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive=True):
+        """Write one JSON response"""
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    async def dispatch(self, method, target, body):
+        """Route a request and return (status, JSON payload)"""
+        url = urlsplit(target)
+        parts = [unquote(p) for p in url.path.strip("/").split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            payload = json.loads(body) if body else {}
+            if parts == ["cactuses"] and method == "GET":
+                return 200, self.list_cactuses()
+            if len(parts) == 3 and parts[0] == "cactuses" and parts[2] == "history" and method == "GET":
+                return 200, self.get_history(parts[1], query)
+            if parts == ["due"] and method == "GET":
+                return 200, self.get_due()
+            if parts == ["events"] and method == "POST":
+                record = self.add_events([payload])[0]
+                await self.persister.commit()
+                return 201, record
+            if parts == ["events", "bulk"] and method == "POST":
+                events = payload.get("events") if isinstance(payload, dict) else payload
+                if not isinstance(events, list):
+                    raise ApiError(400, "Expected a list of events")
+                records = self.add_events(events)
+                await self.persister.commit()
+                return 201, {"added": len(records)}
+            if parts and parts[0] in ("cactuses", "due", "events"):
+                raise ApiError(405, "Method not allowed")
+            raise ApiError(404, "Not found")
+        except ApiError as e:
+            return e.status, {"error": e.message}
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return 400, {"error": "Invalid JSON"}
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    def list_cactuses(self):
+        cactuses = self.data_manager.data["cactuses"]
+        return [{
+            "name": name,
+            "species": cactus_data.get("species", "Не указан"),
+            "watering_frequency": cactus_data["watering_frequency"],
+            "last_watering": cactus_data["watering"][-1]["date"] if cactus_data["watering"] else None
+        } for name, cactus_data in cactuses.items()]
+
+    def get_history(self, cactus_name, query):
+        cactus_data = self.data_manager.data["cactuses"].get(cactus_name)
+        if cactus_data is None:
+            raise ApiError(404, f"Unknown cactus: {cactus_name}")
+        types = [query["type"]] if "type" in query else EVENT_TYPES
+        history = {}
+        for event_type in types:
+            if event_type not in EVENT_TYPES:
+                raise ApiError(400, f"Unknown event type: {event_type}")
+            events = cactus_data[event_type]
+            history[event_type] = [e for e in events
+                                   if query.get("since", "") <= e["date"] <= query.get("until", "\uffff")]
+        return history
+
+    def get_due(self):
+        return [{"name": name, "days_overdue": overdue}
+                for name, overdue in self.data_manager.get_due_cactuses(self.species_db)]
+
+    def add_events(self, events):
+        """Validate all event payloads, then add them to the in-memory model without saving"""
+        parsed = [self.parse_event(event) for event in events]
+        return [self.data_manager.add_event(name, event_type, record, save=False)
+                for name, event_type, record in parsed]
+
+    def parse_event(self, event):
+        """Validate an event payload and return (cactus name, event type, record)"""
+        if not isinstance(event, dict):
+            raise ApiError(400, "Event must be an object")
+        cactus_name = event.get("cactus")
+        event_type = event.get("type", "watering")
+        if not isinstance(cactus_name, str):
+            raise ApiError(400, "Event requires a cactus name")
+        if cactus_name not in self.data_manager.data["cactuses"]:
+            raise ApiError(404, f"Unknown cactus: {cactus_name}")
+        if not isinstance(event_type, str) or event_type not in EVENT_TYPES:
+            raise ApiError(400, f"Unknown event type: {event_type}")
+        try:
+            record = {"date": normalize_event_date(event.get("date"))}
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if event_type == "growth":
+            try:
+                record["height"] = float(event["height"])
+            except (KeyError, TypeError, ValueError):
+                raise ApiError(400, "Growth event requires a numeric height")
+        elif event_type == "photos":
+            if not event.get("path"):
+                raise ApiError(400, "Photo event requires a path")
+            record["path"] = event["path"]
+        elif event_type == "fertilizers":
+            if not event.get("fertilizer_type") or not event.get("dosage"):
+                raise ApiError(400, "Fertilizer event requires fertilizer_type and dosage")
+            record["type"] = event["fertilizer_type"]
+            record["dosage"] = event["dosage"]
+        if event_type != "photos":
+            record["comment"] = event.get("comment", "")
+        return cactus_name, event_type, record
+
+
+async def serve(data_file, host, port, unix_path):
+    server = CactusApiServer(DataManager(data_file))
+    await server.start(host, port, unix_path)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local JSON API for the cactus collection")
+    parser.add_argument("--data", default="cactus_data.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Serve on a Unix socket instead of TCP")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.data, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
@@ -6,13 +6,14 @@ from visualization import VisualizationManager
 from health_diagnosis import HealthDiagnosis
 
 class CactusCareApp:
-    def __init__(self, root):
+    def __init__(self, root, compact=False):
         self.root = root
         self.root.title("Уход за кактусами")
         self.root.geometry("900x700")
 
         # Initialize managers in correct order
-        self.data_manager = DataManager("cactus_data.json")
+        # compact keeps event histories as columns, cutting memory use on large collections
+        self.data_manager = DataManager("cactus_data.json", compact=compact)
         self.visualization_manager = VisualizationManager(self)
         self.ui_manager = UIManager(self)
 
@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from compact_model import CompactEventList, json_default
+from indexed_store import loaded_items
+from storage import read_data, write_data
+from sync import merge_events
+from utils import event_date
+
+
+class HistoryArchive:
+    """Cold tier of the event histories: events older than a cutoff live in per-year files
+
+    data["archive"] holds the settings: hot_days, the cutoff "before", the archived years and
+    "last", the date of the newest archived event per cactus and event type. The hot data file
+    keeps only events from the cutoff on, so it stays bounded however long the history grows.
+    Archived years are read back into the in-memory histories only when something asks for
+    their range (graphs, exports, the timeline); from then on every query sees both tiers, and
+    saving writes each tier back to its own file.
+
+    A listed year whose file is missing is never treated as empty: it stays listed, so putting
+    the file back (backups copy the archive directory too) brings its events back.
+    """
+
+    DEFAULT_HOT_DAYS = 365
+    ROLL_DAYS = 30  # Move the cutoff forward at load once it is this far behind
+    FILE_FORMAT = "json-gz"
+
+    def __init__(self, data_manager, event_types):
+        self.data_manager = data_manager
+        self.event_types = event_types
+        self.loaded = {}  # Year -> fingerprint of its events when read or last written
+        self.missing = set()  # Listed years whose file was not found
+
+    @property
+    def settings(self):
+        return self.data_manager.data.get("archive")
+
+    @property
+    def active(self):
+        return bool(self.settings)
+
+    @property
+    def boundary(self):
+        """Date string before which events belong to the archive, or None"""
+        return self.settings["before"] if self.active else None
+
+    def directory(self, data_file=None):
+        """Archive directory of the data file, or of another data file such as a backup"""
+        root, _ = os.path.splitext(os.path.abspath(data_file or self.data_manager.data_file))
+        return f"{root}_archive"
+
+    def year_file(self, year):
+        return os.path.join(self.directory(), f"{year}.json.gz")
+
+    def reset(self):
+        """Forget loaded years after the hot data was (re)loaded"""
+        self.loaded = {}
+        self.missing = set()
+
+    def unloaded_years(self):
+        if not self.active:
+            return []
+        return [year for year in sorted(self.settings["years"]) if year not in self.loaded and year not in self.missing]
+
+    def last_archived(self, cactus_name, event_type):
+        """Date of the newest archived event of a history, without reading the archive, or None"""
+        if not self.active:
+            return None
+        return self.settings.get("last", {}).get(cactus_name, {}).get(event_type)
+
+    def _fingerprint(self, year_data):
+        text = json.dumps(year_data, sort_keys=True, ensure_ascii=False, default=json_default)
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _year_events(self, year):
+        """{cactus: {event type: records}} of one archived year as currently held in memory"""
+        start, end = f"{year:04d}", min(f"{year + 1:04d}", self.boundary)
+        year_data = {}
+        for name, cactus_data in loaded_items(self.data_manager.data["cactuses"]):
+            for event_type in self.event_types:
+                events = cactus_data.get(event_type)
+                if not events or events[0]["date"] >= end:
+                    continue
+                records = events[bisect_left(events, start, key=event_date):bisect_left(events, end, key=event_date)]
+                if records:
+                    year_data.setdefault(name, {})[event_type] = list(records)
+        return year_data
+
+    def _thaw(self, year):
+        """Merge one archived year into the in-memory histories"""
+        cactuses = self.data_manager.data["cactuses"]
+        if not os.path.exists(self.year_file(year)):
+            # Not "no events": the file may come back from a backup, so the year is kept listed
+            self.missing.add(year)
+            return
+        archived, _ = read_data(self.year_file(year), ())
+        # Fingerprint of the file, not of memory: events added to the year before it was
+        # read in must still make the next save rewrite it
+        fingerprint = self._fingerprint(archived.get("cactuses", {}))
+        for name, histories in archived.get("cactuses", {}).items():
+            if name not in cactuses:
+                continue
+            for event_type, records in histories.items():
+                events = cactuses[name].get(event_type)
+                if events is None:
+                    continue
+                # A union, so events saved to both tiers by an interrupted save are not doubled
+                merged = merge_events(name, event_type, events, records)
+                if merged is not None:
+                    if isinstance(events, CompactEventList):
+                        merged = CompactEventList(events.pool, merged)
+                    cactuses[name][event_type] = merged
+        self.loaded[year] = fingerprint
+        self.data_manager.rollups.invalidate()
+        self.data_manager.events.invalidate()
+        self.data_manager.sync.invalidate()
+
+    def ensure_loaded(self, since=None, until=None):
+        """Read the archived years overlapping [since, until) into memory; return True if any were read"""
+        years = [year for year in self.unloaded_years()
+                 if (since is None or f"{year + 1:04d}" > since) and (until is None or f"{year:04d}" < until)]
+        for year in years:
+            self._thaw(year)
+        return bool(years)
+
+    def older_years(self, before=None):
+        """Unloaded archived years starting before the given date"""
+        return [year for year in self.unloaded_years() if before is None or f"{year:04d}" < before]
+
+    def thaw_next(self, before=None):
+        """Read the newest archived year starting before the given date; return False when none is left"""
+        years = self.older_years(before)
+        if not years:
+            return False
+        self._thaw(years[-1])
+        return True
+
+    def _cold_lists(self):
+        """(cactus name, event type, events) of the in-memory lists holding events before the cutoff"""
+        boundary = self.boundary
+        # Records still undecoded in a lazily loaded file came from the hot file: nothing cold in them
+        return [(name, event_type, cactus_data[event_type])
+                for name, cactus_data in loaded_items(self.data_manager.data["cactuses"])
+                for event_type in self.event_types
+                if cactus_data.get(event_type) and cactus_data[event_type][0]["date"] < boundary]
+
+    def hot_data(self):
+        """Write changed archive years and return the data to store in the hot file"""
+        data = self.data_manager.data
+        if not self.active:
+            return data
+        boundary = self.boundary
+        cold_lists = self._cold_lists()
+        if not cold_lists and all(year not in self.loaded for year in self.settings["years"]):
+            return data
+
+        years = set(self.loaded)
+        for _, _, events in cold_lists:
+            last = events[bisect_left(events, boundary, key=event_date) - 1]["date"]
+            years.update(range(int(events[0]["date"][:4]), int(last[:4]) + 1))
+        # Events added to a year still on disk must be merged with it before it is rewritten
+        for year in sorted(years):
+            if year in self.settings["years"] and year not in self.loaded and year not in self.missing:
+                self._thaw(year)
+        os.makedirs(self.directory(), exist_ok=True)
+        for year in sorted(years):
+            year_data = self._year_events(year)
+            fingerprint = self._fingerprint(year_data)
+            if self.loaded.get(year) == fingerprint:
+                continue
+            if not year_data:
+                if year in self.missing:
+                    continue  # Nothing known about the year: keep it listed until its file is back
+                # Every event of the year was deleted, moved or is inside a widened hot window
+                if os.path.exists(self.year_file(year)):
+                    os.remove(self.year_file(year))
+                self.loaded.pop(year, None)
+                if year in self.settings["years"]:
+                    self.settings["years"].remove(year)
+                continue
+            write_data(self.year_file(year), {"cactuses": year_data}, self.event_types, self.FILE_FORMAT)
+            self.loaded[year] = fingerprint
+            self.missing.discard(year)
+            if year not in self.settings["years"]:
+                self.settings["years"].append(year)
+                self.settings["years"].sort()
+
+        hot = dict(data, cactuses=data["cactuses"].copy())
+        cold_lists = self._cold_lists()  # Reading years in above replaced lists and may have added some
+        if not self.unloaded_years() and not self.missing:
+            self.settings["last"] = {}  # Every archived event is in memory: rebuild the dates from scratch
+        last = self.settings.setdefault("last", {})
+        for name, event_type, events in cold_lists:
+            hot_cactus = hot["cactuses"][name]
+            if hot_cactus is data["cactuses"][name]:
+                hot_cactus = hot["cactuses"][name] = dict(hot_cactus)
+            cut = bisect_left(events, boundary, key=event_date)
+            hot_cactus[event_type] = events[cut:]
+            last.setdefault(name, {})[event_type] = events[cut - 1]["date"]
+        return hot
+
+    def freeze(self):
+        """Drop archived events from memory; they are read back when a range needs them"""
+        if not self.active:
+            return
+        boundary = self.boundary
+        for cactus_data in self.data_manager.data["cactuses"].values():
+            for event_type in self.event_types:
+                events = cactus_data.get(event_type)
+                if events and events[0]["date"] < boundary:
+                    del events[:bisect_left(events, boundary, key=event_date)]
+        self.loaded = {}
+        self.data_manager.rollups.invalidate()
+        self.data_manager.events.invalidate()
+        self.data_manager.sync.invalidate()
+
+    def archive_old(self, hot_days=None, now=None):
+        """Move events older than hot_days to the archive; return the new cutoff
+
+        hot_days defaults to the configured value, or DEFAULT_HOT_DAYS the first time.
+        """
+        self.data_manager.load_all()  # Any cactus may hold events the new cutoff archives
+        settings = self.settings or {"hot_days": self.DEFAULT_HOT_DAYS, "before": "0000", "years": []}
+        if hot_days is not None:
+            if hot_days <= 0:
+                raise ValueError("hot_days must be positive")
+            settings["hot_days"] = hot_days
+        before = ((now or datetime.now()) - timedelta(days=settings["hot_days"])).strftime("%Y-%m-%d 00:00")
+        if before < settings["before"]:
+            # A longer hot window: bring the years back into the hot file
+            self.data_manager.data["archive"] = settings
+            self.ensure_loaded(since=before)
+        settings["before"] = before
+        self.data_manager.data["archive"] = settings
+        self.data_manager.save_data()
+        self.freeze()
+        return before
+
+    def roll(self, now=None):
+        """Advance the cutoff when it fell ROLL_DAYS behind; return True if it moved"""
+        if not self.active:
+            return False
+        due = ((now or datetime.now()) - timedelta(days=self.settings["hot_days"] + self.ROLL_DAYS))
+        if self.boundary > due.strftime("%Y-%m-%d 00:00"):
+            return False
+        self.archive_old(now=now)
+        return True
@@ -0,0 +1,187 @@
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+from utils import event_date, normalize_event_date
+
+# Operations that append an event and the history list they append to
+EVENT_OPERATIONS = {"watering": "watering", "fertilizer": "fertilizers", "growth": "growth"}
+# Operations that overwrite a scalar field and the field they overwrite
+FIELD_OPERATIONS = {"frequency": "watering_frequency", "species": "species", "repotting": "next_repotting"}
+# Old value of a field the cactus did not have: undo removes the field instead of storing None
+MISSING = object()
+
+
+class BulkOperationError(Exception):
+    pass
+
+
+class BulkOperationsEngine:
+    """Apply an operation to many cactuses atomically, with one save and an undo entry per batch"""
+
+    def __init__(self, data_manager, undo_limit=20):
+        self.data_manager = data_manager
+        self.undo_log = deque(maxlen=undo_limit)
+
+    def select(self, species=None, overdue_days=None, species_db=None, names=None):
+        """Return cactus names matching all given criteria
+
+        species matches the full species name or its genus ("Mammillaria");
+        overdue_days selects plants whose seasonal watering is overdue by at least that many days.
+        """
+        cactuses = self.data_manager.data["cactuses"]
+        selected = list(names) if names is not None else list(cactuses)
+        if species:
+            species = species.strip().lower()
+            selected = [name for name in selected
+                        if cactuses[name].get("species", "").lower() == species
+                        or cactuses[name].get("species", "").lower().split(" ")[0] == species]
+        if overdue_days is not None:
+            if species_db is None:
+                raise BulkOperationError("species_db is required to select overdue cactuses")
+            overdue = {name for name, days in self.data_manager.get_due_cactuses(species_db)
+                       if days is None or days >= overdue_days}
+            selected = [name for name in selected if name in overdue]
+        return selected
+
+    def apply(self, operation, cactus_names, **params):
+        """Apply an operation to all cactuses or none of them; return the undo entry"""
+        cactuses = self.data_manager.data["cactuses"]
+        missing = [name for name in cactus_names if name not in cactuses]
+        if missing:
+            raise BulkOperationError(f"Unknown cactuses: {', '.join(missing)}")
+        make_change = self._prepare(operation, params)
+
+        changes = []
+        try:
+            for name in cactus_names:
+                changes.append(make_change(name))
+            self.data_manager.save_data()
+        except Exception:
+            self._revert(changes)
+            raise
+
+        entry = {
+            "operation": operation,
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
+            "count": len(changes),
+            "changes": changes
+        }
+        self.undo_log.append(entry)
+        return entry
+
+    def undo(self):
+        """Revert the most recent batch; return its entry or None if there is nothing to undo
+
+        Changes edited, moved or deleted since the batch are left alone and listed in
+        entry["not_reverted"] as (cactus name, event type or field) pairs.
+        """
+        if not self.undo_log:
+            return None
+        entry = self.undo_log.pop()
+        reverted, failed = self._revert(entry["changes"])
+        try:
+            self.data_manager.save_data()
+        except Exception:
+            self._reapply(reversed(reverted))
+            self.undo_log.append(entry)
+            raise
+        return dict(entry, count=len(reverted), not_reverted=[change[1:3] for change in reversed(failed)])
+
+    def _prepare(self, operation, params):
+        """Validate parameters once and return a function applying the change to one cactus"""
+        cactuses = self.data_manager.data["cactuses"]
+        if operation in EVENT_OPERATIONS:
+            event_type = EVENT_OPERATIONS[operation]
+            try:
+                template = {"date": normalize_event_date(params.get("date"))}
+            except ValueError as e:
+                raise BulkOperationError(str(e))
+            if operation == "fertilizer":
+                if not params.get("fertilizer_type") or not params.get("dosage"):
+                    raise BulkOperationError("fertilizer_type and dosage are required")
+                template["type"] = params["fertilizer_type"]
+                template["dosage"] = params["dosage"]
+            elif operation == "growth":
+                heights = params.get("heights")
+                if heights is None:
+                    try:
+                        height = float(params["height"])
+                    except (KeyError, TypeError, ValueError):
+                        raise BulkOperationError("height must be a number")
+            template["comment"] = params.get("comment", "")
+
+            def add_event(name):
+                record = dict(template)
+                if operation == "growth":
+                    record["height"] = float(heights[name]) if heights is not None else height
+                self.data_manager.add_event(name, event_type, record, save=False)
+                # The new record is the last of its same-date run; its id finds it again in O(log n)
+                events = cactuses[name][event_type]
+                position = bisect_right(events, record["date"], key=event_date) - 1
+                return "event", name, event_type, self.data_manager.events.id_at(name, event_type, position), record
+
+            return add_event
+
+        if operation in FIELD_OPERATIONS:
+            field = FIELD_OPERATIONS[operation]
+            value = params.get("value")
+            if operation == "frequency":
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise BulkOperationError("frequency must be an integer")
+                if value <= 0:
+                    raise BulkOperationError("frequency must be positive")
+            elif operation == "repotting":
+                try:
+                    value = datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d") if value else None
+                except (TypeError, ValueError):
+                    raise BulkOperationError("repotting date must be YYYY-MM-DD")
+            elif operation == "species" and not value:
+                value = "Не указан"
+
+            def set_field(name):
+                old_value = cactuses[name].get(field, MISSING)
+                self.data_manager.set_field(name, field, value, save=False)
+                return "field", name, field, old_value, value
+
+            return set_field
+
+        raise BulkOperationError(f"Unknown operation: {operation}")
+
+    def _revert(self, changes):
+        """Undo changes newest first; return (reverted changes, changes that no longer apply)"""
+        cactuses = self.data_manager.data["cactuses"]
+        reverted, failed = [], []
+        for change in reversed(changes):
+            if change[0] == "field":
+                _, name, field, old_value, new_value = change
+                if name not in cactuses or cactuses[name].get(field, MISSING) != new_value:
+                    # Changed again after the batch: the newer value wins
+                    failed.append(change)
+                    continue
+                if old_value is MISSING:
+                    self.data_manager.clear_field(name, field, save=False)
+                else:
+                    self.data_manager.set_field(name, field, old_value, save=False)
+            else:
+                try:
+                    # A public delete: listeners see it and sync removes the event from other copies
+                    self.data_manager.delete_event(change[3], save=False)
+                except KeyError:
+                    # Edited, moved or deleted after the batch: the id no longer resolves
+                    failed.append(change)
+                    continue
+            reverted.append(change)
+        return reverted, failed
+
+    def _reapply(self, changes):
+        for change in changes:
+            if change[0] == "field":
+                _, name, field, _, new_value = change
+                self.data_manager.set_field(name, field, new_value, save=False)
+            else:
+                _, name, event_type, event_id, record = change
+                # Drop the tombstone left by _revert, or sync would delete the event again
+                self.data_manager.data["cactuses"][name].get("deleted", {}).get(event_type, {}).pop(event_id, None)
+                self.data_manager.add_event(name, event_type, record, save=False)
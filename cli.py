@@ -0,0 +1,301 @@
+import argparse
+import sys
+from datetime import datetime, timedelta
+from data_manager import DataManager, EVENT_TYPES
+from bulk_operations import BulkOperationError, EVENT_OPERATIONS, FIELD_OPERATIONS
+from storage import FORMATS
+from sync import load_sync_file, save_sync_file
+
+
+def load_species_db(args):
+    # Only commands that need seasonal frequencies pay for opening the species catalog
+    from species_database import SpeciesDatabase
+    species_db = SpeciesDatabase(args.species_file)
+    if species_db.load_error:
+        print(f"Предупреждение: {species_db.load_error}", file=sys.stderr)
+    return species_db
+
+
+def cmd_list(data_manager, args):
+    """Print every cactus with its species, frequency and last watering"""
+    for name, cactus_data in sorted(data_manager.data["cactuses"].items()):
+        last_watering = cactus_data["watering"][-1]["date"] if cactus_data["watering"] else "нет поливов"
+        print(f"{name}\t{cactus_data.get('species', 'Не указан')}\t"
+              f"каждые {cactus_data['watering_frequency']} дн.\tпоследний полив: {last_watering}")
+    return 0
+
+
+def cmd_due(data_manager, args):
+    """Print cactuses whose seasonal watering is due, most overdue first"""
+    due = data_manager.get_due_cactuses(load_species_db(args))
+    due = [(name, days) for name, days in due if days is None or days >= args.min_days]
+    due.sort(key=lambda item: (item[1] is not None, -(item[1] or 0), item[0]))
+    for name, days in due:
+        print(f"{name}\t{'ещё не поливался' if days is None else f'просрочен на {days} дн.'}")
+    return 0
+
+
+def cmd_timeline(data_manager, args):
+    """Print the latest events of the whole collection, newest first"""
+    from timeline import Timeline
+
+    before = None
+    if args.before:
+        before = (datetime.strptime(args.before, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d 00:00")
+    entries, _ = Timeline(data_manager, EVENT_TYPES).page(
+        args.limit, before=before, event_types=args.type, names=args.cactus, species=args.species)
+    for entry in entries:
+        details = ", ".join(str(value) for field, value in entry["record"].items()
+                            if field not in ("date", "id", "modified", "thumbnail") and value != "")
+        print(f"{entry['date']}\t{entry['cactus']}\t{entry['type']}\t{details}")
+    return 0
+
+
+def cmd_water(data_manager, args):
+    """Record a watering for one or more cactuses"""
+    entry = data_manager.bulk_apply("watering", args.names, comment=args.comment, date=args.date)
+    print(f"Полив записан для {entry['count']} кактусов")
+    return 0
+
+
+def cmd_bulk(data_manager, args):
+    """Select cactuses by query and apply a bulk operation to them"""
+    species_db = load_species_db(args) if args.overdue_days is not None else None
+    names = data_manager.bulk_operations.select(species=args.species, overdue_days=args.overdue_days,
+                                                species_db=species_db, names=args.names or None)
+    if not names:
+        print("Нет кактусов, подходящих под условия")
+        return 0
+    if args.operation in FIELD_OPERATIONS:
+        params = {"value": args.value}
+    else:
+        params = {"comment": args.comment, "date": args.date}
+        if args.operation == "fertilizer":
+            params.update(fertilizer_type=args.type, dosage=args.dosage)
+        elif args.operation == "growth":
+            params["height"] = args.value
+    if args.dry_run:
+        print("Будет изменено:", ", ".join(names))
+        return 0
+    entry = data_manager.bulk_apply(args.operation, names, **params)
+    print(f"Операция «{args.operation}» применена к {entry['count']} кактусам")
+    return 0
+
+
+def cmd_export(data_manager, args):
+    """Export the collection to CSV or PDF"""
+    data_manager.export_data(args.path)
+    print(f"Данные экспортированы в {args.path}")
+    return 0
+
+
+def cmd_report(data_manager, args):
+    """Build an illustrated PDF or HTML report, redrawing only charts whose data changed"""
+    from collection_report import CollectionReport
+
+    def progress(done, total):
+        print(f"\rГрафики: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    errors = CollectionReport(data_manager, max_workers=args.workers).build(args.path, progress=progress)
+    print(file=sys.stderr)
+    for name, error in errors.items():
+        print(f"Ошибка графика «{name}»: {error}", file=sys.stderr)
+    print(f"Отчёт сохранён в {args.path}")
+    return 1 if errors else 0
+
+
+def cmd_photos(data_manager, args):
+    """Pack photos into a zip or tar archive with a manifest, optionally downscaled"""
+    from photo_export import PhotoExport
+
+    names = args.cactus
+    if args.species:
+        names = data_manager.bulk_operations.select(species=args.species, names=names)
+    unknown = [name for name in names or () if name not in data_manager.data["cactuses"]]
+    if unknown:
+        print(f"Ошибка: неизвестный кактус: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    def progress(done, total):
+        print(f"\rФото: {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    try:
+        errors = PhotoExport(data_manager, max_workers=args.workers).build(args.path, names, args.max_size, progress)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+    for path, error in errors.items():
+        print(f"Пропущено «{path}»: {error}", file=sys.stderr)
+    print(f"Архив сохранён в {args.path}")
+    return 1 if errors else 0
+
+
+def cmd_backup(data_manager, args):
+    """Copy the data file to a backup"""
+    path = args.path or f"cactus_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    data_manager.backup_data(path)
+    print(f"Резервная копия сохранена в {path}")
+    return 0
+
+
+def cmd_restore(data_manager, args):
+    """Replace the data file with a backup"""
+    data_manager.restore_data(args.path)
+    print(f"Данные восстановлены из {args.path}")
+    return 0
+
+
+def cmd_convert(data_manager, args):
+    """Rewrite the data file in another on-disk format"""
+    data_manager.file_format = args.format
+    data_manager.save_data()
+    print(f"Файл {data_manager.data_file} сохранён в формате {args.format}")
+    return 0
+
+
+def cmd_archive(data_manager, args):
+    """Move events older than the hot window to the per-year archive files"""
+    try:
+        before = data_manager.archive.archive_old(args.days)
+    except ValueError as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    years = ", ".join(str(year) for year in data_manager.data["archive"]["years"]) or "нет"
+    print(f"События до {before[:10]} перенесены в {data_manager.archive.directory()} (годы: {years})")
+    return 0
+
+
+def cmd_sync_summary(data_manager, args):
+    """Write digests of the collection for the other copy to answer with a delta"""
+    save_sync_file(args.path, data_manager.sync.summary())
+    print(f"Сводка записана в {args.path}")
+    return 0
+
+
+def cmd_sync_delta(data_manager, args):
+    """Write the changes the copy described by a summary file is missing"""
+    delta = data_manager.sync.delta(load_sync_file(args.summary))
+    save_sync_file(args.path, delta)
+    print(f"Изменения по {len(delta['cactuses'])} кактусам записаны в {args.path}")
+    return 0
+
+
+def cmd_sync_apply(data_manager, args):
+    """Merge a delta file into the collection"""
+    changed = data_manager.sync.apply(load_sync_file(args.path))
+    print(f"Обновлено кактусов: {len(changed)}")
+    return 0
+
+
+def cmd_sync_merge(data_manager, args):
+    """Two-way sync with another data file reachable from this machine"""
+    changed_here, changed_there = data_manager.merge_data(args.path)
+    print(f"Обновлено кактусов: здесь — {len(changed_here)}, в {args.path} — {len(changed_there)}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cactus", description="Уход за кактусами из командной строки")
+    parser.add_argument("--data", default="cactus_data.json", help="файл данных")
+    parser.add_argument("--species-file", default="cactus_species.json", help="файл каталога видов")
+    parser.add_argument("--compact", action="store_true",
+                        help="хранить историю событий в памяти столбцами (для больших коллекций)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="список кактусов").set_defaults(handler=cmd_list)
+
+    due = commands.add_parser("due", help="кактусы, которые пора полить")
+    due.add_argument("--min-days", type=int, default=0, help="только просроченные не меньше чем на N дней")
+    due.set_defaults(handler=cmd_due)
+
+    timeline = commands.add_parser("timeline", help="последние события всей коллекции")
+    timeline.add_argument("--limit", type=int, default=50, help="сколько событий показать")
+    timeline.add_argument("--before", help="только события не позже этой даты ГГГГ-ММ-ДД")
+    timeline.add_argument("--type", action="append", choices=EVENT_TYPES, help="тип события (можно несколько)")
+    timeline.add_argument("--cactus", action="append", help="имя кактуса (можно несколько)")
+    timeline.add_argument("--species", help="вид или род")
+    timeline.set_defaults(handler=cmd_timeline)
+
+    water = commands.add_parser("water", help="записать полив")
+    water.add_argument("names", nargs="+", help="имена кактусов")
+    water.add_argument("--comment", default="")
+    water.add_argument("--date", help="дата полива (по умолчанию сейчас)")
+    water.set_defaults(handler=cmd_water)
+
+    bulk = commands.add_parser("bulk", help="массовая операция по запросу")
+    bulk.add_argument("operation", choices=sorted(set(EVENT_OPERATIONS) | set(FIELD_OPERATIONS)))
+    bulk.add_argument("names", nargs="*", help="ограничить этими кактусами")
+    bulk.add_argument("--species", help="вид или род")
+    bulk.add_argument("--overdue-days", type=int, help="только просроченные не меньше чем на N дней")
+    bulk.add_argument("--value", help="рост, частота, вид или дата пересадки ГГГГ-ММ-ДД")
+    bulk.add_argument("--type", help="тип удобрения")
+    bulk.add_argument("--dosage", help="дозировка удобрения")
+    bulk.add_argument("--comment", default="")
+    bulk.add_argument("--date", help="дата события (по умолчанию сейчас)")
+    bulk.add_argument("--dry-run", action="store_true", help="только показать выбранные кактусы")
+    bulk.set_defaults(handler=cmd_bulk)
+
+    export = commands.add_parser("export", help="экспорт в CSV или PDF")
+    export.add_argument("path", help="файл .csv или .pdf")
+    export.set_defaults(handler=cmd_export)
+
+    report = commands.add_parser("report", help="отчёт с графиками в PDF или HTML")
+    report.add_argument("path", help="файл .pdf или .html")
+    report.add_argument("--workers", type=int, help="число процессов отрисовки (по умолчанию все ядра)")
+    report.set_defaults(handler=cmd_report)
+
+    photos = commands.add_parser("photos", help="архив фото в ZIP или TAR с описью")
+    photos.add_argument("path", help="файл .zip, .tar или .tar.gz")
+    photos.add_argument("--cactus", action="append", help="имя кактуса (можно несколько; по умолчанию все)")
+    photos.add_argument("--species", help="только кактусы этого вида или рода")
+    photos.add_argument("--max-size", type=int, help="уменьшить фото до стольких пикселей по длинной стороне")
+    photos.add_argument("--workers", type=int, help="число процессов уменьшения (по умолчанию все ядра)")
+    photos.set_defaults(handler=cmd_photos)
+
+    backup = commands.add_parser("backup", help="создать резервную копию")
+    backup.add_argument("path", nargs="?", help="файл резервной копии")
+    backup.set_defaults(handler=cmd_backup)
+
+    restore = commands.add_parser("restore", help="восстановить из резервной копии")
+    restore.add_argument("path", help="файл резервной копии")
+    restore.set_defaults(handler=cmd_restore)
+
+    convert = commands.add_parser("convert", help="сохранить файл данных в другом формате")
+    convert.add_argument("format", choices=FORMATS, help="json — для обмена, остальные — компактнее и быстрее")
+    convert.set_defaults(handler=cmd_convert)
+
+    archive = commands.add_parser("archive", help="перенести старую историю в архив по годам")
+    archive.add_argument("--days", type=int, help="сколько последних дней оставить в основном файле (по умолчанию 365)")
+    archive.set_defaults(handler=cmd_archive)
+
+    sync = commands.add_parser("sync", help="синхронизация с другой копией файла данных")
+    actions = sync.add_subparsers(dest="action", required=True)
+    summary = actions.add_parser("summary", help="записать сводку этой копии")
+    summary.add_argument("path", help="файл сводки")
+    summary.set_defaults(handler=cmd_sync_summary)
+    delta = actions.add_parser("delta", help="записать изменения, которых нет в другой копии")
+    delta.add_argument("summary", help="сводка другой копии")
+    delta.add_argument("path", help="файл изменений")
+    delta.set_defaults(handler=cmd_sync_delta)
+    apply = actions.add_parser("apply", help="применить файл изменений")
+    apply.add_argument("path", help="файл изменений")
+    apply.set_defaults(handler=cmd_sync_apply)
+    merge = actions.add_parser("merge", help="двусторонняя синхронизация с другим файлом данных")
+    merge.add_argument("path", help="другая копия файла данных")
+    merge.set_defaults(handler=cmd_sync_merge)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        data_manager = DataManager(args.data, compact=args.compact)
+        return args.handler(data_manager, args)
+    except (BulkOperationError, ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
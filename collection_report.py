@@ -0,0 +1,225 @@
+import hashlib
+import html
+import json
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+CHART_VERSION = 1  # Bump when draw_charts changes so cached images are redrawn
+# Charts rendered per pool task; one chart takes tens of milliseconds, so batching hides the round trips
+CHUNK_SIZE = 4
+PERIOD_TEXT = {"day": "по дням", "week": "по неделям", "month": "по месяцам"}
+BAR_WIDTH = {"day": 0.8, "week": 5, "month": 20}
+
+
+def draw_charts(fig, series, period, tight=True):
+    """Draw the growth and watering charts of a rollup series onto a matplotlib figure
+
+    tight_layout costs an extra draw pass; batch rendering passes tight=False for fixed margins.
+    """
+    ax1, ax2 = fig.subplots(2, 1)
+    period_text = PERIOD_TEXT[period]
+
+    growth = [(start, bucket["last_height"]) for start, bucket in series if bucket["growth"]]
+    if growth:
+        dates, heights = zip(*growth)
+        ax1.plot(dates, heights, marker="o", color="green", label="Рост (см)")
+        ax1.set_title(f"Динамика роста ({period_text})")
+        ax1.set_xlabel("Дата")
+        ax1.set_ylabel("Высота (см)")
+        ax1.legend()
+        ax1.grid(True)
+        ax1.tick_params(axis="x", labelrotation=45)
+    else:
+        ax1.text(0.5, 0.5, "Нет данных о росте", horizontalalignment="center", verticalalignment="center")
+        ax1.set_title("Динамика роста")
+
+    watering = [(start, bucket["watering"]) for start, bucket in series if bucket["watering"]]
+    if watering:
+        dates, watering_counts = zip(*watering)
+        ax2.bar(dates, watering_counts, width=BAR_WIDTH[period], align="edge", color="blue", label="Поливы")
+        ax2.set_title(f"Частота полива ({period_text})")
+        ax2.set_xlabel("Дата")
+        ax2.set_ylabel("Количество поливов")
+        ax2.legend()
+        ax2.grid(True)
+        ax2.tick_params(axis="x", labelrotation=45)
+    else:
+        ax2.text(0.5, 0.5, "Нет данных о поливах", horizontalalignment="center", verticalalignment="center")
+        ax2.set_title("Частота полива")
+
+    if tight:
+        fig.tight_layout()
+    else:
+        fig.subplots_adjust(left=0.08, right=0.97, top=0.95, bottom=0.15, hspace=0.8)
+
+
+def render_chart(path, series, period):
+    """Render the charts to a PNG file with the Agg backend; safe to run in a worker process"""
+    # Figure with an explicit Agg canvas needs neither pyplot nor a display
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(8, 6), dpi=100)
+    FigureCanvasAgg(fig)
+    draw_charts(fig, series, period, tight=False)
+    temp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        fig.savefig(temp, format="png")
+        os.replace(temp, path)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def _render_safe(job):
+    name, path, series, period = job
+    try:
+        render_chart(path, series, period)
+        return name, None
+    except Exception as e:
+        return name, str(e)
+
+
+class CollectionReport:
+    """Illustrated report of the whole collection as PDF or static HTML
+
+    Each plant's charts are rendered headlessly in a process pool and cached as PNG files named
+    by a hash of the chart data, so a rerun only redraws plants whose charts changed.
+    """
+
+    def __init__(self, data_manager, cache_dir=None, max_workers=None):
+        self.data_manager = data_manager
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(data_manager.data_file)),
+                                                   "chart_cache")
+        self.max_workers = max_workers
+
+    def prepare(self, cactus_names=None):
+        """Collect everything the report needs from the data, as plain picklable sections
+
+        Call it on the thread that owns the data; render and write can then run elsewhere.
+        """
+        self.data_manager.archive.ensure_loaded()
+        cactuses = self.data_manager.data["cactuses"]
+        rollups = self.data_manager.rollups
+        sections = []
+        for name in sorted(cactuses if cactus_names is None else cactus_names):
+            cactus_data = cactuses[name]
+            period = rollups.period_for_span(name)
+            series = [(start, {"growth": bucket["growth"], "last_height": bucket["last_height"],
+                               "watering": bucket["watering"]})
+                      for start, bucket in rollups.series(name, period)]
+            totals = rollups.totals(name)
+            digest = hashlib.blake2b(json.dumps([CHART_VERSION, period, series], default=str).encode("utf-8"),
+                                     digest_size=16).hexdigest()
+            sections.append({
+                "name": name,
+                "lines": [
+                    f"Вид: {cactus_data.get('species', 'Не указан')}",
+                    f"Частота полива: {cactus_data['watering_frequency']} дней",
+                    f"Последний полив: {cactus_data['watering'][-1]['date'] if cactus_data['watering'] else 'Нет данных'}",
+                    f"Поливов: {totals['watering']}, подкормок: {totals['fertilizers']}, фото: {totals['photos']}",
+                    f"Заметки: {cactus_data['notes'] or 'Нет заметок'}"
+                ],
+                "image": os.path.join(self.cache_dir, f"{digest}.png"),
+                "series": series,
+                "period": period
+            })
+        return sections
+
+    def render(self, sections, progress=None):
+        """Render charts missing from the cache across all cores; return {cactus: error}"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        jobs = [(section["name"], section["image"], section["series"], section["period"])
+                for section in sections if not os.path.exists(section["image"])]
+        errors = {}
+        if not jobs:
+            return errors
+        if len(jobs) < CHUNK_SIZE or self.max_workers == 1:
+            results = map(_render_safe, jobs)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            results = executor.map(_render_safe, jobs, chunksize=CHUNK_SIZE)
+        try:
+            for done, (name, error) in enumerate(results, start=1):
+                if error is not None:
+                    errors[name] = error
+                if progress:
+                    progress(done, len(jobs))
+        finally:
+            if executor:
+                executor.shutdown()
+        return errors
+
+    def prune(self, sections):
+        """Delete cached charts no longer used by any of the sections"""
+        keep = {os.path.basename(section["image"]) for section in sections}
+        for entry in os.listdir(self.cache_dir):
+            if entry.endswith(".png") and entry not in keep:
+                os.remove(os.path.join(self.cache_dir, entry))
+
+    def write(self, file_path, sections, progress=None):
+        """Render pending charts and assemble the report; the extension picks PDF or HTML"""
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension not in (".pdf", ".html", ".htm"):
+            raise ValueError(f"Unsupported report format: {extension or file_path}")
+        errors = self.render(sections, progress)
+        if extension == ".pdf":
+            self.write_pdf(file_path, sections)
+        else:
+            self.write_html(file_path, sections)
+        return errors
+
+    def build(self, file_path, cactus_names=None, progress=None):
+        """Prepare, render and write a report in one call; return {cactus: error}"""
+        sections = self.prepare(cactus_names)
+        errors = self.write(file_path, sections, progress)
+        if cactus_names is None:
+            self.prune(sections)
+        return errors
+
+    def write_pdf(self, file_path, sections):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import cm
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
+        from reportlab.lib.styles import getSampleStyleSheet
+
+        doc = SimpleDocTemplate(file_path, pagesize=A4)
+        styles = getSampleStyleSheet()
+        elements = [Paragraph("Отчёт о коллекции кактусов", styles["Title"]), Spacer(1, 12)]
+        for section in sections:
+            elements.append(Paragraph(html.escape(section["name"]), styles["Heading2"]))
+            elements.extend(Paragraph(html.escape(line), styles["BodyText"]) for line in section["lines"])
+            elements.append(Spacer(1, 6))
+            if os.path.exists(section["image"]):
+                elements.append(Image(section["image"], width=16 * cm, height=12 * cm))
+            elements.append(PageBreak())
+        doc.build(elements)
+
+    def write_html(self, file_path, sections):
+        """Write an HTML page with its charts copied to a "<name>_charts" folder beside it"""
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        charts_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), f"{stem}_charts")
+        os.makedirs(charts_dir, exist_ok=True)
+        parts = ["<!DOCTYPE html>", '<html lang="ru"><head><meta charset="utf-8">',
+                 "<title>Отчёт о коллекции кактусов</title>",
+                 "<style>body{font-family:Arial,sans-serif;max-width:900px;margin:auto}"
+                 "section{border-bottom:1px solid #ccc;padding:12px 0}img{max-width:100%}</style>",
+                 "</head><body>", "<h1>Отчёт о коллекции кактусов</h1>"]
+        for section in sections:
+            parts.append(f"<section><h2>{html.escape(section['name'])}</h2>")
+            parts.extend(f"<p>{html.escape(line)}</p>" for line in section["lines"])
+            if os.path.exists(section["image"]):
+                image_name = os.path.basename(section["image"])
+                target = os.path.join(charts_dir, image_name)
+                if not os.path.exists(target):
+                    shutil.copyfile(section["image"], target)
+                parts.append(f'<img src="{html.escape(quote(f"{stem}_charts/{image_name}"))}" '
+                             f'alt="Графики {html.escape(section["name"])}" loading="lazy">')
+            parts.append("</section>")
+        parts.append("</body></html>")
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(parts))
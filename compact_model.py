@@ -0,0 +1,326 @@
+import sys
+from array import array
+from collections.abc import MutableSequence
+from datetime import datetime
+from utils import event_date
+
+EPOCH = datetime(1970, 1, 1)
+NO_DATE = -(1 << 63)  # Minutes value of an event without a date
+ABSENT = 0  # String code of a missing field
+NAN = float("nan")  # Height of an event without one
+
+
+def _pool_key(value):
+    # 5, 5.0 and True are equal dict keys; keep them apart so every value decodes to its own type
+    return value if isinstance(value, str) else (type(value), value)
+
+
+def _float_height(record):
+    """Height of a record if it fits the float column unchanged, else None"""
+    height = record.get("height")
+    return height if type(height) is float and height == height else None
+
+
+class StringPool:
+    """Dictionary encoding shared by all event lists: each distinct value is stored once"""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {}
+
+    @classmethod
+    def from_values(cls, values):
+        """Rebuild a pool from its values in code order (code 0 excluded)"""
+        pool = cls()
+        for value in values:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            pool.codes[_pool_key(value)] = len(pool.values)
+            pool.values.append(value)
+        return pool
+
+    def encode(self, value):
+        key = _pool_key(value)
+        code = self.codes.get(key)
+        if code is None:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[key] = code
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+
+_day_minutes = {}
+
+
+def date_to_minutes(value):
+    """Convert a "%Y-%m-%d %H:%M" string to minutes since 1970"""
+    day = value[:10]
+    minutes = _day_minutes.get(day)
+    if minutes is None:
+        minutes = (datetime(int(day[0:4]), int(day[5:7]), int(day[8:10])).toordinal() - EPOCH.toordinal()) * 1440
+        _day_minutes[day] = minutes
+    return minutes + int(value[11:13]) * 60 + int(value[14:16])
+
+
+def minutes_to_date(minutes):
+    days, minute_of_day = divmod(minutes, 1440)
+    moment = datetime.fromordinal(EPOCH.toordinal() + days)
+    return f"{moment.year:04d}-{moment.month:02d}-{moment.day:02d} {minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+class CompactEventList(MutableSequence):
+    """Column-oriented event history that behaves like a list of event dicts
+
+    Dates are stored as minutes in an int64 array, float heights in a float array and every
+    other field as codes into a shared StringPool; so is a height of any other type (an int,
+    None), which keeps it exactly as it was written. Indexing returns a freshly built dict, so changes
+    to a returned record must be written back with item assignment.
+    """
+
+    def __init__(self, pool, records=()):
+        self.pool = pool
+        self.dates = array("q")
+        self.heights = array("d")
+        self.has_height = False
+        self.fields = []
+        self.columns = {}
+        if records:
+            self._build(records)
+
+    @classmethod
+    def from_columns(cls, pool, dates, heights=None, columns=None):
+        """Wrap already encoded column arrays without re-encoding each event"""
+        events = cls(pool)
+        events.dates = dates
+        if heights is not None:
+            events.heights = heights
+            events.has_height = True
+        for field, codes in (columns or {}).items():
+            events.fields.append(sys.intern(field))
+            events.columns[field] = codes
+        return events
+
+    def _build(self, records):
+        """Encode many records column by column in one pass"""
+        encode = self.pool.encode
+        dates = []
+        heights = []
+        columns = {}
+        for index, record in enumerate(records):
+            date = record.get("date")
+            dates.append(date_to_minutes(date) if date else NO_DATE)
+            height = _float_height(record)
+            heights.append(NAN if height is None else height)
+            for field, value in record.items():
+                if field == "date" or (field == "height" and height is not None):
+                    continue
+                column = columns.get(field)
+                if column is None:
+                    column = columns[field] = [ABSENT] * index
+                column.append(encode(value))
+            for column in columns.values():
+                if len(column) <= index:
+                    column.append(ABSENT)
+        self.dates = array("q", dates)
+        self.has_height = any(height == height for height in heights)
+        if self.has_height:
+            self.heights = array("d", heights)
+        for field, codes in columns.items():
+            self.fields.append(sys.intern(field))
+            self.columns[field] = array("I", codes)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _column(self, field):
+        column = self.columns.get(field)
+        if column is None:
+            column = array("I", bytes(4 * len(self.dates)))
+            self.columns[field] = column
+            self.fields.append(sys.intern(field))
+        return column
+
+    def _encode(self, record):
+        date = record.get("date")
+        height = _float_height(record)
+        codes = {field: self.pool.encode(value) for field, value in record.items()
+                 if field != "date" and (field != "height" or height is None)}
+        return (date_to_minutes(date) if date else NO_DATE,
+                NAN if height is None else height,
+                height is not None, codes)
+
+    def _store(self, index, encoded, insert):
+        minutes, height, with_height, codes = encoded
+        for field in codes:
+            self._column(field)
+        if with_height and not self.has_height:
+            self.heights = array("d", [NAN]) * len(self.dates)
+            self.has_height = True
+        if insert:
+            self.dates.insert(index, minutes)
+            if self.has_height:
+                self.heights.insert(index, height)
+            for field, column in self.columns.items():
+                column.insert(index, codes.get(field, ABSENT))
+        else:
+            self.dates[index] = minutes
+            if self.has_height:
+                self.heights[index] = height
+            for field, column in self.columns.items():
+                column[index] = codes.get(field, ABSENT)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        record = {}
+        minutes = self.dates[index]
+        if minutes != NO_DATE:
+            record["date"] = minutes_to_date(minutes)
+        if self.has_height and self.heights[index] == self.heights[index]:
+            record["height"] = self.heights[index]
+        elif "height" in self.columns and self.columns["height"][index] != ABSENT:
+            record["height"] = self.pool.values[self.columns["height"][index]]
+        for field in self.fields:
+            if field == "height":
+                continue
+            code = self.columns[field][index]
+            if code != ABSENT:
+                record[field] = self.pool.values[code]
+        return record
+
+    def __iter__(self):
+        for index in range(len(self.dates)):
+            yield self[index]
+
+    def __setitem__(self, index, record):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment is not supported")
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("event index out of range")
+        self._store(index, self._encode(record), insert=False)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            for i in sorted(range(*index.indices(len(self))), reverse=True):
+                del self[i]
+            return
+        if index < 0:
+            index += len(self)
+        del self.dates[index]
+        if self.has_height:
+            del self.heights[index]
+        for column in self.columns.values():
+            del column[index]
+
+    def insert(self, index, record):
+        length = len(self)
+        if index < 0:
+            index = max(0, index + length)
+        self._store(min(index, length), self._encode(record), insert=True)
+
+    def sort(self, key=None, reverse=False):
+        """Sort in place; sorting by date uses the date column without building records"""
+        if key is None or key is event_date:
+            order = sorted(range(len(self)), key=self.dates.__getitem__, reverse=reverse)
+        else:
+            records = [self[i] for i in range(len(self))]
+            order = sorted(range(len(self)), key=lambda i: key(records[i]), reverse=reverse)
+        self.dates = array("q", (self.dates[i] for i in order))
+        if self.has_height:
+            self.heights = array("d", (self.heights[i] for i in order))
+        for field, column in self.columns.items():
+            self.columns[field] = array("I", (column[i] for i in order))
+
+    def date_strings(self):
+        """Dates of all events without materializing the records"""
+        return [minutes_to_date(minutes) for minutes in self.dates]
+
+    def __eq__(self, other):
+        if isinstance(other, (list, CompactEventList)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return f"CompactEventList({len(self)} events, fields={['date', *self.fields]})"
+
+
+def compact_cactuses(cactuses, event_types, pool=None):
+    """Replace event lists of every cactus with CompactEventList columns in place"""
+    pool = pool or StringPool()
+    for cactus_data in cactuses.values():
+        for key, value in list(cactus_data.items()):
+            if isinstance(value, str):
+                cactus_data[key] = sys.intern(value)
+        for event_type in event_types:
+            events = cactus_data.get(event_type)
+            if isinstance(events, list):
+                cactus_data[event_type] = CompactEventList(pool, events)
+    return pool
+
+
+def expand_cactuses(cactuses, event_types):
+    """Turn CompactEventList columns back into plain lists of dicts in place"""
+    for cactus_data in cactuses.values():
+        for event_type in event_types:
+            events = cactus_data.get(event_type)
+            if isinstance(events, CompactEventList):
+                cactus_data[event_type] = list(events)
+
+
+def json_default(obj):
+    """json.dump hook that writes compact histories as plain lists"""
+    if isinstance(obj, CompactEventList):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate memory used by an object graph, counting shared objects once"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, CompactEventList):
+        size += deep_sizeof(obj.dates, seen) + deep_sizeof(obj.heights, seen) + deep_sizeof(obj.columns, seen)
+        size += deep_sizeof(obj.fields, seen)
+    elif isinstance(obj, StringPool):
+        size += deep_sizeof(obj.values, seen) + deep_sizeof(obj.codes, seen)
+    return size
+
+
+def memory_report(cactuses, event_types):
+    """Compare bytes per event of the plain and the compact representation of event histories
+
+    The plain side is measured on the current data (expanded if needed); the compact side on
+    a compact copy, including the shared string pool.
+    """
+    plain = {name: {t: list(c[t]) for t in event_types if t in c} for name, c in cactuses.items()}
+    events = sum(len(events) for histories in plain.values() for events in histories.values())
+    compact = {name: dict(histories) for name, histories in plain.items()}
+    pool = compact_cactuses(compact, event_types)
+    plain_bytes = deep_sizeof(plain)
+    compact_bytes = deep_sizeof(compact) + deep_sizeof(pool)
+    return {
+        "events": events,
+        "plain_bytes": plain_bytes,
+        "compact_bytes": compact_bytes,
+        "plain_bytes_per_event": plain_bytes / events if events else 0.0,
+        "compact_bytes_per_event": compact_bytes / events if events else 0.0,
+        "distinct_values": len(pool.values) - 1
+    }
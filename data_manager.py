@@ -1,27 +1,63 @@
-import json
 import os
 import csv
 import shutil
-from datetime import datetime, date
-from tkinter import filedialog, messagebox
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
-from reportlab.lib.styles import getSampleStyleSheet
+from bisect import bisect_right
+from datetime import datetime, date, timedelta
+from utils import DATE_FORMAT, normalize_event_date
+from bulk_operations import BulkOperationsEngine
+from watering_calendar import SeasonModel
+from compact_model import compact_cactuses, memory_report
+from rollups import RollupManager
+from storage import read_data, write_data
+from indexed_store import LazyCactuses
+from sync import CollectionSync, STAMP_FORMAT, stamp
+from event_index import EventIndex, new_event_id
+from archive import HistoryArchive
+
+EVENT_TYPES = ("watering", "growth", "photos", "fertilizers")
+
 
 class DataManager:
-    def __init__(self, data_file):
+    def __init__(self, data_file, season_model=None, compact=False, file_format=None, lazy=True):
         self.data_file = data_file
+        # On-disk format used by save_data; None keeps the format the file was loaded in
+        self.file_format = file_format
+        self.loaded_format = None
+        # Keep event histories in columnar form to cut memory use on large collections
+        self.compact = compact
+        # Decode the cactuses of an "indexed" file one by one as they are accessed
+        self.lazy = lazy
         self.data = {}
+        self.season_model = season_model or SeasonModel()
+        self.bulk_operations = BulkOperationsEngine(self)
+        self.rollups = RollupManager(self, EVENT_TYPES)
+        self.events = EventIndex(self, EVENT_TYPES)
+        # Per-year files holding events older than the hot window, read back on demand
+        self.archive = HistoryArchive(self, EVENT_TYPES)
+        # Callables notified as listener(cactus_name, event_type, record) after add_event
+        self.listeners = []
+        # Month digests of the histories for syncing copies, kept current by the listeners
+        self.sync = CollectionSync(self, EVENT_TYPES)
         self.load_data()
 
     def load_data(self):
         """Load data from JSON file"""
+        # Undo entries reference records of the previously loaded data
+        self.bulk_operations.undo_log.clear()
+        self.rollups.invalidate()
+        self.events.invalidate()
+        self.sync.invalidate()
+        self.archive.reset()
+        self.release()
+        # Only write back when defaults were filled in, so read-only use never rewrites the file
+        changed = True
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r', encoding='utf-8') as f:
-                    self.data = json.load(f)
+                self.data, self.loaded_format = read_data(self.data_file, EVENT_TYPES, self.compact, self.lazy)
+                changed = self.file_format not in (None, self.loaded_format)
                 if "cactuses" not in self.data:
                     self.data["cactuses"] = {}
+                    changed = True
                 if "achievements" not in self.data:
                     self.data["achievements"] = {
                         "stable_watering": {"completed": False, "days": 0},
@@ -29,18 +65,50 @@ class DataManager:
                         "repotting_master": {"completed": False, "repottings": 0},
                         "growth_master": {"completed": False, "growths": {}}
                     }
-                for cactus in self.data["cactuses"].values():
-                    if "notes" not in cactus:
-                        cactus["notes"] = ""
-                    if "next_repotting" not in cactus:
-                        cactus["next_repotting"] = None
-                    if "fertilizers" not in cactus:
-                        cactus["fertilizers"] = []
-            except json.JSONDecodeError:
+                    changed = True
+                cactuses = self.data["cactuses"]
+                if isinstance(cactuses, LazyCactuses):
+                    # Defaults are filled in as records are decoded and written with the next save
+                    cactuses.on_load = self._fill_defaults
+                else:
+                    for cactus in cactuses.values():
+                        changed |= self._fill_defaults(cactus)
+                    if self.compact:
+                        compact_cactuses(cactuses, EVENT_TYPES)
+            except ValueError:
                 self.initialize_default_data()
         else:
             self.initialize_default_data()
-        self.save_data()
+        if changed:
+            self.save_data()
+        self.archive.roll()
+
+    @staticmethod
+    def _fill_defaults(cactus):
+        """Add fields missing from records written by older versions; return True if any were"""
+        changed = False
+        if "notes" not in cactus:
+            cactus["notes"] = ""
+            changed = True
+        if "next_repotting" not in cactus:
+            cactus["next_repotting"] = None
+            changed = True
+        if "fertilizers" not in cactus:
+            cactus["fertilizers"] = []
+            changed = True
+        return changed
+
+    def load_all(self):
+        """Decode every cactus of a lazily loaded file, for code that walks the whole collection"""
+        cactuses = self.data["cactuses"]
+        if isinstance(cactuses, LazyCactuses):
+            cactuses.load_all()
+
+    def release(self):
+        """Unmap a lazily loaded data file; the data is unusable until load_data"""
+        cactuses = self.data.get("cactuses")
+        if isinstance(cactuses, LazyCactuses):
+            cactuses.source.close()
 
     def initialize_default_data(self):
         """Initialize default data structure"""
@@ -55,34 +123,30 @@ class DataManager:
         }
 
     def save_data(self):
-        """Save data to JSON file"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
-
-    def export_data(self, parent):
-        """Export data to CSV or PDF"""
-        formats = [("CSV файл (*.csv)", "*.csv"), ("PDF файл (*.pdf)", "*.pdf")]
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=formats,
-            initialfile="cactus_data_export"
-        )
-        if not file_path:
-            return
+        """Save data in the configured format (pretty-printed JSON by default)"""
+        write_data(self.data_file, self.archive.hot_data(), EVENT_TYPES, self.file_format or self.loaded_format or "json")
 
-        if file_path.endswith(".csv"):
+    def memory_report(self):
+        """Bytes per event of the event histories as plain dicts and in compact form"""
+        return memory_report(self.data["cactuses"], EVENT_TYPES)
+
+    def export_data(self, file_path):
+        """Export data to CSV or PDF, chosen by the file extension"""
+        self.archive.ensure_loaded()
+        if file_path.lower().endswith(".csv"):
             self.export_to_csv(file_path)
-        elif file_path.endswith(".pdf"):
+        elif file_path.lower().endswith(".pdf"):
             self.export_to_pdf(file_path)
-
-        messagebox.showinfo("Успех", f"Данные экспортированы в {file_path}")
+        else:
+            raise ValueError(f"Unsupported export format: {file_path}")
+        return file_path
 
     def export_to_csv(self, file_path):
         """Export data to CSV"""
         with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(["Имя кактуса", "Частота полива (дней)", "Последний полив", "Рост (см)", "Фото", "Заметки",
-                             "Следующая пересадка", "Подкормки"])
+                             "Следующая пересадка", "Подкормки", "Всего поливов", "Максимальная высота (см)"])
 
             for cactus_name, cactus_data in self.data["cactuses"].items():
                 last_watering = cactus_data["watering"][-1]["date"] if cactus_data["watering"] else "Нет данных"
@@ -90,11 +154,18 @@ class DataManager:
                 photos = "; ".join([p["date"] + " - " + p["path"] for p in cactus_data["photos"]]) or "Нет данных"
                 next_repotting = cactus_data["next_repotting"] or "Не установлено"
                 fertilizers = "; ".join([f"{f['date']} - {f['type']} ({f['dosage']})" for f in cactus_data["fertilizers"]]) or "Нет данных"
+                totals = self.rollups.totals(cactus_name)
                 writer.writerow([cactus_name, cactus_data["watering_frequency"], last_watering, growth, photos,
-                                 cactus_data["notes"], next_repotting, fertilizers])
+                                 cactus_data["notes"], next_repotting, fertilizers, totals["watering"],
+                                 totals["max_height"] if totals["max_height"] is not None else "Нет данных"])
 
     def export_to_pdf(self, file_path):
         """Export data to PDF"""
+        # reportlab is only needed here, so the rest of the data layer starts without it
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table
+        from reportlab.lib.styles import getSampleStyleSheet
+
         doc = SimpleDocTemplate(file_path, pagesize=A4)
         styles = getSampleStyleSheet()
         elements = []
@@ -128,79 +199,268 @@ class DataManager:
             elements.append(Paragraph(f"Заметки: {cactus_data['notes'] or 'Нет заметок'}", styles["BodyText"]))
             next_repotting = cactus_data["next_repotting"] or "Не установлено"
             elements.append(Paragraph(f"Следующая пересадка: {next_repotting}", styles["BodyText"]))
+
+            monthly = self.rollups.series(cactus_name, "month")
+            if monthly:
+                summary_data = [["Месяц", "Поливы", "Подкормки", "Высота (см)", "Прирост (см)"]] + [
+                    [start.strftime("%Y-%m"), bucket["watering"], bucket["fertilizers"],
+                     bucket["last_height"] if bucket["last_height"] is not None else "-",
+                     f"{bucket['growth_delta']:+.1f}" if bucket["growth"] else "-"]
+                    for start, bucket in monthly]
+                summary_table = Table(summary_data)
+                summary_table.setStyle([("GRID", (0, 0), (-1, -1), 1, "black")])
+                elements.append(Paragraph("Сводка по месяцам:", styles["BodyText"]))
+                elements.append(summary_table)
             elements.append(Spacer(1, 12))
 
         doc.build(elements)
 
-    def backup_data(self):
-        """Create a backup of the data file"""
-        backup_path = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("JSON файл (*.json)", "*.json")],
-            initialfile=f"cactus_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        )
-        if backup_path:
-            try:
-                shutil.copy(self.data_file, backup_path)
-                messagebox.showinfo("Успех", f"Резервная копия сохранена в {backup_path}")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось создать резервную копию: {str(e)}")
-
-    def restore_data(self):
-        """Restore data from a backup file"""
-        backup_path = filedialog.askopenfilename(
-            filetypes=[("JSON файл (*.json)", "*.json")],
-            title="Выберите файл резервной копии"
-        )
-        if backup_path:
-            try:
-                # Validate the backup file
-                with open(backup_path, 'r', encoding='utf-8') as f:
-                    json.load(f)  # Ensure it's valid JSON
-                shutil.copy(backup_path, self.data_file)
-                self.load_data()  # Reload data
-                messagebox.showinfo("Успех", "Данные восстановлены из резервной копии")
-                return True
-            except json.JSONDecodeError:
-                messagebox.showerror("Ошибка", "Недопустимый файл резервной копии")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Не удалось восстановить данные: {str(e)}")
-        return False
-
-    def get_seasonal_watering_frequency(self, cactus_name, species_db):
-        """Adjust watering frequency based on current season"""
-        cactus_data = self.data["cactuses"].get(cactus_name, {})
-        species = cactus_data.get("species", "Не указан")
-        species_data = species_db.get_species_data(species)
-        base_frequency = cactus_data.get("watering_frequency", species_data.get("watering_frequency", 14))
-
-        # Determine current season based on month
-        month = date.today().month
-        if month in [12, 1, 2]:  # Winter
-            return int(base_frequency * 1.5)  # Increase interval (less frequent)
-        elif month in [6, 7, 8]:  # Summer
-            return int(base_frequency * 0.7)  # Decrease interval (more frequent)
-        else:  # Spring and Autumn
-            return base_frequency
-
-    def bulk_add_watering(self, cactus_names, comment=""):
+    def backup_data(self, backup_path):
+        """Copy the data file to backup_path, and its archive directory next to the backup"""
+        shutil.copy(self.data_file, backup_path)
+        self._copy_archive(self.archive.directory(), self.archive.directory(backup_path))
+        return backup_path
+
+    def restore_data(self, backup_path):
+        """Replace the data file with a backup and reload it; an unreadable backup raises ValueError"""
+        read_data(backup_path, EVENT_TYPES)  # Ensure it's valid before overwriting anything
+        self.release()
+        try:
+            shutil.copy(backup_path, self.data_file)
+            self._copy_archive(self.archive.directory(backup_path), self.archive.directory())
+        finally:
+            self.load_data()
+        return True
+
+    @staticmethod
+    def _copy_archive(source, target):
+        """Replace the archive directory target by a copy of source, if source exists"""
+        if not os.path.isdir(source) or os.path.abspath(source) == os.path.abspath(target):
+            return
+        if os.path.isdir(target):
+            shutil.rmtree(target)
+        shutil.copytree(source, target)
+
+    def merge_data(self, other_file):
+        """Two-way sync with another copy of the data file; both end up with the union of changes
+
+        Return (names changed here, names changed in other_file).
+        """
+        if not os.path.exists(other_file):
+            raise FileNotFoundError(other_file)
+        other = DataManager(other_file, self.season_model)
+        return self.sync.merge_with(other)
+
+    def set_field(self, cactus_name, field, value, save=True):
+        """Change a scalar field of a cactus (frequency, notes, species...) and stamp the change"""
+        cactus_data = self.data["cactuses"][cactus_name]
+        cactus_data[field] = value
+        stamp(cactus_data, field)
+        if save:
+            self.save_data()
+
+    def clear_field(self, cactus_name, field, save=True):
+        """Remove a scalar field of a cactus, so defaults (species frequency...) apply again"""
+        cactus_data = self.data["cactuses"][cactus_name]
+        cactus_data.pop(field, None)
+        stamp(cactus_data, field)
+        if save:
+            self.save_data()
+
+    def get_seasonal_watering_frequency(self, cactus_name, species_db, on_date=None):
+        """Adjust watering frequency based on the season of on_date (today by default)"""
+        base_frequency = self.get_base_watering_frequency(cactus_name, species_db)
+        return self.season_model.watering_interval(base_frequency, on_date or date.today())
+
+    def cactus_summary(self, cactus_name):
+        """Read-only view of a cactus that is enough for due dates and reminders
+
+        For a record of a lazily loaded file that was not decoded yet, this is the stand-in
+        from the file header (LazyCactuses.summary) instead of the decoded record.
+        """
+        cactuses = self.data["cactuses"]
+        if isinstance(cactuses, LazyCactuses):
+            return cactuses.summary(cactus_name)
+        return cactuses[cactus_name]
+
+    def next_watering(self, cactus_name, species_db):
+        """When a cactus is due for watering next, or None if it was never watered
+
+        The interval is the seasonal frequency on the day of the last watering. Every due date
+        (the due list, reminders, the profile, the calendar) follows this one rule, so a plant is
+        never due in one place and not yet due in another around a season change.
+        """
+        cactus_data = self.cactus_summary(cactus_name)
+        # Archived dates are kept with the archive settings, so no year file is read here
+        last_watering = cactus_data["watering"][-1]["date"] if cactus_data["watering"] else \
+            self.archive.last_archived(cactus_name, "watering")
+        if not last_watering:
+            return None
+        last_watering = datetime.strptime(last_watering, DATE_FORMAT)
+        frequency = self.get_seasonal_watering_frequency(cactus_name, species_db, last_watering.date())
+        return last_watering + timedelta(days=frequency)
+
+    def get_base_watering_frequency(self, cactus_name, species_db):
+        """Watering frequency set for the plant, or its species default"""
+        cactus_data = self.cactus_summary(cactus_name) if cactus_name in self.data["cactuses"] else {}
+        if "watering_frequency" in cactus_data:
+            return cactus_data["watering_frequency"]
+        species_data = species_db.get_species_data(cactus_data.get("species", "Не указан"))
+        return species_data.get("watering_frequency", 14)
+
+    def bulk_add_watering(self, cactus_names, comment="", date=None):
         """Add watering record for multiple cactuses"""
-        for name in cactus_names:
-            watering = {
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "comment": comment
-            }
-            self.data["cactuses"][name]["watering"].append(watering)
-        self.save_data()
+        return self.bulk_operations.apply("watering", cactus_names, comment=comment, date=date)
 
-    def bulk_add_fertilizer(self, cactus_names, fertilizer_type, dosage, comment=""):
+    def bulk_add_fertilizer(self, cactus_names, fertilizer_type, dosage, comment="", date=None):
         """Add fertilizer record for multiple cactuses"""
-        for name in cactus_names:
-            fertilizer = {
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "type": fertilizer_type,
-                "dosage": dosage,
-                "comment": comment
-            }
-            self.data["cactuses"][name]["fertilizers"].append(fertilizer)
-        self.save_data()
\ No newline at end of file
+        return self.bulk_operations.apply("fertilizer", cactus_names, fertilizer_type=fertilizer_type,
+                                          dosage=dosage, comment=comment, date=date)
+
+    def bulk_apply(self, operation, cactus_names, **params):
+        """Apply a bulk operation atomically with a single save; see BulkOperationsEngine"""
+        return self.bulk_operations.apply(operation, cactus_names, **params)
+
+    def undo_last_bulk(self):
+        """Revert the most recent bulk operation"""
+        return self.bulk_operations.undo()
+
+    def add_event(self, cactus_name, event_type, record, save=True):
+        """Add an event record to a cactus history, keeping the list sorted by date"""
+        if event_type not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event_type}")
+        record["date"] = normalize_event_date(record.get("date"))
+        self._insert_event(cactus_name, event_type, record)
+        self.rollups.record(cactus_name, event_type, record)
+        if save:
+            self.save_data()
+        for listener in self.listeners:
+            listener(cactus_name, event_type, record)
+        return record
+
+    def _insert_event(self, cactus_name, event_type, record):
+        events = self.data["cactuses"][cactus_name][event_type]
+        self.events.forget_run(cactus_name, event_type, record["date"])
+        if events and events[-1]["date"] > record["date"]:
+            events.insert(bisect_right(events, record["date"], key=lambda e: e["date"]), record)
+        else:
+            events.append(record)
+        self.events.register_run(cactus_name, event_type, record["date"])
+
+    def _take_event(self, event_id):
+        """Remove an event from its history; return (cactus name, event type, record)"""
+        location = self.events.locate(event_id)
+        if location is None:
+            raise KeyError(event_id)
+        cactus_name, event_type, position = location
+        events = self.data["cactuses"][cactus_name][event_type]
+        record = events[position]
+        self.events.forget_run(cactus_name, event_type, record["date"])
+        if "id" not in record:
+            self._pin_duplicates(cactus_name, event_type, position)
+        del events[position]
+        self.events.register_run(cactus_name, event_type, record["date"])
+        self.rollups.invalidate(cactus_name)
+        return cactus_name, event_type, record
+
+    def _pin_duplicates(self, cactus_name, event_type, position):
+        """Give stored ids to the events identical to the one at position before it is taken
+
+        Identical events are told apart only by their order ("#1", "#2"...), so taking one would
+        pass its id on to the next sibling, and its tombstone would then delete that survivor on other
+        copies. Each sibling is re-identified like an edited event: a new stored id, and its old
+        id deleted, so other copies swap their version for this one.
+        """
+        events = self.data["cactuses"][cactus_name][event_type]
+        start, ids = self.events._run(cactus_name, event_type, events[position]["date"])
+        base = ids[position - start].split("#")[0]
+        for index, event_id in enumerate(ids, start):
+            if index > position and event_id.split("#")[0] == base and "id" not in events[index]:
+                events[index] = dict(events[index], id=new_event_id())
+                self._mark_deleted(cactus_name, event_type, event_id)
+
+    def _mark_deleted(self, cactus_name, event_type, event_id):
+        # Tombstones let sync remove the event from other copies instead of bringing it back
+        deleted = self.data["cactuses"][cactus_name].setdefault("deleted", {}).setdefault(event_type, {})
+        deleted[event_id] = datetime.now().strftime(STAMP_FORMAT)
+
+    def event_ids(self, cactus_name, event_type):
+        """Stable ids of a history list, parallel to the list"""
+        return self.events.ids(cactus_name, event_type)
+
+    def get_event(self, event_id):
+        """Return (cactus name, event type, record) of an event; unknown ids raise KeyError"""
+        location = self.events.locate(event_id)
+        if location is None:
+            raise KeyError(event_id)
+        cactus_name, event_type, position = location
+        return cactus_name, event_type, self.data["cactuses"][cactus_name][event_type][position]
+
+    def update_event(self, event_id, changes, save=True):
+        """Change fields of an event, keeping its history sorted; return the updated record
+
+        An event whose id was derived from its content gets a stored id here, so it keeps its
+        identity once the content changes.
+        """
+        changes = dict(changes)
+        if "id" in changes:
+            raise ValueError("Event id cannot be changed")
+        if "date" in changes:
+            changes["date"] = normalize_event_date(changes["date"])
+        if "height" in changes:
+            changes["height"] = float(changes["height"])
+        cactus_name, event_type, record = self._take_event(event_id)
+        record = dict(record, **changes)
+        if "id" not in record:
+            self._mark_deleted(cactus_name, event_type, event_id)
+            record["id"] = new_event_id()
+        record["modified"] = datetime.now().strftime(STAMP_FORMAT)
+        self._insert_event(cactus_name, event_type, record)
+        if save:
+            self.save_data()
+        for listener in self.listeners:
+            listener(cactus_name, event_type, record)
+        return record
+
+    def delete_event(self, event_id, save=True):
+        """Delete an event from its history; return the removed record"""
+        cactus_name, event_type, record = self._take_event(event_id)
+        self._mark_deleted(cactus_name, event_type, event_id)
+        if save:
+            self.save_data()
+        for listener in self.listeners:
+            listener(cactus_name, event_type, record)
+        return record
+
+    def move_event(self, event_id, target_cactus, save=True):
+        """Move an event to another cactus, keeping its id; return the moved record"""
+        if target_cactus not in self.data["cactuses"]:
+            raise ValueError(f"Unknown cactus: {target_cactus}")
+        cactus_name, event_type, record = self._take_event(event_id)
+        self._mark_deleted(cactus_name, event_type, event_id)
+        record = dict(record)
+        record.setdefault("id", new_event_id())
+        record["modified"] = datetime.now().strftime(STAMP_FORMAT)
+        self.data["cactuses"][target_cactus].get("deleted", {}).get(event_type, {}).pop(record["id"], None)
+        self._insert_event(target_cactus, event_type, record)
+        self.rollups.invalidate(target_cactus)
+        if save:
+            self.save_data()
+        for listener in self.listeners:
+            listener(cactus_name, event_type, record)
+            listener(target_cactus, event_type, record)
+        return record
+
+    def get_due_cactuses(self, species_db, now=None):
+        """Return (name, days overdue) for cactuses whose seasonal watering is due"""
+        now = now or datetime.now()
+        due = []
+        for name in self.data["cactuses"]:
+            next_watering = self.next_watering(name, species_db)
+            if next_watering is None:
+                due.append((name, None))
+                continue
+            overdue = (now - next_watering).days
+            if overdue >= 0:
+                due.append((name, overdue))
+        return due
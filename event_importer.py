@@ -0,0 +1,236 @@
+import csv
+import json
+import os
+from itertools import islice
+from data_manager import EVENT_TYPES
+from utils import event_date, normalize_event_date
+
+# Aliases accepted in the "type" column of import files
+TYPE_ALIASES = {
+    "watering": "watering", "полив": "watering",
+    "growth": "growth", "рост": "growth",
+    "photo": "photos", "photos": "photos", "фото": "photos",
+    "fertilizer": "fertilizers", "fertilizers": "fertilizers", "подкормка": "fertilizers"
+}
+
+
+def event_key(event_type, record):
+    """Identity of an event used for deduplication"""
+    if event_type == "growth":
+        return record["date"], float(record["height"])
+    if event_type == "photos":
+        return record["date"], record["path"]
+    if event_type == "fertilizers":
+        return record["date"], record["type"], record["dosage"]
+    return record["date"], record.get("comment", "")
+
+
+def text_value(value):
+    """Stripped text of a field; numbers from NDJSON become strings, objects and lists raise ValueError"""
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        raise ValueError(f"ожидается строка, получено {value!r}")
+    return str(value).strip()
+
+
+def iter_csv_rows(file_path):
+    """Yield rows of a CSV file as dicts, one at a time"""
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [column.strip().lower() for column in next(reader, [])]
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def iter_ndjson_rows(file_path):
+    """Yield objects of a newline-delimited JSON file, one at a time"""
+    with open(file_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield ValueError(f"Invalid JSON: {e.msg}")
+
+
+class ImportReport:
+    """Summary of an import run (or of what a dry run would change)"""
+
+    MAX_ERRORS = 20
+
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.rows = 0
+        self.added = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.unknown_cactuses = {}
+        self.added_by_cactus = {}
+        self.errors = []
+        self.first_date = None
+        self.last_date = None
+        self.batches = 0
+
+    def error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(f"Строка {line}: {message}")
+
+    def summary(self):
+        """Return a human-readable report"""
+        lines = [
+            "Пробный импорт (изменения не сохранены)" if self.dry_run else "Импорт завершён",
+            f"Обработано строк: {self.rows}",
+            f"{'Будет добавлено' if self.dry_run else 'Добавлено'} событий: {self.added}",
+            f"Дубликатов пропущено: {self.duplicates}",
+            f"Ошибочных строк: {self.invalid}",
+        ]
+        if self.first_date:
+            lines.append(f"Период: {self.first_date} — {self.last_date}")
+        for name, counts in sorted(self.added_by_cactus.items()):
+            details = ", ".join(f"{event_type}: {count}" for event_type, count in sorted(counts.items()))
+            lines.append(f"  {name}: {details}")
+        if self.unknown_cactuses:
+            lines.append("Неизвестные кактусы: " + ", ".join(
+                f"{name} ({count})" for name, count in sorted(self.unknown_cactuses.items())))
+        lines.extend(self.errors)
+        return "\n".join(lines)
+
+
+class EventImporter:
+    """Stream historical watering/growth/photo/fertilizer events from CSV or NDJSON into DataManager"""
+
+    def __init__(self, data_manager, batch_size=100000):
+        self.data_manager = data_manager
+        self.batch_size = batch_size
+        self._known_keys = {}
+
+    def import_file(self, file_path, file_format=None, dry_run=False, default_type="watering"):
+        """Import events from a file; the format is detected from the extension if not given"""
+        if file_format is None:
+            file_format = "csv" if os.path.splitext(file_path)[1].lower() == ".csv" else "ndjson"
+        rows = iter_csv_rows(file_path) if file_format == "csv" else iter_ndjson_rows(file_path)
+        return self.import_rows(rows, dry_run, default_type)
+
+    def import_rows(self, rows, dry_run=False, default_type="watering"):
+        """Import an iterable of row dicts in batches with one save per batch"""
+        report = ImportReport(dry_run)
+        self._known_keys = {}
+        rows = enumerate(rows, start=1)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            pending = {}
+            for line, row in batch:
+                report.rows += 1
+                parsed = self.parse_row(row, line, report, default_type)
+                if parsed is None:
+                    continue
+                name, event_type, record = parsed
+                key = event_key(event_type, record)
+                known = self._existing_keys(name, event_type)
+                if key in known:
+                    report.duplicates += 1
+                    continue
+                known.add(key)
+                pending.setdefault((name, event_type), []).append(record)
+                report.added += 1
+                counts = report.added_by_cactus.setdefault(name, {})
+                counts[event_type] = counts.get(event_type, 0) + 1
+                if report.first_date is None or record["date"] < report.first_date:
+                    report.first_date = record["date"]
+                if report.last_date is None or record["date"] > report.last_date:
+                    report.last_date = record["date"]
+            if pending and not dry_run:
+                self.commit_batch(pending)
+                report.batches += 1
+        self._known_keys = {}
+        return report
+
+    def commit_batch(self, pending):
+        """Merge a batch of new records into the histories, persist once and notify the listeners"""
+        cactuses = self.data_manager.data["cactuses"]
+        for (name, event_type), records in pending.items():
+            events = cactuses[name][event_type]
+            self.data_manager.events.invalidate(name)
+            self.data_manager.rollups.invalidate(name)
+            needs_sort = (events and records[0]["date"] < events[-1]["date"]) or any(
+                records[i]["date"] > records[i + 1]["date"] for i in range(len(records) - 1))
+            events.extend(records)
+            if needs_sort:
+                # Stable sort keeps same-minute events in insertion order
+                events.sort(key=event_date)
+        self.data_manager.save_data()
+        # One notification per history is enough: listeners re-read the cactus they are told about
+        for (name, event_type), records in pending.items():
+            for listener in self.data_manager.listeners:
+                listener(name, event_type, max(records, key=event_date))
+
+    def parse_row(self, row, line, report, default_type):
+        """Validate and normalize a row into (cactus name, event type, record)"""
+        if isinstance(row, Exception):
+            report.error(line, str(row))
+            return None
+        if not isinstance(row, dict):
+            report.error(line, "ожидается объект")
+            return None
+        try:
+            name = text_value(row.get("cactus") or row.get("name"))
+        except ValueError as e:
+            report.error(line, f"некорректное имя кактуса: {e}")
+            return None
+        if name not in self.data_manager.data["cactuses"]:
+            report.unknown_cactuses[name] = report.unknown_cactuses.get(name, 0) + 1
+            report.invalid += 1
+            return None
+        event_type = TYPE_ALIASES.get(str(row.get("type") or default_type).strip().lower())
+        if event_type not in EVENT_TYPES:
+            report.error(line, f"неизвестный тип события {row.get('type')!r}")
+            return None
+        if not row.get("date"):
+            report.error(line, "не указана дата")
+            return None
+        try:
+            record = {"date": normalize_event_date(row["date"])}
+        except (ValueError, TypeError):
+            report.error(line, f"некорректная дата {row['date']!r}")
+            return None
+
+        if event_type == "growth":
+            try:
+                record["height"] = float(row.get("height"))
+            except (TypeError, ValueError):
+                report.error(line, f"некорректный рост {row.get('height')!r}")
+                return None
+        try:
+            if event_type == "photos":
+                path = text_value(row.get("path"))
+                if not path:
+                    report.error(line, "не указан путь к фото")
+                    return None
+                record["path"] = path
+            elif event_type == "fertilizers":
+                fertilizer_type = text_value(row.get("fertilizer_type"))
+                dosage = text_value(row.get("dosage"))
+                if not fertilizer_type or not dosage:
+                    report.error(line, "не указан тип удобрения или дозировка")
+                    return None
+                record["type"] = fertilizer_type
+                record["dosage"] = dosage
+            if event_type != "photos":
+                record["comment"] = text_value(row.get("comment"))
+        except ValueError as e:
+            report.error(line, str(e))
+            return None
+        return name, event_type, record
+
+    def _existing_keys(self, name, event_type):
+        keys = self._known_keys.get((name, event_type))
+        if keys is None:
+            keys = {event_key(event_type, record)
+                    for record in self.data_manager.data["cactuses"][name][event_type]}
+            self._known_keys[(name, event_type)] = keys
+        return keys
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import uuid
+from bisect import bisect_left
+from compact_model import json_default
+from utils import event_date
+
+
+def new_event_id():
+    """Random id stored in an event the first time it is edited or moved"""
+    return uuid.uuid4().hex[:16]
+
+
+def derived_id(cactus_name, event_type, record):
+    """Id of an event without a stored one: a hash of where it is and what it says
+
+    Two copies of the data file derive the same id for the same event, so events never need
+    an id written to disk until they are edited.
+    """
+    text = json.dumps([cactus_name, event_type, record], sort_keys=True, ensure_ascii=False,
+                      separators=(",", ":"), default=json_default)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def list_ids(cactus_name, event_type, events):
+    """Ids of an event list in list order
+
+    Identical records without a stored id get "#1", "#2"... appended, so repeated entries stay
+    distinct. Identical records share a date, so the suffixes only depend on same-date runs.
+    """
+    ids = []
+    seen = {}
+    for record in events:
+        event_id = record.get("id")
+        if event_id is None:
+            base = derived_id(cactus_name, event_type, record)
+            count = seen.get(base, 0)
+            seen[base] = count + 1
+            event_id = f"{base}#{count}" if count else base
+        ids.append(event_id)
+    return ids
+
+
+class EventIndex:
+    """Map event ids to their cactus, event type and date
+
+    Loading a collection does no per-event work: a cactus is indexed the first time one of its
+    ids is asked for. A lookup is then a dict hit plus a bisect on the date-sorted history to
+    the run of same-minute events holding the id. Once every cactus is indexed, an unknown id
+    is a dict miss plus a check that no indexed cactus was removed.
+    """
+
+    def __init__(self, data_manager, event_types):
+        self.data_manager = data_manager
+        self.event_types = event_types
+        self._locations = {}
+        self._ids_by_cactus = {}
+
+    def invalidate(self, cactus_name=None):
+        """Forget the ids of one cactus, or of all cactuses, after their lists changed outside the index"""
+        if cactus_name is None:
+            self._locations.clear()
+            self._ids_by_cactus.clear()
+            return
+        for event_id in self._ids_by_cactus.pop(cactus_name, ()):
+            self._locations.pop(event_id, None)
+
+    def _index_cactus(self, cactus_name):
+        cactus_data = self.data_manager.data["cactuses"][cactus_name]
+        known = self._ids_by_cactus[cactus_name] = set()
+        for event_type in self.event_types:
+            events = cactus_data.get(event_type, ())
+            for event_id, record in zip(list_ids(cactus_name, event_type, events), events):
+                self._locations[event_id] = (cactus_name, event_type, record["date"])
+                known.add(event_id)
+
+    def ids(self, cactus_name, event_type):
+        """Ids of a history list, parallel to the list"""
+        if cactus_name not in self._ids_by_cactus:
+            self._index_cactus(cactus_name)
+        return list_ids(cactus_name, event_type, self.data_manager.data["cactuses"][cactus_name][event_type])
+
+    def id_at(self, cactus_name, event_type, position):
+        """Id of the event at a position of a history list, hashing only its same-date run"""
+        events = self.data_manager.data["cactuses"][cactus_name][event_type]
+        start, ids = self._run(cactus_name, event_type, events[position]["date"])
+        return ids[position - start]
+
+    def _run(self, cactus_name, event_type, date):
+        """(start, ids) of the events of a list dated exactly date"""
+        events = self.data_manager.data["cactuses"][cactus_name][event_type]
+        start = bisect_left(events, date, key=event_date)
+        end = start
+        while end < len(events) and events[end]["date"] == date:
+            end += 1
+        return start, list_ids(cactus_name, event_type, events[start:end])
+
+    def locate(self, event_id):
+        """Return (cactus name, event type, position) of an event, or None for an unknown id"""
+        if not isinstance(event_id, str) or not event_id:
+            return None
+        cactuses = self.data_manager.data["cactuses"]
+        location = self._locations.get(event_id)
+        if location is None:
+            if len(self._ids_by_cactus) >= len(cactuses):
+                # Drop cactuses removed since they were indexed, so the count is of current ones
+                for name in [name for name in self._ids_by_cactus if name not in cactuses]:
+                    self.invalidate(name)
+            if len(self._ids_by_cactus) >= len(cactuses):
+                return None  # Every cactus is indexed: the id does not exist
+            for name in cactuses:
+                if name not in self._ids_by_cactus:
+                    self._index_cactus(name)
+                    if event_id in self._locations:
+                        break
+            location = self._locations.get(event_id)
+            if location is None:
+                return None
+        found = self._find(event_id, *location)
+        if found is None:
+            # The list was changed behind the index's back; re-index that cactus only and retry
+            cactus_name = location[0]
+            self.invalidate(cactus_name)
+            if cactus_name in cactuses:
+                self._index_cactus(cactus_name)
+                location = self._locations.get(event_id)
+                found = self._find(event_id, *location) if location is not None else None
+        return found
+
+    def _find(self, event_id, cactus_name, event_type, date):
+        if cactus_name not in self.data_manager.data["cactuses"]:
+            return None
+        start, ids = self._run(cactus_name, event_type, date)
+        if event_id not in ids:
+            return None
+        return cactus_name, event_type, start + ids.index(event_id)
+
+    def forget_run(self, cactus_name, event_type, date):
+        """Drop the ids of a same-date run before the run is changed"""
+        known = self._ids_by_cactus.get(cactus_name)
+        if known is None:
+            return
+        for event_id in self._run(cactus_name, event_type, date)[1]:
+            self._locations.pop(event_id, None)
+            known.discard(event_id)
+
+    def register_run(self, cactus_name, event_type, date):
+        """Index the ids of a same-date run after it changed"""
+        known = self._ids_by_cactus.get(cactus_name)
+        if known is None:
+            return
+        for event_id in self._run(cactus_name, event_type, date)[1]:
+            self._locations[event_id] = (cactus_name, event_type, date)
+            known.add(event_id)
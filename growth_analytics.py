@@ -0,0 +1,176 @@
+from datetime import date
+
+SEASONS = ("winter", "spring", "summer", "autumn")
+DAYS_PER_MONTH = 30.0
+
+
+def fit_growth(series, month_seasons, recent_days=90):
+    """Fit growth rates of many plants in one vectorized pass
+
+    series is a list of (day numbers, heights) per plant; month_seasons maps month 1-12 to a
+    season index. Returns per plant: overall least-squares rate, rate per season (from the
+    intervals between measurements, attributed to the season of their midpoint) and the
+    height change over the last recent_days, all in cm per month.
+    """
+    import numpy as np
+
+    counts = np.array([len(days) for days, _ in series], dtype=np.int64)
+    plants = len(series)
+    if not counts.sum():
+        return [{"rate": None, "seasonal": {}, "recent_change": None, "recent_span": 0} for _ in series]
+    group = np.repeat(np.arange(plants), counts)
+    x = np.concatenate([np.asarray(days, dtype=np.float64) for days, _ in series])
+    y = np.concatenate([np.asarray(heights, dtype=np.float64) for _, heights in series])
+
+    # Overall slope per plant: centre x within each plant to keep the sums well conditioned
+    n = counts.astype(np.float64)
+    safe_n = np.maximum(n, 1)
+    mean_x = np.bincount(group, x, plants) / safe_n
+    mean_y = np.bincount(group, y, plants) / safe_n
+    dx = x - mean_x[group]
+    sxx = np.bincount(group, dx * dx, plants)
+    sxy = np.bincount(group, dx * (y - mean_y[group]), plants)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where((n >= 2) & (sxx > 0), sxy / sxx, np.nan) * DAYS_PER_MONTH
+
+    # Interval rates attributed to seasons: sum of height change over sum of days per (plant, season)
+    same_plant = group[1:] == group[:-1]
+    step_days = np.diff(x)[same_plant]
+    step_height = np.diff(y)[same_plant]
+    step_group = group[1:][same_plant]
+    midpoint = (x[1:] + x[:-1])[same_plant] / 2
+    epoch = date(1970, 1, 1).toordinal()
+    months = (midpoint - epoch).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) % 12
+    season_index = np.asarray(month_seasons, dtype=np.int64)[months]
+    cell = step_group * len(SEASONS) + season_index
+    season_days = np.bincount(cell, step_days, plants * len(SEASONS))
+    season_height = np.bincount(cell, step_height, plants * len(SEASONS))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        season_rate = np.where(season_days > 0, season_height / season_days * DAYS_PER_MONTH, np.nan)
+    season_rate = season_rate.reshape(plants, len(SEASONS))
+
+    # Change over the recent window: last height minus the first height inside the window
+    ends = np.cumsum(counts) - 1
+    last_day = np.where(counts > 0, x[np.maximum(ends, 0)], np.nan)
+    in_window = x >= (last_day[group] - recent_days)
+    first_in_window = np.full(plants, np.iinfo(np.int64).max)
+    np.minimum.at(first_in_window, group[in_window], np.flatnonzero(in_window))
+    has_points = counts > 0
+    starts = np.where(has_points, first_in_window, 0)
+    recent_change = np.where(has_points, y[np.maximum(ends, 0)] - y[np.minimum(starts, len(y) - 1)], np.nan)
+    recent_span = np.where(has_points, last_day - x[np.minimum(starts, len(x) - 1)], 0)
+
+    results = []
+    for plant in range(plants):
+        results.append({
+            "rate": None if np.isnan(slope[plant]) else float(slope[plant]),
+            "seasonal": {SEASONS[s]: float(season_rate[plant, s]) for s in range(len(SEASONS))
+                         if not np.isnan(season_rate[plant, s])},
+            "recent_change": None if np.isnan(recent_change[plant]) else float(recent_change[plant]),
+            "recent_span": float(recent_span[plant])
+        })
+    return results
+
+
+class GrowthAnalytics:
+    """Collection-wide growth rates with species comparison and stalled-growth flags
+
+    Fits are cached per cactus and refreshed in one batch only for plants whose growth
+    history changed since the last report. Edits reach the cache through the DataManager
+    listeners; histories replaced wholesale (a reload, a sync) are told apart by identity.
+    """
+
+    STALL_MIN_SPAN = 60  # Days the recent measurements must cover to call growth stalled
+    STALL_THRESHOLD = 0.1  # cm of growth over that window below which growth is stalled
+    OUTLIER_SCORE = 3.5  # Robust z-score versus same-species plants that marks a rate abnormal
+    MIN_PEERS = 3
+
+    def __init__(self, data_manager, species_db, season_model=None):
+        self.data_manager = data_manager
+        self.species_db = species_db
+        self.season_model = season_model or data_manager.season_model
+        self._fits = {}  # Cactus name -> (signature, fit, growth list the fit was made from)
+        data_manager.listeners.append(self._on_event)
+
+    def _on_event(self, cactus_name, event_type, record):
+        if event_type == "growth":
+            self._fits.pop(cactus_name, None)
+
+    def _is_current(self, name, cactus_data):
+        cached = self._fits.get(name)
+        return (cached is not None and cached[2] is cactus_data["growth"]
+                and cached[0] == self._signature(cactus_data))
+
+    def _signature(self, cactus_data):
+        growth = cactus_data["growth"]
+        return len(growth), growth[-1]["date"] if growth else None, self.season_model.signature()
+
+    def refresh(self):
+        """Refit only the cactuses with new or changed measurements; return how many were refit"""
+        self.data_manager.archive.ensure_loaded()  # Rates are fitted over every measurement
+        cactuses = self.data_manager.data["cactuses"]
+        for name in [name for name in self._fits if name not in cactuses]:
+            del self._fits[name]
+        stale = [name for name, cactus_data in cactuses.items() if not self._is_current(name, cactus_data)]
+        if not stale:
+            return 0
+        series = []
+        for name in stale:
+            growth = cactuses[name]["growth"]
+            series.append(([date.fromisoformat(g["date"][:10]).toordinal() for g in growth],
+                           [g["height"] for g in growth]))
+        month_seasons = [SEASONS.index(self.season_model.season_for(date(2001, month, 1)))
+                         for month in range(1, 13)]
+        for name, fit in zip(stale, fit_growth(series, month_seasons)):
+            self._fits[name] = (self._signature(cactuses[name]), fit, cactuses[name]["growth"])
+        return len(stale)
+
+    def species_of(self, cactus_data):
+        species = cactus_data.get("species", "")
+        return self.species_db.catalog.resolve(species) or species or "Не указан"
+
+    def report(self, today=None):
+        """Return per-cactus growth analysis, problems first"""
+        import numpy as np
+
+        self.refresh()
+        today = today or date.today()
+        current_season = self.season_model.season_for(today)
+        cactuses = self.data_manager.data["cactuses"]
+
+        by_species = {}
+        for name, cactus_data in cactuses.items():
+            rate = self._fits[name][1]["rate"]
+            if rate is not None:
+                by_species.setdefault(self.species_of(cactus_data), []).append(rate)
+        peers = {}
+        for species, rates in by_species.items():
+            rates = np.asarray(rates)
+            median = float(np.median(rates))
+            spread = float(np.median(np.abs(rates - median))) * 1.4826
+            peers[species] = (median, spread, len(rates))
+
+        reports = []
+        for name, cactus_data in cactuses.items():
+            fit = self._fits[name][1]
+            species = self.species_of(cactus_data)
+            report = {"cactus": name, "species": species, "rate": fit["rate"], "seasonal": fit["seasonal"],
+                      "species_median": None, "score": None, "flags": []}
+            median, spread, count = peers.get(species, (None, 0.0, 0))
+            if fit["rate"] is not None and count >= self.MIN_PEERS:
+                report["species_median"] = median
+                if spread > 0:
+                    report["score"] = (fit["rate"] - median) / spread
+                    if abs(report["score"]) >= self.OUTLIER_SCORE:
+                        report["flags"].append("slow" if report["score"] < 0 else "fast")
+            if fit["rate"] is not None and fit["rate"] < 0:
+                report["flags"].append("shrinking")
+            # Winter rest is expected, so no growth then is not a problem
+            if (current_season != "winter" and fit["recent_change"] is not None
+                    and fit["recent_span"] >= self.STALL_MIN_SPAN and fit["recent_change"] < self.STALL_THRESHOLD):
+                report["flags"].append("stalled")
+            last = cactus_data["growth"][-1]["date"] if cactus_data["growth"] else None
+            report["last_measurement"] = last
+            reports.append(report)
+        reports.sort(key=lambda r: (not r["flags"], r["cactus"]))
+        return reports
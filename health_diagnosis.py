@@ -1,67 +1,188 @@
-class HealthDiagnosis:
-    def __init__(self):
-        self.diagnosis_db = {
-            "Жёлтые пятна": {
-                "causes": [
-                    "Переувлажнение: Слишком частый полив или плохой дренаж.",
-                    "Солнечный ожог: Слишком интенсивный прямой свет.",
-                    "Недостаток питательных веществ: Отсутствие подкормок."
-                ],
-                "solutions": [
-                    "Уменьшите частоту полива, проверьте дренаж.",
-                    "Переместите кактус в место с рассеянным светом.",
-                    "Добавьте подкормку для кактусов (NPK 5-10-10) раз в месяц."
-                ]
-            },
-            "Мягкость стебля": {
-                "causes": [
-                    "Корневая гниль: Переувлажнение или грибковая инфекция.",
-                    "Недостаток воды: Слишком редкий полив."
-                ],
-                "solutions": [
-                    "Проверьте корни, удалите гниющие части, пересадите в сухую почву.",
-                    "Увеличьте частоту полива, но не допускайте застоя воды."
-                ]
-            },
-            "Отсутствие роста": {
-                "causes": [
-                    "Недостаток света: Слишком тёмное место.",
-                    "Недостаток питательных веществ: Отсутствие удобрений.",
-                    "Период покоя: Нормально для зимнего времени."
-                ],
-                "solutions": [
-                    "Переместите кактус в более светлое место или используйте фитолампу.",
-                    "Подкормите удобрением для кактусов весной или летом.",
-                    "Если зима, подождите до весны, обеспечив прохладную температуру (10-15°C)."
-                ]
-            },
-            "Белый налёт": {
-                "causes": [
-                    "Мучнистый червец: Вредитель на растении.",
-                    "Грибковая инфекция: Высокая влажность и плохая вентиляция."
-                ],
-                "solutions": [
-                    "Обработайте кактус мыльным раствором или инсектицидом, удалите вредителей ватной палочкой.",
-                    "Улучшите вентиляцию, избегайте высокой влажности, обработайте фунгицидом при необходимости."
-                ]
-            }
+import json
+import os
+from datetime import datetime, date
+from utils import DATE_FORMAT
+from watering_calendar import SeasonModel
+
+DEFAULT_KNOWLEDGE_BASE = {
+    "symptoms": {
+        "Жёлтые пятна": {"overwatering": 1.0, "sunburn": 0.9, "nutrient_deficiency": 0.7},
+        "Мягкость стебля": {"root_rot": 1.0, "underwatering": 0.6},
+        "Отсутствие роста": {"low_light": 0.8, "nutrient_deficiency": 0.8, "dormancy": 0.7},
+        "Белый налёт": {"mealybug": 1.0, "fungal_infection": 0.8}
+    },
+    "causes": {
+        "overwatering": {
+            "description": "Переувлажнение: Слишком частый полив или плохой дренаж.",
+            "solutions": ["Уменьшите частоту полива, проверьте дренаж."],
+            "signals": {"frequent_watering": 0.5}
+        },
+        "sunburn": {
+            "description": "Солнечный ожог: Слишком интенсивный прямой свет.",
+            "solutions": ["Переместите кактус в место с рассеянным светом."],
+            "signals": {"summer": 0.3}
+        },
+        "nutrient_deficiency": {
+            "description": "Недостаток питательных веществ: Отсутствие подкормок.",
+            "solutions": ["Добавьте подкормку для кактусов (NPK 5-10-10) раз в месяц весной и летом."],
+            "signals": {"no_recent_fertilizer": 0.5}
+        },
+        "root_rot": {
+            "description": "Корневая гниль: Переувлажнение или грибковая инфекция.",
+            "solutions": ["Проверьте корни, удалите гниющие части, пересадите в сухую почву."],
+            "signals": {"frequent_watering": 0.6}
+        },
+        "underwatering": {
+            "description": "Недостаток воды: Слишком редкий полив.",
+            "solutions": ["Увеличьте частоту полива, но не допускайте застоя воды."],
+            "signals": {"overdue_watering": 0.6}
+        },
+        "low_light": {
+            "description": "Недостаток света: Слишком тёмное место.",
+            "solutions": ["Переместите кактус в более светлое место или используйте фитолампу."],
+            "signals": {}
+        },
+        "dormancy": {
+            "description": "Период покоя: Нормально для зимнего времени.",
+            "solutions": ["Если зима, подождите до весны, обеспечив прохладную температуру (10-15°C)."],
+            "signals": {"winter": 0.8}
+        },
+        "mealybug": {
+            "description": "Мучнистый червец: Вредитель на растении.",
+            "solutions": ["Обработайте кактус мыльным раствором или инсектицидом, удалите вредителей ватной палочкой."],
+            "signals": {}
+        },
+        "fungal_infection": {
+            "description": "Грибковая инфекция: Высокая влажность и плохая вентиляция.",
+            "solutions": ["Улучшите вентиляцию, избегайте высокой влажности, обработайте фунгицидом при необходимости."],
+            "signals": {"frequent_watering": 0.3}
         }
+    }
+}
+
+
+class HealthDiagnosis:
+    # Bonus per additional selected symptom explained by the same cause
+    COVERAGE_BONUS = 0.5
+
+    SIGNAL_TEXT = {
+        "frequent_watering": "поливы чаще заданной частоты",
+        "overdue_watering": "полив давно просрочен",
+        "no_recent_fertilizer": "нет подкормок за последние 60 дней",
+        "winter": "зимний период",
+        "summer": "летний период"
+    }
+
+    def __init__(self, diagnosis_file="diagnosis_db.json", season_model=None):
+        self.diagnosis_file = diagnosis_file
+        self.season_model = season_model or SeasonModel()
+        self.load_error = None  # Why the user's knowledge base could not be used, if it could not
+        knowledge_base = self.load_knowledge_base()
+        self.symptom_index = knowledge_base["symptoms"]
+        self.causes = knowledge_base["causes"]
+        self._score_cache = {}
+
+    def load_knowledge_base(self):
+        """Load symptom/cause knowledge base from JSON file
+
+        An unusable file is left untouched: the defaults are used in memory and the reason is
+        kept in load_error.
+        """
+        if os.path.exists(self.diagnosis_file):
+            try:
+                with open(self.diagnosis_file, 'r', encoding='utf-8') as f:
+                    knowledge_base = json.load(f)
+                if isinstance(knowledge_base, dict) and "symptoms" in knowledge_base and "causes" in knowledge_base:
+                    return knowledge_base
+                reason = "нет разделов symptoms и causes"
+            except ValueError as e:
+                reason = str(e)
+            self.load_error = f"База диагностики {self.diagnosis_file} не прочитана ({reason}), используется встроенная"
+            return DEFAULT_KNOWLEDGE_BASE
+
+        # Save default knowledge base if file doesn't exist
+        try:
+            with open(self.diagnosis_file, 'w', encoding='utf-8') as f:
+                json.dump(DEFAULT_KNOWLEDGE_BASE, f, ensure_ascii=False, indent=4)
+        except OSError:
+            pass
+        return DEFAULT_KNOWLEDGE_BASE
 
     def get_symptoms(self):
         """Return list of possible symptoms"""
-        return list(self.diagnosis_db.keys())
+        return list(self.symptom_index.keys())
+
+    def score_symptoms(self, symptoms):
+        """Rank causes for a set of symptoms using the symptom-to-cause index (memoized)"""
+        key = frozenset(symptoms)
+        cached = self._score_cache.get(key)
+        if cached is not None:
+            return cached
+        scores = {}
+        explained = {}
+        for symptom in key:
+            for cause, weight in self.symptom_index.get(symptom, {}).items():
+                scores[cause] = scores.get(cause, 0.0) + weight
+                explained.setdefault(cause, []).append(symptom)
+        for cause, matched in explained.items():
+            scores[cause] *= 1 + self.COVERAGE_BONUS * (len(matched) - 1)
+            matched.sort()
+        ranked = [(cause, scores[cause], explained[cause])
+                  for cause in sorted(scores, key=lambda c: (-scores[c], c))]
+        self._score_cache[key] = ranked
+        return ranked
+
+    def history_signals(self, cactus_data, today=None, watering_frequency=None):
+        """Derive care-history signals (watering rhythm, fertilizing, season) for a cactus
+
+        watering_frequency is the plant's seasonal interval (DataManager.get_seasonal_watering_frequency);
+        without it the stored frequency is used.
+        """
+        today = today or date.today()
+        signals = {self.season_model.season_for(today)}
+        if not cactus_data:
+            return signals
+
+        frequency = watering_frequency or cactus_data.get("watering_frequency", 14)
+        watering = cactus_data.get("watering", [])
+        if watering:
+            recent = [datetime.strptime(w["date"], DATE_FORMAT) for w in watering[-6:]]
+            if len(recent) >= 3:
+                mean_interval = (recent[-1] - recent[0]).days / (len(recent) - 1)
+                if mean_interval < frequency * 0.7:
+                    signals.add("frequent_watering")
+            if (datetime.combine(today, datetime.min.time()) - recent[-1]).days > frequency * 1.5:
+                signals.add("overdue_watering")
+        fertilizers = cactus_data.get("fertilizers", [])
+        last_fertilizer = datetime.strptime(fertilizers[-1]["date"], DATE_FORMAT).date() if fertilizers else None
+        if last_fertilizer is None or (today - last_fertilizer).days > 60:
+            signals.add("no_recent_fertilizer")
+        return signals
+
+    def rank_causes(self, symptoms, cactus_data=None, today=None, watering_frequency=None):
+        """Return [(cause id, score, explained symptoms, matched signals)] sorted by score"""
+        signals = self.history_signals(cactus_data, today, watering_frequency)
+        ranked = []
+        for cause, score, explained in self.score_symptoms(symptoms):
+            cause_signals = self.causes.get(cause, {}).get("signals", {})
+            matched = [signal for signal in cause_signals if signal in signals]
+            boost = sum(cause_signals[signal] for signal in matched)
+            ranked.append((cause, score * (1 + boost), explained, matched))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
 
-    def diagnose(self, symptoms):
-        """Diagnose based on selected symptoms"""
-        result = "Результат диагностики:\n\n"
-        for symptom in symptoms:
-            result += f"Симптом: {symptom}\n"
-            data = self.diagnosis_db.get(symptom, {})
-            result += "Возможные причины:\n"
-            for cause in data.get("causes", []):
-                result += f"- {cause}\n"
-            result += "\nРекомендации:\n"
+    def diagnose(self, symptoms, cactus_data=None, watering_frequency=None):
+        """Diagnose based on selected symptoms and, if given, the plant's care history"""
+        lines = ["Результат диагностики:", "", f"Симптомы: {', '.join(symptoms)}", "", "Вероятные причины:"]
+        ranked = self.rank_causes(symptoms, cactus_data, watering_frequency=watering_frequency)
+        total = sum(score for _, score, _, _ in ranked) or 1
+        for position, (cause, score, explained, matched) in enumerate(ranked, start=1):
+            data = self.causes.get(cause, {})
+            lines.append(f"{position}. {data.get('description', cause)} ({score / total:.0%})")
+            lines.append(f"   Объясняет: {', '.join(explained)}")
+            if matched:
+                lines.append(f"   По истории ухода: {', '.join(self.SIGNAL_TEXT.get(s, s) for s in matched)}")
             for solution in data.get("solutions", []):
-                result += f"- {solution}\n"
-            result += "\n"
-        return result
\ No newline at end of file
+                lines.append(f"   - {solution}")
+        lines.append("")
+        return "\n".join(lines)
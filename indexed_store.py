@@ -0,0 +1,229 @@
+import json
+import mmap
+import os
+import threading
+from collections.abc import MutableMapping
+from compact_model import StringPool, compact_cactuses, json_default
+
+INDEXED_MAGIC = b"CACTIDX2"
+# Kept in the header for every cactus, so the care schedule is computed without decoding records
+SUMMARY_FIELDS = ("species", "watering_frequency", "next_repotting")
+SUMMARY_EVENTS = ("watering", "fertilizers")
+
+
+def summarize(cactus_data):
+    """Header summary of a cactus record: its schedule fields and newest event dates"""
+    summary = {field: cactus_data[field] for field in SUMMARY_FIELDS if field in cactus_data}
+    for event_type in SUMMARY_EVENTS:
+        events = cactus_data.get(event_type)
+        summary[event_type] = events[-1]["date"] if events else None
+    return summary
+
+
+class IndexedSource:
+    """Memory-mapped data file in the indexed layout
+
+    Layout: magic, 8-byte header offset, one compact JSON record per cactus, then a JSON
+    header running to the end of the file with everything except the cactus records, an index
+    of [name, offset, length] and a summary per cactus (see summarize). The header comes last
+    so records can be written as they are encoded; offsets count from the first record.
+    lock serializes reads of the mapping with the close/replace/open of a save, which may run
+    while the reminder thread decodes records.
+    """
+
+    def __init__(self, file_path):
+        self.path = os.path.abspath(file_path)
+        self.lock = threading.RLock()
+        self._map = None
+        self.header = {}
+        self.index = {}
+        self.summaries = {}
+        self.open()
+
+    def open(self):
+        """Map the file and read its header; malformed files raise ValueError"""
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(INDEXED_MAGIC) + 8:
+                raise ValueError("Corrupt indexed data file: truncated header")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.base = len(INDEXED_MAGIC) + 8
+            header_offset = int.from_bytes(self._map[len(INDEXED_MAGIC):self.base], "little")
+            if not self.base <= header_offset < size:
+                raise ValueError("header offset out of range")
+            self.header = json.loads(self._map[header_offset:].decode("utf-8"))
+            if not isinstance(self.header.get("data"), dict):
+                raise ValueError("no data in header")
+            self.index = {name: (self.base + offset, length) for name, offset, length in self.header.pop("index")}
+            self.summaries = self.header.pop("summaries")
+        except (ValueError, KeyError, TypeError) as e:
+            self.close()
+            raise ValueError(f"Corrupt indexed data file: {e}")
+        if any(offset + length > header_offset for offset, length in self.index.values()):
+            self.close()
+            raise ValueError("Corrupt indexed data file: record past the header")
+
+    def close(self):
+        """Release the mapping, e.g. before the file is replaced (Windows refuses to replace a mapped file)"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def raw(self, name):
+        """Encoded record of a cactus, straight from the mapping"""
+        with self.lock:
+            offset, length = self.index[name]
+            return self._map[offset:offset + length]
+
+    def decode(self, name):
+        try:
+            return json.loads(self.raw(name).decode("utf-8"))
+        except ValueError as e:
+            raise ValueError(f"Corrupt record of cactus {name!r} in indexed data file: {e}")
+
+
+class LazyCactuses(MutableMapping):
+    """data["cactuses"] of an indexed file: names are known up front, records are decoded on first access
+
+    Names, membership and length never decode anything; a record is parsed the first time it is
+    looked up and then kept. Iterating values() or items() decodes everything, which is the
+    full-load fallback for code that needs the whole collection. on_load, when set, is called as
+    on_load(cactus_data) on each freshly decoded record.
+    """
+
+    def __init__(self, source, names, event_types=(), compact=False):
+        self.source = source
+        self._names = dict.fromkeys(names)
+        self._decoded = {}
+        self.event_types = event_types
+        self.pool = StringPool() if compact else None
+        self.on_load = None
+
+    def __getitem__(self, name):
+        cactus_data = self._decoded.get(name)
+        if cactus_data is not None:
+            return cactus_data
+        if name not in self._names:
+            raise KeyError(name)
+        # The reminder thread may decode while the Tk thread does, or while it saves
+        with self.source.lock:
+            cactus_data = self._decoded.get(name)
+            if cactus_data is None:
+                cactus_data = self.source.decode(name)
+                if self.pool is not None:
+                    compact_cactuses({name: cactus_data}, self.event_types, self.pool)
+                if self.on_load is not None:
+                    self.on_load(cactus_data)
+                self._decoded[name] = cactus_data
+        return cactus_data
+
+    def __setitem__(self, name, cactus_data):
+        self._decoded[name] = cactus_data
+        self._names[name] = None
+
+    def __delitem__(self, name):
+        del self._names[name]
+        self._decoded.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def is_loaded(self, name):
+        return name in self._decoded
+
+    def summary(self, name):
+        """The record of a cactus if decoded, else a stand-in built from the header summary
+
+        The stand-in has the summary fields and each history holds at most its newest event
+        with only a date; it is enough for due dates and reminders, and must not be modified.
+        """
+        cactus_data = self._decoded.get(name)
+        if cactus_data is not None:
+            return cactus_data
+        if name not in self._names:
+            raise KeyError(name)
+        summary = self.source.summaries[name]
+        record = {event_type: [] for event_type in self.event_types}
+        record["next_repotting"] = None
+        for key, value in summary.items():
+            if key in SUMMARY_EVENTS:
+                record[key] = [{"date": value}] if value else []
+            else:
+                record[key] = value
+        return record
+
+    def loaded_items(self):
+        """(name, record) of the decoded cactuses only"""
+        return [(name, self._decoded[name]) for name in self._names if name in self._decoded]
+
+    def load_all(self):
+        for name in self._names:
+            self[name]
+        return self
+
+    def copy(self):
+        """Shallow copy sharing the mapped file: undecoded records stay undecoded"""
+        other = LazyCactuses(self.source, self._names, self.event_types)
+        other.pool = self.pool
+        other.on_load = self.on_load
+        other._decoded = dict(self._decoded)
+        return other
+
+
+def loaded_items(cactuses):
+    """Items of a cactus mapping without decoding records of a lazily loaded file"""
+    if isinstance(cactuses, LazyCactuses):
+        return cactuses.loaded_items()
+    return cactuses.items()
+
+
+def read_indexed(file_path, event_types, compact=False, lazy=False):
+    """Read an indexed file; with lazy=True records stay in the mapped file until accessed"""
+    source = IndexedSource(file_path)
+    data = source.header.pop("data")
+    cactuses = LazyCactuses(source, source.index, event_types, compact)
+    if lazy:
+        data["cactuses"] = cactuses
+        return data
+    data["cactuses"] = {name: cactuses[name] for name in cactuses}
+    source.close()
+    return data
+
+
+def write_indexed(f, data):
+    """Write data to a seekable binary file in the indexed layout, one record at a time
+
+    Records a lazily loaded mapping never decoded are copied as bytes from its mapped file,
+    along with their header summary.
+    """
+    cactuses = data["cactuses"]
+    lazy = isinstance(cactuses, LazyCactuses)
+    index = []
+    summaries = {}
+    offset = 0
+    f.write(INDEXED_MAGIC + bytes(8))  # Header offset, filled in once the records are written
+    for name in cactuses:
+        if lazy and not cactuses.is_loaded(name):
+            record = cactuses.source.raw(name)
+            summary = cactuses.source.summaries[name]
+        else:
+            cactus_data = cactuses[name]
+            record = json.dumps(cactus_data, ensure_ascii=False, separators=(",", ":"),
+                                default=json_default).encode("utf-8")
+            summary = summarize(cactus_data)
+        f.write(record)
+        index.append([name, offset, len(record)])
+        summaries[name] = summary
+        offset += len(record)
+    header = {"data": {key: value for key, value in data.items() if key != "cactuses"}, "index": index,
+              "summaries": summaries}
+    f.write(json.dumps(header, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8"))
+    f.seek(len(INDEXED_MAGIC))
+    f.write((len(INDEXED_MAGIC) + 8 + offset).to_bytes(8, "little"))
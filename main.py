@@ -1,7 +1,29 @@
-import tkinter as tk
-from app import CactusCareApp
+import os
+import sys
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Command-line mode never loads tkinter, so it runs on machines without a display
+        from cli import main
+        sys.exit(main(sys.argv[1:]))
+
+    import tkinter as tk
+    from app import CactusCareApp
+
     root = tk.Tk()
-    app = CactusCareApp(root)
-    root.mainloop()
\ No newline at end of file
+    # CACTUS_STALL_REPORT=stalls.txt (or .json) reports which handlers freeze the window;
+    # F12 writes the report while the app runs, closing the app writes it once more
+    report_path = os.environ.get("CACTUS_STALL_REPORT")
+    monitor = None
+    if report_path:
+        from stall_monitor import StallMonitor
+
+        monitor = StallMonitor(root, threshold_ms=int(os.environ.get("CACTUS_STALL_MS", 200)))
+        monitor.start()  # Before the UI registers its callbacks, so they are all attributed
+        root.bind_all("<F12>", lambda event: monitor.dump(report_path))
+    # CACTUS_COMPACT=1 keeps event histories in columnar form for large collections
+    app = CactusCareApp(root, compact=os.environ.get("CACTUS_COMPACT") == "1")
+    root.mainloop()
+    if monitor:
+        monitor.stop()
+        monitor.dump(report_path)
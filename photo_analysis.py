@@ -0,0 +1,165 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+FEATURES = ("green", "yellow", "brown", "pale")
+# Photos analyzed per pool task; amortizes process round trips for small images
+CHUNK_SIZE = 8
+
+
+def analyze_photo(path, size=256):
+    """Return colour-fraction features of a photo: green, yellow, brown and pale pixel shares"""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img.thumbnail((size, size))
+        hsv = np.asarray(img.convert("HSV"), dtype=np.float32) / 255.0
+    hue = hsv[..., 0] * 360
+    sat = hsv[..., 1]
+    val = hsv[..., 2]
+
+    # Ignore near-black and near-white background pixels
+    plant = (val > 0.15) & ~((sat < 0.08) & (val > 0.92))
+    total = max(int(plant.sum()), 1)
+    coloured = plant & (sat >= 0.2)
+    return {
+        "green": float((coloured & (hue >= 70) & (hue < 170)).sum() / total),
+        "yellow": float((coloured & (hue >= 40) & (hue < 70) & (val >= 0.5)).sum() / total),
+        "brown": float((coloured & (hue >= 10) & (hue < 45) & (val < 0.5)).sum() / total),
+        "pale": float((plant & (sat < 0.2) & (val >= 0.6)).sum() / total)
+    }
+
+
+def _analyze_safe(path):
+    try:
+        return path, analyze_photo(path), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+class PhotoHealthAnalyzer:
+    """Batch colour analysis of progress photos with a per-(path, mtime) result cache"""
+
+    DRIFT_THRESHOLD = 0.1
+
+    def __init__(self, data_manager, cache_file="photo_features.json", max_workers=None):
+        self.data_manager = data_manager
+        self.cache_file = cache_file
+        self.max_workers = max_workers
+        self.cache = self.load_cache()
+
+    def load_cache(self):
+        """Load cached photo features from JSON file"""
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                pass
+        return {}
+
+    def save_cache(self):
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f, ensure_ascii=False, separators=(",", ":"))
+
+    def _cached_features(self, path):
+        entry = self.cache.get(path)
+        if entry is None:
+            return None
+        try:
+            if entry["mtime"] != os.stat(path).st_mtime_ns:
+                return None
+        except OSError:
+            return None
+        return entry["features"]
+
+    def pending_photos(self, cactus_names=None):
+        """Return paths of photos that are not analyzed yet or changed since analysis"""
+        cactuses = self.data_manager.data["cactuses"]
+        pending = []
+        seen = set()
+        for name in cactus_names if cactus_names is not None else cactuses:
+            for photo in cactuses[name]["photos"]:
+                path = photo["path"]
+                if path not in seen and self._cached_features(path) is None and os.path.exists(path):
+                    seen.add(path)
+                    pending.append(path)
+        return pending
+
+    def analyze(self, cactus_names=None, progress=None):
+        """Analyze new photos and cache the results; return {path: error} for photos that failed"""
+        results, errors = self.analyze_paths(self.pending_photos(cactus_names), progress)
+        if results:
+            self.store_results(results)
+        return errors
+
+    def analyze_paths(self, pending, progress=None):
+        """Analyze photos across all cores; return ({path: cache entry}, {path: error})
+
+        Touches neither the collection nor the cache, so it can run on a worker thread with
+        paths collected by pending_photos; store_results then merges on the owning thread.
+        """
+        results = {}
+        errors = {}
+        if not pending:
+            return results, errors
+        stamps = {path: os.stat(path).st_mtime_ns for path in pending}
+        if len(pending) < CHUNK_SIZE or self.max_workers == 1:
+            analyzed = map(_analyze_safe, pending)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            analyzed = executor.map(_analyze_safe, pending, chunksize=CHUNK_SIZE)
+        try:
+            for done, (path, features, error) in enumerate(analyzed, start=1):
+                if error is None:
+                    results[path] = {"mtime": stamps[path], "features": features}
+                else:
+                    errors[path] = error
+                if progress:
+                    progress(done, len(pending))
+        finally:
+            if executor:
+                executor.shutdown()
+        return results, errors
+
+    def store_results(self, results):
+        """Merge results of analyze_paths into the cache and save it"""
+        self.cache.update(results)
+        self.save_cache()
+
+    def cactus_report(self, cactus_name):
+        """Compare the latest photo of a cactus to the mean of its earlier photos"""
+        photos = self.data_manager.data["cactuses"][cactus_name]["photos"]
+        series = [(photo["date"], features) for photo in photos
+                  if (features := self._cached_features(photo["path"])) is not None]
+        if not series:
+            return None
+        latest_date, latest = series[-1]
+        earlier = [features for _, features in series[:-1]]
+        report = {"cactus": cactus_name, "date": latest_date, "latest": latest,
+                  "baseline": None, "drift": 0.0, "signs": [], "flagged": False}
+        if earlier:
+            baseline = {key: sum(f[key] for f in earlier) / len(earlier) for key in FEATURES}
+            changes = {
+                "yellow": latest["yellow"] - baseline["yellow"],
+                "brown": latest["brown"] - baseline["brown"],
+                "pale": latest["pale"] - baseline["pale"],
+                "green": baseline["green"] - latest["green"]
+            }
+            report["baseline"] = baseline
+            report["drift"] = max(changes.values())
+            report["signs"] = [key for key, change in changes.items() if change >= self.DRIFT_THRESHOLD]
+            report["flagged"] = bool(report["signs"])
+        return report
+
+    def collection_report(self, flagged_only=False):
+        """Return reports for all cactuses with analyzed photos, largest drift first"""
+        reports = [report for name in self.data_manager.data["cactuses"]
+                   if (report := self.cactus_report(name)) is not None]
+        if flagged_only:
+            reports = [report for report in reports if report["flagged"]]
+        return sorted(reports, key=lambda report: -report["drift"])
@@ -0,0 +1,223 @@
+import io
+import json
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from utils import DATE_FORMAT
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = "cactus-photos-1"
+ARCHIVE_FORMATS = {".zip": "zip", ".tar": "tar", ".tgz": "tar.gz", ".tar.gz": "tar.gz"}
+# Downscale jobs in flight per worker: enough to keep the pool busy while the archive is written,
+# few enough that resized copies waiting on disk stay bounded however many photos there are
+JOBS_PER_WORKER = 4
+
+
+def archive_format(file_path):
+    """Archive type from the file extension, or None"""
+    lower = file_path.lower()
+    for extension, kind in sorted(ARCHIVE_FORMATS.items(), key=lambda item: -len(item[0])):
+        if lower.endswith(extension):
+            return kind
+    return None
+
+
+def safe_name(name):
+    """Cactus name usable as a directory name in any archive and file system"""
+    return re.sub(r'[\\/:*?"<>|\x00-\x1f]', "_", name).strip(" .") or "_"
+
+
+def downscale_photo(job):
+    """Write a JPEG copy of a photo no larger than max_size; safe to run in a worker process
+
+    Return (target, None) on success, (None, None) when the photo is already small enough to be
+    packed as is, or (None, error).
+    """
+    from PIL import Image
+
+    source, target, max_size, quality = job
+    try:
+        with Image.open(source) as img:
+            if img.width <= max_size and img.height <= max_size:
+                return None, None
+            img.draft("RGB", (max_size, max_size))
+            copy = img.convert("RGB")
+        copy.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+        copy.save(target, "JPEG", quality=quality)
+        return target, None
+    except Exception as e:
+        return None, str(e)
+
+
+class _ArchiveWriter:
+    """Add files to a zip or tar archive one at a time, streaming them from disk"""
+
+    def __init__(self, file_path, kind):
+        self.kind = kind
+        if kind == "zip":
+            # Photos are already compressed; deflating them again costs time and saves nothing
+            self.archive = zipfile.ZipFile(file_path, "w", zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            self.archive = tarfile.open(file_path, "w:gz" if kind == "tar.gz" else "w")
+
+    def add_file(self, path, name):
+        if self.kind == "zip":
+            self.archive.write(path, name)
+        else:
+            self.archive.add(path, name, recursive=False)
+
+    def add_bytes(self, data, name):
+        if self.kind == "zip":
+            self.archive.writestr(name, data, zipfile.ZIP_DEFLATED)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(datetime.now().timestamp())
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+class PhotoExport:
+    """Pack the photos of some or all cactuses into a zip or tar archive
+
+    Photos are stored as <cactus>/<date>.<ext> next to a manifest that ties every file back to
+    its cactus and photo record. Files are streamed into the archive one by one, so memory use
+    does not depend on the size of the photo set; optional downscaled copies are made in a
+    process pool with a bounded number of jobs in flight.
+    """
+
+    def __init__(self, data_manager, max_workers=None, quality=85):
+        self.data_manager = data_manager
+        self.max_workers = max_workers
+        self.quality = quality
+
+    def prepare(self, cactus_names=None):
+        """List the photos to export as plain entries
+
+        Call it on the thread that owns the data; write can then run elsewhere.
+        """
+        self.data_manager.archive.ensure_loaded()
+        cactuses = self.data_manager.data["cactuses"]
+        entries = []
+        directories = set()  # Casefolded, since "Opuntia" and "opuntia" clash on Windows and macOS
+        for name in sorted(cactuses if cactus_names is None else cactus_names):
+            # Different names may map to one directory ("a/b" and "a_b"): number the later ones
+            directory, count = safe_name(name), 1
+            while directory.casefold() in directories:
+                count += 1
+                directory = f"{safe_name(name)}_{count}"
+            directories.add(directory.casefold())
+            used = set()
+            for photo in cactuses[name]["photos"]:
+                stem = datetime.strptime(photo["date"], DATE_FORMAT).strftime("%Y-%m-%d_%H%M")
+                extension = os.path.splitext(photo["path"])[1].lower() or ".jpg"
+                candidate, count = stem, 1
+                while candidate in used:
+                    count += 1
+                    candidate = f"{stem}_{count}"
+                used.add(candidate)
+                entries.append({"cactus": name, "date": photo["date"], "source": photo["path"],
+                                "name": f"{directory}/{candidate}{extension}",
+                                "hash": photo.get("hash")})
+        return entries
+
+    def _sources(self, entries, max_size, scratch):
+        """Yield (entry, file to pack, error) in entry order
+
+        Without max_size the originals are packed as they are. With it, downscaled copies are
+        written to scratch by the pool; at most JOBS_PER_WORKER jobs per worker are pending.
+        """
+        if max_size is None:
+            for entry in entries:
+                yield entry, entry["source"], None
+            return
+        jobs = [(entry["source"], os.path.join(scratch, f"{uuid.uuid4().hex}.jpg"), max_size, self.quality)
+                for entry in entries]
+        if len(jobs) <= 2 or self.max_workers == 1:
+            for entry, job in zip(entries, jobs):
+                target, error = downscale_photo(job)
+                yield entry, target or entry["source"], error
+            return
+        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        window = JOBS_PER_WORKER * (self.max_workers or os.cpu_count() or 1)
+        pending = deque()
+        try:
+            position = 0
+            while position < len(jobs) or pending:
+                while position < len(jobs) and len(pending) < window:
+                    pending.append((entries[position], executor.submit(downscale_photo, jobs[position])))
+                    position += 1
+                entry, future = pending.popleft()
+                target, error = future.result()
+                yield entry, target or entry["source"], error
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown()
+
+    def write(self, file_path, entries, max_size=None, progress=None):
+        """Write the archive, the extension picks zip, tar or tar.gz; return {source: error}
+
+        max_size (pixels on the longer side) replaces larger photos by JPEG copies of that size.
+        The archive is written to a temporary file and only replaces file_path when complete.
+        """
+        kind = archive_format(file_path)
+        if kind is None:
+            raise ValueError(f"Unsupported archive format: {os.path.basename(file_path)}")
+        if max_size is not None and max_size <= 0:
+            raise ValueError("max_size must be positive")
+        errors = {}
+        manifest = []
+        temp = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        scratch = tempfile.mkdtemp(prefix="cactus_photos_")
+        try:
+            writer = _ArchiveWriter(temp, kind)
+            sources = self._sources(entries, max_size, scratch)
+            try:
+                for done, (entry, path, error) in enumerate(sources, start=1):
+                    name = entry["name"]
+                    if error is None and not os.path.exists(path):
+                        error = "файл не найден"
+                    if error is not None:
+                        errors[entry["source"]] = error
+                    else:
+                        resized = path != entry["source"]
+                        if resized:
+                            name = os.path.splitext(name)[0] + ".jpg"
+                        writer.add_file(path, name)
+                        if resized:
+                            os.remove(path)
+                        manifest.append({"cactus": entry["cactus"], "date": entry["date"], "file": name,
+                                         "source": entry["source"], "hash": entry["hash"], "resized": resized})
+                    if progress:
+                        progress(done, len(entries))
+                writer.add_bytes(json.dumps({
+                    "format": MANIFEST_FORMAT,
+                    "created": datetime.now().strftime(DATE_FORMAT),
+                    "data_file": os.path.abspath(self.data_manager.data_file),
+                    "max_size": max_size,
+                    "photos": manifest,
+                    "errors": errors
+                }, ensure_ascii=False, indent=2).encode("utf-8"), MANIFEST_NAME)
+            finally:
+                sources.close()  # Stops the pool if writing failed part way
+                writer.close()
+            os.replace(temp, file_path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+            if os.path.exists(temp):
+                os.remove(temp)
+        return errors
+
+    def build(self, file_path, cactus_names=None, max_size=None, progress=None):
+        """Prepare and write an archive in one call; return {source: error}"""
+        return self.write(file_path, self.prepare(cactus_names), max_size, progress)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from utils import DATE_FORMAT
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 36867
+EXIF_DATETIME = 306
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_capture_date(img):
+    """Return the EXIF capture date of an opened image in storage format, or None"""
+    try:
+        exif = img.getexif()
+        value = exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        if value:
+            return datetime.strptime(str(value).strip("\x00 "), "%Y:%m:%d %H:%M:%S").strftime(DATE_FORMAT)
+    except (AttributeError, KeyError, ValueError, OSError):
+        pass
+    return None
+
+
+def ingest_photo(source, store_dir, thumb_size=(200, 200)):
+    """Copy a photo into the content-addressed store and create its thumbnail
+
+    Runs in worker processes, so it only takes and returns plain values.
+    """
+    from PIL import Image
+
+    try:
+        digest = file_hash(source)
+        extension = os.path.splitext(source)[1].lower() or ".jpg"
+        target = os.path.join(store_dir, digest[:2], digest + extension)
+        thumbnail = os.path.join(store_dir, "thumbs", digest[:2], digest + ".jpg")
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Copy under a unique name first so concurrent imports of the same file never see a partial copy
+            temp = f"{target}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(source, temp)
+            os.replace(temp, target)
+
+        with Image.open(target) as img:
+            date = read_capture_date(img)
+            if not os.path.exists(thumbnail):
+                os.makedirs(os.path.dirname(thumbnail), exist_ok=True)
+                img.draft("RGB", thumb_size)
+                thumb = img.convert("RGB")
+                thumb.thumbnail(thumb_size)
+                temp = f"{thumbnail}.{uuid.uuid4().hex}.tmp"
+                thumb.save(temp, "JPEG", quality=85)
+                os.replace(temp, thumbnail)
+        if date is None:
+            date = datetime.fromtimestamp(os.path.getmtime(source)).strftime(DATE_FORMAT)
+        return {"source": source, "hash": digest, "path": os.path.abspath(target),
+                "thumbnail": os.path.abspath(thumbnail), "date": date, "error": None}
+    except Exception as e:
+        return {"source": source, "error": str(e)}
+
+
+class PhotoStore:
+    """Managed photo directory: content-addressed copies, thumbnails and capture dates"""
+
+    def __init__(self, store_dir="photos", thumb_size=(200, 200), max_workers=None):
+        self.store_dir = store_dir
+        self.thumb_size = thumb_size
+        self.max_workers = max_workers
+
+    def find_images(self, folder, recursive=True):
+        """Return image files in a folder, sorted by path"""
+        found = []
+        for root, dirs, files in os.walk(folder):
+            found.extend(os.path.join(root, name) for name in files
+                         if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+            if not recursive:
+                break
+        return sorted(found)
+
+    def ingest(self, sources, progress=None):
+        """Ingest files across all cores; return result dicts in input order"""
+        sources = list(sources)
+        results = []
+        if len(sources) <= 2 or self.max_workers == 1:
+            iterator = (ingest_photo(source, self.store_dir, self.thumb_size) for source in sources)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            iterator = executor.map(ingest_photo, sources, [self.store_dir] * len(sources),
+                                    [self.thumb_size] * len(sources), chunksize=4)
+        try:
+            for done, result in enumerate(iterator, start=1):
+                results.append(result)
+                if progress:
+                    progress(done, len(sources))
+        finally:
+            if executor:
+                executor.shutdown()
+        return results
+
+    def add_to_cactus(self, data_manager, cactus_name, results):
+        """Attach ingested photos to a cactus, skipping ones it already has; save once"""
+        photos = data_manager.data["cactuses"][cactus_name]["photos"]
+        known = {photo.get("hash") for photo in photos}
+        added = []
+        for result in results:
+            if result["error"] or result["hash"] in known:
+                continue
+            known.add(result["hash"])
+            record = {"date": result["date"], "path": result["path"],
+                      "hash": result["hash"], "thumbnail": result["thumbnail"]}
+            added.append(data_manager.add_event(cactus_name, "photos", record, save=False))
+        if added:
+            data_manager.save_data()
+        return added
+
+    def import_folder(self, data_manager, cactus_name, folder, recursive=True, progress=None):
+        """Import every image in a folder for a cactus; return (added records, errors)"""
+        results = self.ingest(self.find_images(folder, recursive), progress)
+        errors = {result["source"]: result["error"] for result in results if result["error"]}
+        return self.add_to_cactus(data_manager, cactus_name, results), errors
@@ -0,0 +1,201 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+from datetime import date
+from PIL import Image, ImageTk
+
+
+class ProfileView:
+    """Cactus profile built once and updated region by region from a view-model"""
+
+    IMAGE_CACHE_SIZE = 32
+
+    def __init__(self, ui_manager, parent):
+        self.ui = ui_manager
+        self.data_manager = ui_manager.data_manager
+        self.visualization_manager = ui_manager.visualization_manager
+        self.parent = parent
+        self.cactus_name = None
+        self.state = {}
+        self._images = OrderedDict()
+        self.build()
+
+    def build(self):
+        """Create all profile widgets once"""
+        ui = self.ui
+        self.placeholder = ttk.Label(self.parent, text="Добавьте кактус, чтобы получить профиль")
+        self.profile_frame = ttk.Frame(self.parent)
+
+        # Visualization frame
+        vis_frame = ttk.LabelFrame(self.profile_frame, text="Визуализация")
+        vis_frame.pack(side="left", padx=10, pady=10, fill="y")
+        self.cactus_canvas = tk.Canvas(vis_frame, width=200, height=300, bg="white")
+        self.cactus_canvas.pack(pady=5)
+
+        # Photo frame
+        photo_frame = ttk.LabelFrame(self.profile_frame, text="Последнее фото")
+        photo_frame.pack(side="left", padx=10, pady=10, fill="y")
+        self.photo_label = ttk.Label(photo_frame)
+        self.photo_label.pack(pady=5)
+
+        # Info frame
+        self.info_frame = ttk.LabelFrame(self.profile_frame, text="Профиль")
+        self.info_frame.pack(side="right", fill="both", expand=True, padx=10, pady=10)
+        info_frame = self.info_frame
+
+        self.species_label = ttk.Label(info_frame)
+        self.species_label.pack(pady=5)
+        self.seasonal_label = ttk.Label(info_frame)
+        self.seasonal_label.pack(pady=5)
+        self.fertilizer_label = ttk.Label(info_frame)
+        self.fertilizer_label.pack(pady=5)
+
+        health_frame = ttk.Frame(info_frame)
+        health_frame.pack(pady=5)
+        ttk.Label(health_frame, text="Здоровье:").pack(side="left")
+        self.health_indicator = tk.Canvas(health_frame, width=20, height=20)
+        self.health_indicator.pack(side="left", padx=5)
+
+        # Buttons act on whichever cactus is shown when they are pressed
+        buttons = [
+            ("Добавить полив", ui.add_watering),
+            ("Записать рост", ui.add_growth),
+            ("Добавить фото", ui.add_photo),
+            ("Добавить подкормку", ui.add_fertilizer),
+            ("Диагностика здоровья", ui.diagnose_health),
+            ("Показать графики", self.visualization_manager.show_graphs),
+            ("Фотоальбом", ui.show_photo_album),
+            ("Импорт папки фото", ui.import_photo_folder),
+            ("Редактировать заметки", ui.edit_notes),
+            ("Запланировать пересадку", ui.plan_repotting),
+        ]
+        for text, handler in buttons:
+            ttk.Button(info_frame, text=text, command=lambda h=handler: h(self.cactus_name)).pack(pady=5)
+
+        ttk.Label(info_frame, text="Частота полива (дней):").pack()
+        self.freq_entry = ttk.Entry(info_frame)
+        self.freq_entry.pack()
+        ttk.Button(info_frame, text="Сохранить частоту",
+                   command=lambda: ui.save_frequency(self.cactus_name)).pack(pady=5)
+
+        self.reminder_label = ttk.Label(info_frame, text="")
+        self.reminder_label.pack(pady=5)
+        self.repotting_label = ttk.Label(info_frame, text="")
+        self.repotting_label.pack(pady=5)
+        self.growth_label = ttk.Label(info_frame)
+        self.growth_label.pack(pady=5)
+
+        notes_frame = ttk.LabelFrame(info_frame, text="Заметки")
+        notes_frame.pack(fill="x", pady=5)
+        self.notes_text = tk.Text(notes_frame, height=5, width=40, wrap="word", font=("Arial", 10))
+        self.notes_text.config(state="disabled")
+        self.notes_text.pack(pady=5)
+
+        self.history_frame = ttk.LabelFrame(self.parent, text="История")
+        self.history_text = tk.Text(self.history_frame, height=10, width=80, bg="#ffffff", font=("Arial", 10))
+        self.history_text.pack(pady=5)
+        self.history_text.bind("<Double-Button-1>", ui.on_history_double_click)
+
+    def view_model(self, cactus_name):
+        """Compute the displayed values of every region for a cactus"""
+        cactus_data = self.data_manager.data["cactuses"][cactus_name]
+        species = cactus_data.get("species", "Не указан")
+        species_info = self.ui.species_db.get_species_data(species)
+        season = self.data_manager.season_model.season_for(date.today())
+        photo = cactus_data["photos"][-1] if cactus_data["photos"] else None
+        growth = cactus_data["growth"]
+        color = self.visualization_manager.get_cactus_color(cactus_data)
+        return {
+            "title": f"Профиль: {cactus_name}",
+            "species": f"Вид: {species}\nОбщее название: {species_info.get('common_name', 'Неизвестно')}",
+            "seasonal": f"Сезонные рекомендации ({season}): "
+                        f"{species_info.get('seasonal_care', {}).get(season, 'Нет рекомендаций')}",
+            "fertilizer": f"Рекомендации по удобрениям: "
+                          f"{species_info.get('fertilizer_recommendation', 'Нет рекомендаций')}",
+            "health": color,
+            "animation": (cactus_name, max(g["height"] for g in growth) if growth else 5, color),
+            "photo": (photo.get("thumbnail") or photo["path"]) if photo else None,
+            "frequency": self.data_manager.get_seasonal_watering_frequency(cactus_name, self.ui.species_db),
+            "reminder": self.ui.reminder_status(cactus_name),
+            "repotting": self.ui.repotting_status(cactus_name),
+            "growth_count": f"Измерений роста: {len(growth)}/5 (Рост мастер)",
+            "notes": cactus_data["notes"] or "Нет заметок",
+            "history": (cactus_name,) + tuple(
+                (len(cactus_data[key]), dict(cactus_data[key][-1]) if cactus_data[key] else None)
+                for key in ("watering", "growth", "photos", "fertilizers"))
+        }
+
+    def show(self, cactus_name):
+        """Show a cactus, updating only the regions whose values changed"""
+        if not cactus_name:
+            self.cactus_name = None
+            self.state = {}
+            self.profile_frame.pack_forget()
+            self.history_frame.pack_forget()
+            self.visualization_manager.cancel_animation()
+            self.placeholder.pack(pady=20)
+            return
+        if not self.profile_frame.winfo_ismapped():
+            self.placeholder.pack_forget()
+            self.profile_frame.pack(fill="both", expand=True)
+            self.history_frame.pack(fill="both", expand=True, pady=10)
+
+        self.cactus_name = cactus_name
+        new_state = self.view_model(cactus_name)
+        changed = {key for key, value in new_state.items() if self.state.get(key) != value}
+        self.state = new_state
+
+        for key, label in (("title", None), ("species", self.species_label), ("seasonal", self.seasonal_label),
+                           ("fertilizer", self.fertilizer_label), ("growth_count", self.growth_label)):
+            if key in changed:
+                if label is None:
+                    self.info_frame.config(text=new_state[key])
+                else:
+                    label.config(text=new_state[key])
+        if "health" in changed:
+            self.visualization_manager.update_health_indicator(cactus_name, self.health_indicator)
+        if "animation" in changed:
+            self.visualization_manager.animate_cactus(cactus_name, self.cactus_canvas)
+        if "photo" in changed:
+            self.show_photo(new_state["photo"])
+        if "frequency" in changed:
+            self.freq_entry.delete(0, tk.END)
+            self.freq_entry.insert(0, str(new_state["frequency"]))
+        if "reminder" in changed:
+            text, color = new_state["reminder"]
+            self.reminder_label.config(text=text, foreground=color)
+        if "repotting" in changed:
+            text, color = new_state["repotting"]
+            self.repotting_label.config(text=text, foreground=color)
+        if "notes" in changed:
+            self.notes_text.config(state="normal")
+            self.notes_text.delete("1.0", tk.END)
+            self.notes_text.insert("1.0", new_state["notes"])
+            self.notes_text.config(state="disabled")
+        if "history" in changed:
+            self.ui.update_history(cactus_name)
+
+    def show_photo(self, path):
+        """Show the latest photo, decoding each file only once while it stays in the cache"""
+        if path is None:
+            self.photo_label.config(image="", text="Фото отсутствует")
+            return
+        photo = self._images.get(path)
+        if photo is None:
+            try:
+                img = Image.open(path).resize((200, 200), Image.Resampling.LANCZOS)
+            except FileNotFoundError:
+                self.photo_label.config(image="", text="Фото не найдено")
+                return
+            photo = ImageTk.PhotoImage(img)
+            self._images[path] = photo
+            if len(self._images) > self.IMAGE_CACHE_SIZE:
+                self._images.popitem(last=False)
+        else:
+            self._images.move_to_end(path)
+        self.photo_label.config(image=photo, text="")
+        self.photo_label.image = photo
+
+    def invalidate(self):
+        """Force a full redraw on the next show"""
+        self.state = {}
@@ -0,0 +1,255 @@
+import heapq
+import itertools
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timedelta, time
+from utils import DATE_FORMAT
+from watering_calendar import WateringCalendar
+
+MESSAGES = {
+    "watering": "Пора полить кактус «{cactus}»",
+    "fertilizer": "Пора подкормить кактус «{cactus}»",
+    "repotting": "Пора пересадить кактус «{cactus}»"
+}
+
+
+class StdoutSink:
+    """Print reminders to standard output"""
+
+    def __call__(self, reminder):
+        print(f"[{reminder['due']:%Y-%m-%d %H:%M}] {reminder['message']}", flush=True)
+
+
+class LogSink:
+    """Append reminders to a log file"""
+
+    def __init__(self, log_file="reminders.log"):
+        self.logger = logging.getLogger(f"cactus.reminders.{log_file}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            handler = logging.FileHandler(log_file, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+
+    def __call__(self, reminder):
+        self.logger.info("%s (срок %s)", reminder["message"], reminder["due"].strftime(DATE_FORMAT))
+
+
+class TkSink:
+    """Show reminders in a Tk popup; the service thread only queues, the Tk thread displays
+
+    Reminders that arrive together are shown in one window.
+    """
+
+    def __init__(self, root, poll_ms=1000):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.pending = queue.SimpleQueue()
+        self.root.after(self.poll_ms, self._poll)
+
+    def __call__(self, reminder):
+        self.pending.put(reminder)
+
+    def _poll(self):
+        from tkinter import messagebox
+
+        lines = []
+        while not self.pending.empty():
+            lines.append(self.pending.get()["message"])
+        if lines:
+            messagebox.showinfo("Напоминания", "\n".join(lines), parent=self.root)
+        self.root.after(self.poll_ms, self._poll)
+
+
+class ReminderService:
+    """Background thread that sleeps until the earliest care deadline and then notifies the sinks
+
+    Deadlines live in a heap ordered by due time. Rescheduling a cactus bumps its version, so
+    its old heap entries are skipped lazily instead of being searched for and removed. The thread
+    waits on a condition with a timeout equal to the time left to the next deadline, so an idle
+    service costs nothing regardless of collection size.
+
+    With watch_interval set (the headless service), the thread also wakes at least that often
+    and reloads the data file when another process changed it, so a task done in the app stops
+    the reminders here.
+    """
+
+    MAX_SLEEP = 3600  # Re-check at least hourly in case the wall clock jumps (suspend, DST)
+
+    def __init__(self, data_manager, species_db, sinks=(), repeat=timedelta(days=1), calendar=None,
+                 watch_interval=None):
+        self.data_manager = data_manager
+        self.calendar = calendar or WateringCalendar(data_manager, species_db)
+        self.sinks = list(sinks)
+        self.repeat = repeat
+        self.watch_interval = watch_interval
+        self._data_stamp = None
+        self._heap = []
+        self._versions = {}
+        self._snoozed = {}  # (cactus, kind, due) of reminders already sent -> when to repeat them
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        data_manager.listeners.append(lambda cactus_name, event_type, record: self.reschedule(cactus_name))
+
+    def deadlines(self, cactus_name):
+        """Return [(kind, due datetime)] of the next care deadlines of a cactus"""
+        cactus_data = self.data_manager.cactus_summary(cactus_name)
+        archive = self.data_manager.archive
+        deadlines = []
+        next_watering = self.data_manager.next_watering(cactus_name, self.calendar.species_db)
+        if next_watering is not None:
+            deadlines.append(("watering", next_watering))
+        # A history with nothing in the hot window may still have archived events
+        if cactus_data["fertilizers"] or archive.last_archived(cactus_name, "fertilizers"):
+            fertilizer_days = self.calendar.project(cactus_name)["fertilizer"]
+            if fertilizer_days:
+                deadlines.append(("fertilizer", datetime.combine(fertilizer_days[0], time(9, 0))))
+        if cactus_data.get("next_repotting"):
+            deadlines.append(("repotting", datetime.strptime(cactus_data["next_repotting"], "%Y-%m-%d")))
+        return deadlines
+
+    def reschedule(self, cactus_name=None):
+        """Recompute the deadlines of one cactus, or of all cactuses, after its data changed"""
+        cactuses = self.data_manager.data["cactuses"]
+        if cactus_name is not None:
+            names = [cactus_name]
+        else:
+            names = list(cactuses)
+            with self._condition:
+                self._heap = []
+                self._versions = {}
+                self._snoozed = {key: when for key, when in self._snoozed.items() if key[0] in cactuses}
+        for name in names:
+            # Deadlines are computed under the lock, one cactus at a time, so a reschedule from
+            # another thread cannot be overtaken by one computed from older data
+            with self._condition:
+                self._versions[name] = self._versions.get(name, 0) + 1
+                entries = []
+                if name in cactuses:
+                    self.calendar.invalidate(name)
+                    try:
+                        entries = self.deadlines(name)
+                    except Exception:
+                        # Bad data of one cactus must not stop the reminders of the others
+                        logging.getLogger(__name__).exception("Scheduling reminders for %s failed", name)
+                # A deadline that did not move keeps its repeat time instead of firing again at once
+                current = {(name, kind, due) for kind, due in entries}
+                self._snoozed = {key: when for key, when in self._snoozed.items() if key[0] != name or key in current}
+                for kind, due in entries:
+                    when = self._snoozed.get((name, kind, due), due)
+                    heapq.heappush(self._heap, (when, next(self._sequence), name, kind, self._versions[name], due))
+                self._condition.notify()
+
+    def next_deadline(self):
+        """Return (due, cactus, kind) of the earliest pending reminder, or None"""
+        with self._condition:
+            self._drop_stale()
+            if not self._heap:
+                return None
+            when, _, name, kind, _, _ = self._heap[0]
+            return when, name, kind
+
+    def _drop_stale(self):
+        while self._heap and self._heap[0][4] != self._versions.get(self._heap[0][2]):
+            heapq.heappop(self._heap)
+
+    def _data_file_changed(self):
+        """Whether the data file changed on disk since the last check"""
+        try:
+            stat = os.stat(self.data_manager.data_file)
+        except OSError:
+            return False
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        changed = self._data_stamp is not None and stamp != self._data_stamp
+        self._data_stamp = stamp
+        return changed
+
+    def _max_sleep(self):
+        return min(self.MAX_SLEEP, self.watch_interval) if self.watch_interval else self.MAX_SLEEP
+
+    def start(self):
+        """Start the background thread; it schedules every cactus before its first wait
+
+        Scheduling reads every cactus, which decodes a lazily loaded file, so it is kept off
+        the calling (Tk) thread.
+        """
+        if self._thread is not None:
+            return
+        if self.watch_interval:
+            self._data_file_changed()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="reminders", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        self.reschedule()
+        while True:
+            if self.watch_interval and self._data_file_changed():
+                try:
+                    self.data_manager.load_data()
+                except OSError:
+                    logging.getLogger(__name__).exception("Reloading the data file failed")
+                else:
+                    self._data_file_changed()  # Loading may have written defaults back
+                    self.reschedule()
+            with self._condition:
+                if not self._running:
+                    return
+                self._drop_stale()
+                if not self._heap:
+                    self._condition.wait(self._max_sleep())
+                    continue
+                wait = (self._heap[0][0] - datetime.now()).total_seconds()
+                if wait > 0:
+                    self._condition.wait(min(wait, self._max_sleep()))
+                    continue
+                _, _, name, kind, version, due = heapq.heappop(self._heap)
+                # Keep reminding while the task stays undone; doing it reschedules the cactus
+                when = self._snoozed[(name, kind, due)] = datetime.now() + self.repeat
+                heapq.heappush(self._heap, (when, next(self._sequence), name, kind, version, due))
+            self._notify({"cactus": name, "kind": kind, "due": due,
+                          "message": MESSAGES[kind].format(cactus=name)})
+
+    def _notify(self, reminder):
+        for sink in self.sinks:
+            try:
+                sink(reminder)
+            except Exception:
+                logging.getLogger(__name__).exception("Reminder sink failed")
+
+
+if __name__ == "__main__":
+    import argparse
+    from data_manager import DataManager
+    from species_database import SpeciesDatabase
+
+    parser = argparse.ArgumentParser(description="Фоновые напоминания об уходе за кактусами")
+    parser.add_argument("--data", default="cactus_data.json", help="файл данных")
+    parser.add_argument("--log", help="записывать напоминания в этот файл")
+    parser.add_argument("--quiet", action="store_true", help="не выводить напоминания в консоль")
+    parser.add_argument("--watch", type=int, default=60,
+                        help="проверять изменения файла данных каждые N секунд (0 — не проверять)")
+    args = parser.parse_args()
+
+    sinks = [] if args.quiet else [StdoutSink()]
+    if args.log:
+        sinks.append(LogSink(args.log))
+    service = ReminderService(DataManager(args.data), SpeciesDatabase(), sinks, watch_interval=args.watch or None)
+    service.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        service.stop()
@@ -0,0 +1,158 @@
+from datetime import date
+
+PERIODS = ("day", "week", "month")
+
+_week_keys = {}
+
+
+def period_key(date_string, period):
+    """Bucket key of a "%Y-%m-%d %H:%M" date: "2024-03-05", "2024-W10" or "2024-03" """
+    if period == "day":
+        return date_string[:10]
+    if period == "month":
+        return date_string[:7]
+    day = date_string[:10]
+    key = _week_keys.get(day)
+    if key is None:
+        year, week, _ = date(int(day[0:4]), int(day[5:7]), int(day[8:10])).isocalendar()
+        key = _week_keys[day] = f"{year}-W{week:02d}"
+    return key
+
+
+def period_start(key):
+    """First day of the period a bucket key names"""
+    if "-W" in key:
+        year, week = key.split("-W")
+        return date.fromisocalendar(int(year), int(week), 1)
+    if len(key) == 7:
+        return date(int(key[0:4]), int(key[5:7]), 1)
+    return date(int(key[0:4]), int(key[5:7]), int(key[8:10]))
+
+
+def new_bucket():
+    return {"watering": 0, "fertilizers": 0, "growth": 0, "photos": 0,
+            "last_height": None, "max_height": None, "start_height": None, "growth_delta": 0.0}
+
+
+class CactusRollup:
+    """Per-period aggregates and running totals of one cactus, updated event by event"""
+
+    def __init__(self):
+        self.buckets = {period: {} for period in PERIODS}
+        self.totals = new_bucket()
+        self.last_dates = {}
+        self.signature = None
+
+    def add(self, event_type, record):
+        """Fold one event into the aggregates; events of a type must arrive in date order"""
+        date_string = record["date"]
+        self.last_dates[event_type] = date_string
+        height = record.get("height") if event_type == "growth" else None
+        previous_height = self.totals["last_height"]
+        for target in [self.totals] + [self._bucket(period, date_string) for period in PERIODS]:
+            target[event_type] = target.get(event_type, 0) + 1
+            if height is None:
+                continue
+            if target["start_height"] is None:
+                target["start_height"] = previous_height if previous_height is not None else height
+            target["last_height"] = height
+            target["max_height"] = height if target["max_height"] is None else max(target["max_height"], height)
+            target["growth_delta"] = height - target["start_height"]
+
+    def _bucket(self, period, date_string):
+        buckets = self.buckets[period]
+        key = period_key(date_string, period)
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = new_bucket()
+        return bucket
+
+    def accepts(self, event_type, record):
+        """Whether an event can be folded in without a rebuild (not back-dated)"""
+        last = self.last_dates.get(event_type)
+        return last is None or record["date"] >= last
+
+
+def history_signature(cactus_data, event_types):
+    """Cheap fingerprint of a cactus history: length and last date per event type"""
+    return tuple((len(events), events[-1]["date"] if events else None)
+                 for events in (cactus_data.get(event_type, []) for event_type in event_types))
+
+
+class RollupManager:
+    """Daily, weekly and monthly aggregates per cactus kept current as events are added
+
+    DataManager.add_event folds each new event in; histories changed any other way
+    (imports, undo, edits) are detected by their signature and rebuilt once on next read.
+    """
+
+    def __init__(self, data_manager, event_types):
+        self.data_manager = data_manager
+        self.event_types = event_types
+        self._rollups = {}
+
+    def invalidate(self, cactus_name=None):
+        """Drop aggregates of one cactus, or of all cactuses"""
+        if cactus_name is None:
+            self._rollups.clear()
+        else:
+            self._rollups.pop(cactus_name, None)
+
+    def record(self, cactus_name, event_type, record):
+        """Fold a newly added event into the aggregates of its cactus"""
+        rollup = self._rollups.get(cactus_name)
+        if rollup is None:
+            return
+        cactus_data = self.data_manager.data["cactuses"][cactus_name]
+        signature = history_signature(cactus_data, self.event_types)
+        position = self.event_types.index(event_type)
+        # Only this one event may have been added since the aggregates were last current
+        in_step = all(new == old for i, (new, old) in enumerate(zip(signature, rollup.signature))
+                      if i != position) and signature[position][0] == rollup.signature[position][0] + 1
+        if in_step and rollup.accepts(event_type, record):
+            rollup.add(event_type, record)
+            rollup.signature = signature
+        else:
+            # Back-dated or changed elsewhere: rebuild on next read
+            del self._rollups[cactus_name]
+
+    def rollup(self, cactus_name):
+        """Return the up-to-date CactusRollup of a cactus"""
+        cactus_data = self.data_manager.data["cactuses"][cactus_name]
+        signature = history_signature(cactus_data, self.event_types)
+        rollup = self._rollups.get(cactus_name)
+        if rollup is None or rollup.signature != signature:
+            rollup = self.build(cactus_data)
+            rollup.signature = signature
+            self._rollups[cactus_name] = rollup
+        return rollup
+
+    def build(self, cactus_data):
+        """Aggregate a full history in one chronological pass"""
+        rollup = CactusRollup()
+        events = [(record["date"], event_type, record)
+                  for event_type in self.event_types for record in cactus_data.get(event_type, [])]
+        events.sort(key=lambda item: item[0])
+        for _, event_type, record in events:
+            rollup.add(event_type, record)
+        return rollup
+
+    def series(self, cactus_name, period="month"):
+        """Return [(period start date, bucket)] in chronological order"""
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        buckets = self.rollup(cactus_name).buckets[period]
+        return [(period_start(key), buckets[key]) for key in sorted(buckets)]
+
+    def totals(self, cactus_name):
+        """Running totals of a cactus: event counts, last and max height, overall growth"""
+        return self.rollup(cactus_name).totals
+
+    def period_for_span(self, cactus_name):
+        """Pick a chart granularity that keeps the number of bars readable"""
+        buckets = self.rollup(cactus_name).buckets
+        if len(buckets["day"]) <= 90:
+            return "day"
+        if len(buckets["week"]) <= 104:
+            return "week"
+        return "month"
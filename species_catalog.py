@@ -0,0 +1,172 @@
+import json
+import os
+from bisect import bisect_left
+from collections import OrderedDict
+from difflib import get_close_matches
+
+INDEX_VERSION = 1
+
+
+def normalize_name(name):
+    return " ".join(name.lower().replace("ё", "е").split())
+
+
+class SpeciesCatalog:
+    """Species catalog with a compact name index and lazily loaded detail records
+
+    The JSON catalog is parsed only when the index is missing or stale. The index keeps
+    names, synonyms and common names; detail records are stored one per line in a side
+    file and read by byte offset on first access. When the side files cannot be written (a
+    read-only directory) or a catalog is passed in directly, records are served from memory.
+    """
+
+    def __init__(self, species_file, cache_size=256, catalog=None):
+        self.species_file = species_file
+        self.records_file = species_file + ".records"
+        self.index_file = species_file + ".idx"
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._names = []
+        self._locations = {}
+        self._lookup = {}
+        self._sorted_keys = []
+        self._records = None  # Parsed catalog, when records are not read from the side file
+        if catalog is not None:
+            self._records = catalog
+            self._apply_index(self._build_index(catalog)[0])
+        else:
+            self._load_index()
+
+    def _source_stamp(self):
+        stat = os.stat(self.species_file)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _load_index(self):
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("version") != INDEX_VERSION or index.get("source") != self._source_stamp() \
+                    or not os.path.exists(self.records_file):
+                raise ValueError("stale index")
+        except (OSError, ValueError):
+            index = self.rebuild_index()
+        self._apply_index(index)
+
+    def rebuild_index(self):
+        """Parse the full catalog once and write the records file and the name index
+
+        A catalog that is not a JSON object of species records raises ValueError.
+        """
+        with open(self.species_file, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+        if not isinstance(catalog, dict) or not all(isinstance(record, dict) for record in catalog.values()):
+            raise ValueError("catalog must map species names to records")
+        index, lines = self._build_index(catalog)
+        index["source"] = self._source_stamp()
+        try:
+            with open(self.records_file, "wb") as f:
+                f.writelines(lines)
+            with open(self.index_file, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+        except OSError:
+            # Read-only directory: keep the index in memory and serve records from the parsed catalog
+            self._records = catalog
+        self._cache.clear()
+        return index
+
+    def _build_index(self, catalog):
+        """(index, record lines) of a parsed catalog; entries hold each line's offset and length"""
+        entries = []
+        lines = []
+        offset = 0
+        for name, record in catalog.items():
+            line = json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
+            entries.append([name, record.get("common_name", ""), record.get("synonyms", []), offset, len(line)])
+            lines.append(line)
+            offset += len(line)
+        index = {"version": INDEX_VERSION, "entries": entries, "keys": self._build_search_keys(entries)}
+        return index, lines
+
+    @staticmethod
+    def _aliases(entry):
+        name, common_name, synonyms = entry[:3]
+        return [alias for alias in [name, common_name, *synonyms] if alias]
+
+    def _build_search_keys(self, entries):
+        # Every word suffix of a name is searchable by prefix, so "elong" finds "Mammillaria elongata"
+        keys = set()
+        for entry in entries:
+            for alias in self._aliases(entry):
+                words = normalize_name(alias).split(" ")
+                for i in range(len(words)):
+                    keys.add((" ".join(words[i:]), entry[0]))
+        return sorted(keys)
+
+    def _apply_index(self, index):
+        self._names = []
+        self._locations = {}
+        self._lookup = {}
+        for entry in index["entries"]:
+            name, offset, length = entry[0], entry[3], entry[4]
+            self._names.append(name)
+            self._locations[name] = (offset, length)
+            for alias in self._aliases(entry):
+                self._lookup.setdefault(normalize_name(alias), name)
+        self._sorted_keys = [tuple(key) for key in index["keys"]]
+
+    def names(self):
+        return list(self._names)
+
+    def resolve(self, name):
+        """Return the canonical name for a name, synonym or common name"""
+        if name in self._locations:
+            return name
+        return self._lookup.get(normalize_name(name))
+
+    def get(self, name):
+        """Return the detail record for a species, loading it from disk on first access"""
+        canonical = self.resolve(name) if name else None
+        if canonical is None:
+            return {}
+        record = self._cache.get(canonical)
+        if record is not None:
+            self._cache.move_to_end(canonical)
+            return record
+        if self._records is not None:
+            record = self._records[canonical]
+        else:
+            offset, length = self._locations[canonical]
+            with open(self.records_file, "rb") as f:
+                f.seek(offset)
+                record = json.loads(f.read(length))
+        self._cache[canonical] = record
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return record
+
+    def search(self, text, limit=20):
+        """Return canonical names matching text by word prefix, falling back to fuzzy matching"""
+        query = normalize_name(text)
+        if not query:
+            return self._names[:limit]
+        results = []
+        seen = set()
+        i = bisect_left(self._sorted_keys, (query, ""))
+        while i < len(self._sorted_keys) and len(results) < limit:
+            key, name = self._sorted_keys[i]
+            if not key.startswith(query):
+                break
+            if name not in seen:
+                seen.add(name)
+                results.append(name)
+            i += 1
+        if not results and len(query) >= 3:
+            candidates = [alias for alias in self._lookup if alias[0] == query[0]]
+            for alias in get_close_matches(query, candidates, n=limit, cutoff=0.6):
+                name = self._lookup[alias]
+                if name not in seen:
+                    seen.add(name)
+                    results.append(name)
+                    if len(results) >= limit:
+                        break
+        return results
@@ -1,13 +1,15 @@
 import json
 import os
+from species_catalog import SpeciesCatalog
 
 class SpeciesDatabase:
     def __init__(self, species_file="cactus_species.json"):
         self.species_file = species_file
-        self.species_data = self.load_species()
+        self.load_error = None  # Why the user's catalog could not be used, if it could not
+        self.catalog = self.load_species()
 
     def load_species(self):
-        """Load cactus species data from JSON file"""
+        """Open the indexed species catalog, creating the default catalog if needed"""
         default_species = {
             "Echinocactus grusonii": {
                 "common_name": "Золотой бочонок",
@@ -55,20 +57,28 @@ class SpeciesDatabase:
 
         if os.path.exists(self.species_file):
             try:
-                with open(self.species_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except json.JSONDecodeError:
-                pass
+                return SpeciesCatalog(self.species_file)
+            except ValueError as e:
+                # Never overwrite the user's catalog: use the defaults until the file is fixed
+                self.load_error = f"Каталог видов {self.species_file} не прочитан ({e}), используется встроенный"
+                return SpeciesCatalog(self.species_file, catalog=default_species)
 
-        # Save default species if file doesn't exist or is invalid
-        with open(self.species_file, 'w', encoding='utf-8') as f:
-            json.dump(default_species, f, ensure_ascii=False, indent=4)
-        return default_species
+        # Save default species if file doesn't exist
+        try:
+            with open(self.species_file, 'w', encoding='utf-8') as f:
+                json.dump(default_species, f, ensure_ascii=False, indent=4)
+        except OSError:
+            return SpeciesCatalog(self.species_file, catalog=default_species)
+        return SpeciesCatalog(self.species_file)
 
     def get_species_list(self):
         """Return list of species names"""
-        return list(self.species_data.keys())
+        return self.catalog.names()
 
     def get_species_data(self, species_name):
-        """Return data for a specific species"""
-        return self.species_data.get(species_name, {})
\ No newline at end of file
+        """Return data for a specific species, by name, synonym or common name"""
+        return self.catalog.get(species_name)
+
+    def search_species(self, text, limit=20):
+        """Return species names matching text by prefix or fuzzily"""
+        return self.catalog.search(text, limit)
\ No newline at end of file
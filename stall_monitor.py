@@ -0,0 +1,219 @@
+import json
+import os
+import sys
+import threading
+import time
+import tkinter
+import traceback
+from collections import Counter, deque
+from datetime import datetime
+from utils import DATE_FORMAT
+
+STACK_FRAMES = 12  # Innermost frames kept from each stack sample
+TK_IDLE = "<Tk: отрисовка и события>"  # Stalls with no Python callback running: redraws, geometry, Tcl
+
+
+def describe(func):
+    """Readable name of a Tk callback: module.Class.method, or where a lambda was defined"""
+    code = getattr(func, "__code__", None)
+    if code is not None and "func" in code.co_freevars and func.__closure__:
+        # Misc.after wraps the scheduled function in a closure named callit
+        return describe(func.__closure__[code.co_freevars.index("func")].cell_contents)
+    if getattr(func, "__name__", None) == "<lambda>":
+        # Buttons bind lambda h=handler: h(...); the default argument is the real handler
+        for default in func.__defaults__ or ():
+            if callable(default):
+                return describe(default)
+        return f"<lambda> {os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+    name = getattr(func, "__qualname__", None) or type(func).__qualname__
+    module = getattr(func, "__module__", None) or type(func).__module__
+    return f"{module}.{name}"
+
+
+class _MonitoredCallWrapper(tkinter.CallWrapper):
+    """tkinter.CallWrapper that reports every callback to the active StallMonitor"""
+
+    monitor = None
+
+    def __call__(self, *args):
+        monitor = self.monitor
+        if monitor is None:
+            return super().__call__(*args)
+        return monitor._call(self, args)
+
+
+class StallMonitor:
+    """Measure Tk event-loop latency and attribute stalls to the callback that caused them
+
+    A heartbeat scheduled with after every interval_ms measures how late it runs; a lag above
+    threshold_ms is a stall. Every Python callback Tk runs passes through tkinter.CallWrapper,
+    which the monitor replaces to know which handler is running. A sampler thread takes stack
+    samples of the Tk thread while a stall is in progress, so a report shows both the handler
+    and the line it was stuck in. Modal dialogs run a nested event loop in which the heartbeat
+    keeps beating, so time a handler spends waiting for the user is not counted.
+
+    Start it before the UI is built: only callbacks registered afterwards are attributed.
+    """
+
+    def __init__(self, root, interval_ms=100, threshold_ms=200, sample_ms=50, history=200):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.sample_ms = sample_ms
+        self.lags = deque(maxlen=history * 10)
+        self.recent = deque(maxlen=history)
+        self.offenders = {}
+        self.beats = 0
+        self._running = []  # Call wrappers of the callbacks on the Tk thread's stack
+        self._slowest = (None, 0.0)  # Slowest callback finished since the last beat
+        self._samples = []
+        self._sample_key = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._after_id = None
+        self._last_beat = None
+        self._tk_thread = None
+        self._original_wrapper = None
+
+    def start(self):
+        if self._after_id is not None:
+            return
+        self._original_wrapper = tkinter.CallWrapper
+        _MonitoredCallWrapper.monitor = self
+        tkinter.CallWrapper = _MonitoredCallWrapper
+        self._tk_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._after_id = self.root.after(self.interval_ms, self._beat)
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="stall-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        if self._after_id is None:
+            return
+        try:
+            self.root.after_cancel(self._after_id)
+        except tkinter.TclError:
+            pass  # The root is already destroyed
+        self._after_id = None
+        self._stop.set()
+        self._sampler.join()
+        tkinter.CallWrapper = self._original_wrapper
+        _MonitoredCallWrapper.monitor = None
+
+    def _call(self, wrapper, args):
+        start = time.perf_counter()
+        self._running.append(wrapper)
+        try:
+            return super(_MonitoredCallWrapper, wrapper).__call__(*args)
+        finally:
+            self._running.pop()
+            duration = time.perf_counter() - start
+            if duration > self._slowest[1]:
+                self._slowest = (wrapper, duration)
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = (now - self._last_beat) * 1000 - self.interval_ms
+        key = self._last_beat
+        self._last_beat = now
+        self.beats += 1
+        self.lags.append(max(lag, 0.0))
+        if lag > self.threshold_ms:
+            self._record(lag, key)
+        self._slowest = (None, 0.0)
+        self._after_id = self.root.after(self.interval_ms, self._beat)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_ms / 1000):
+            key = self._last_beat
+            if (time.perf_counter() - key) * 1000 - self.interval_ms <= self.threshold_ms:
+                continue
+            frame = sys._current_frames().get(self._tk_thread)
+            if frame is None:
+                continue
+            try:
+                # The Tk thread pushes and pops concurrently: the list may empty after any check
+                running = self._running[-1]
+            except IndexError:
+                running = None
+            stack = [entry for entry in traceback.extract_stack(frame) if entry.filename != __file__][-STACK_FRAMES:]
+            del frame
+            with self._lock:
+                if self._sample_key != key:
+                    self._sample_key, self._samples = key, []
+                self._samples.append((running, stack))
+
+    def _record(self, lag, key):
+        """Add a stall that ended at this beat to the report"""
+        with self._lock:
+            samples = self._samples if self._sample_key == key else []
+            self._sample_key, self._samples = None, []
+        wrapper = next((running for running, _ in samples if running is not None), None)
+        if wrapper is None and self._slowest[1] * 1000 > self.threshold_ms:
+            # The stall ended before the sampler saw it (a C call holding the GIL, say)
+            wrapper = self._slowest[0]
+        handler = describe(wrapper.func) if wrapper is not None else TK_IDLE
+        stats = self.offenders.get(handler)
+        if stats is None:
+            stats = self.offenders[handler] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last": None,
+                                               "stack": None, "locations": Counter()}
+        stats["count"] += 1
+        stats["total_ms"] += lag
+        stats["last"] = datetime.now().strftime(DATE_FORMAT)
+        for _, stack in samples:
+            frame = stack[-1]
+            stats["locations"][f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"] += 1
+        if lag >= stats["max_ms"]:
+            stats["max_ms"] = lag
+            if samples:
+                stats["stack"] = "".join(traceback.format_list(samples[0][1]))
+        self.recent.append({"time": stats["last"], "handler": handler, "ms": round(lag)})
+
+    def percentile(self, fraction):
+        """Heartbeat lag in ms not exceeded by the given fraction of beats"""
+        if not self.lags:
+            return 0.0
+        lags = sorted(self.lags)
+        return lags[min(int(len(lags) * fraction), len(lags) - 1)]
+
+    def worst(self, limit=10, key="total_ms"):
+        """(handler, stats) of the worst offenders, by total or max stall time"""
+        return sorted(self.offenders.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+
+    def report(self, limit=10):
+        """Plain-text report of the event-loop latency and the worst offenders"""
+        lines = [f"Тактов: {self.beats}, задержка цикла событий: медиана {self.percentile(0.5):.0f} мс, "
+                 f"99% {self.percentile(0.99):.0f} мс, максимум {max(self.lags, default=0):.0f} мс",
+                 f"Замираний дольше {self.threshold_ms} мс: {sum(s['count'] for s in self.offenders.values())}",
+                 ""]
+        for place, (handler, stats) in enumerate(self.worst(limit), start=1):
+            lines.append(f"{place}. {handler}: замираний {stats['count']}, всего {stats['total_ms']:.0f} мс, "
+                         f"худшее {stats['max_ms']:.0f} мс, последнее {stats['last']}")
+            for location, count in stats["locations"].most_common(3):
+                lines.append(f"   место: {location} (выборок: {count})")
+            if stats["stack"]:
+                lines.append("   стек худшего замирания:")
+                lines.extend("   " + line for line in stats["stack"].rstrip().splitlines())
+            lines.append("")
+        return "\n".join(lines)
+
+    def dump(self, file_path, limit=10):
+        """Write the report to a file: JSON for .json, plain text otherwise"""
+        if file_path.lower().endswith(".json"):
+            payload = {
+                "beats": self.beats,
+                "threshold_ms": self.threshold_ms,
+                "lag_ms": {"p50": self.percentile(0.5), "p99": self.percentile(0.99),
+                           "max": max(self.lags, default=0.0)},
+                "offenders": [dict(stats, handler=handler, locations=stats["locations"].most_common(10))
+                              for handler, stats in self.worst(limit)],
+                "recent": list(self.recent)
+            }
+            text = json.dumps(payload, ensure_ascii=False, indent=2)
+        else:
+            text = self.report(limit)
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return file_path
@@ -0,0 +1,227 @@
+import gzip
+import json
+import os
+import sys
+import uuid
+import zlib
+from array import array
+from compact_model import ABSENT, CompactEventList, StringPool, compact_cactuses, json_default
+from indexed_store import INDEXED_MAGIC, LazyCactuses, read_indexed, write_indexed
+
+FORMATS = ("json", "json-compact", "json-gz", "columnar", "indexed")
+GZIP_MAGIC = b"\x1f\x8b"
+COLUMNAR_MAGIC = b"CACTCOL1"
+
+
+def detect_format(file_path):
+    """Return the format of a data file from its first bytes"""
+    with open(file_path, "rb") as f:
+        head = f.read(len(COLUMNAR_MAGIC))
+    if head.startswith(COLUMNAR_MAGIC):
+        return "columnar"
+    if head.startswith(INDEXED_MAGIC):
+        return "indexed"
+    if head.startswith(GZIP_MAGIC):
+        return "json-gz"
+    # Pretty-printed JSON breaks the line right after the opening brace, compact JSON never does
+    if head.startswith(b'{"'):
+        return "json-compact"
+    return "json"
+
+
+def read_data(file_path, event_types, compact=False, lazy=False):
+    """Load a data file in any supported format; return (data, format)
+
+    Malformed files raise ValueError. With compact=True event lists are returned as
+    CompactEventList columns; columnar files load straight into them without a dict per event.
+    With lazy=True an indexed file is memory-mapped and data["cactuses"] is a LazyCactuses
+    that decodes each record on first access; other formats are always read whole.
+    """
+    file_format = detect_format(file_path)
+    if file_format == "indexed":
+        return read_indexed(file_path, event_types, compact, lazy), file_format
+    if file_format == "columnar":
+        with open(file_path, "rb") as f:
+            return decode_columnar(f.read(), event_types, compact), file_format
+    try:
+        if file_format == "json-gz":
+            with gzip.open(file_path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        else:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+    except (OSError, EOFError) as e:
+        if file_format == "json-gz":
+            raise ValueError(f"Corrupt compressed data file: {e}")
+        raise
+    if compact and isinstance(data.get("cactuses"), dict):
+        compact_cactuses(data["cactuses"], event_types)
+    return data, file_format
+
+
+def write_data(file_path, data, event_types, file_format="json"):
+    """Write data atomically: to a temporary file first, then replace the target"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown data format: {file_format}")
+    cactuses = data.get("cactuses")
+    # A lazily loaded file being rewritten in place must be unmapped before it is replaced
+    source = cactuses.source if isinstance(cactuses, LazyCactuses) else None
+    if source is not None and source.path != os.path.abspath(file_path):
+        source = None
+    if file_format != "indexed" and isinstance(cactuses, LazyCactuses):
+        data = dict(data, cactuses=dict(cactuses.items()))
+    temp = f"{file_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        if file_format == "indexed":
+            with open(temp, "wb") as f:
+                write_indexed(f, data)
+        elif file_format == "columnar":
+            with open(temp, "wb") as f:
+                f.write(encode_columnar(data, event_types))
+        elif file_format == "json-gz":
+            with gzip.open(temp, "wt", encoding="utf-8", compresslevel=1) as f:
+                json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        else:
+            with open(temp, "w", encoding="utf-8") as f:
+                if file_format == "json":
+                    json.dump(data, f, ensure_ascii=False, indent=4, default=json_default)
+                else:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"), default=json_default)
+        if source is None:
+            os.replace(temp, file_path)
+        else:
+            # No record may be decoded between unmapping the old file and mapping the new one
+            with source.lock:
+                source.close()
+                try:
+                    os.replace(temp, file_path)
+                finally:
+                    if file_format == "indexed":
+                        # Undecoded records are read from the new file from now on; in other formats
+                        # every record was decoded above and the mapping is no longer needed
+                        source.open()
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+
+
+def encode_columnar(data, event_types):
+    """Binary columnar encoding: a JSON manifest followed by the raw event columns, zlib-compressed
+
+    Each event list is stored as its date, height and field-code arrays; field values are
+    dictionary-encoded in a single string table shared by the whole file.
+    """
+    pool = StringPool()
+    remaps = {}
+    lists = []
+    chunks = []
+    cactuses = {}
+    for name, cactus_data in data["cactuses"].items():
+        stored = dict(cactus_data)
+        for event_type in event_types:
+            events = cactus_data.get(event_type)
+            if events is None:
+                continue
+            if isinstance(events, CompactEventList):
+                remap = remaps.get(id(events.pool))
+                if remap is None:
+                    remap = remaps[id(events.pool)] = [ABSENT] + [pool.encode(v) for v in events.pool.values[1:]]
+                columns = {field: array("I", map(remap.__getitem__, events.columns[field]))
+                           for field in events.fields}
+            else:
+                events = CompactEventList(pool, events)
+                columns = events.columns
+            lists.append({"count": len(events), "height": events.has_height, "fields": list(events.fields)})
+            chunks.append(events.dates.tobytes())
+            if events.has_height:
+                chunks.append(events.heights.tobytes())
+            chunks.extend(columns[field].tobytes() for field in events.fields)
+            stored[event_type] = {"$columns": len(lists) - 1}
+        cactuses[name] = stored
+    manifest = {key: value for key, value in data.items() if key != "cactuses"}
+    manifest = {"data": dict(manifest, cactuses=cactuses), "pool": pool.values[1:], "lists": lists,
+                "byteorder": sys.byteorder}
+    header = json.dumps(manifest, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8")
+    payload = len(header).to_bytes(8, "little") + header + b"".join(chunks)
+    return COLUMNAR_MAGIC + zlib.compress(payload, 1)
+
+
+def decode_columnar(raw, event_types, compact=False):
+    """Inverse of encode_columnar"""
+    try:
+        payload = zlib.decompress(raw[len(COLUMNAR_MAGIC):])
+        header_length = int.from_bytes(payload[:8], "little")
+        manifest = json.loads(payload[8:8 + header_length].decode("utf-8"))
+    except (zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(f"Corrupt columnar data file: {e}")
+    swap = manifest["byteorder"] != sys.byteorder
+    pool = StringPool.from_values(manifest["pool"])
+    offset = 8 + header_length
+
+    def take(typecode, count):
+        nonlocal offset
+        column = array(typecode)
+        size = column.itemsize * count
+        column.frombytes(payload[offset:offset + size])
+        offset += size
+        if swap:
+            column.byteswap()
+        return column
+
+    event_lists = []
+    for spec in manifest["lists"]:
+        dates = take("q", spec["count"])
+        heights = take("d", spec["count"]) if spec["height"] else None
+        columns = {field: take("I", spec["count"]) for field in spec["fields"]}
+        events = CompactEventList.from_columns(pool, dates, heights, columns)
+        event_lists.append(events if compact else list(events))
+    if offset != len(payload):
+        raise ValueError("Corrupt columnar data file: unexpected column length")
+
+    data = manifest["data"]
+    for cactus_data in data["cactuses"].values():
+        for event_type in event_types:
+            stored = cactus_data.get(event_type)
+            if isinstance(stored, dict) and "$columns" in stored:
+                cactus_data[event_type] = event_lists[stored["$columns"]]
+    return data
+
+
+def benchmark(file_path, event_types, repeat=3):
+    """Measure file size and load/save time of every format for a data file"""
+    import tempfile
+    import time
+
+    data, _ = read_data(file_path, event_types)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for file_format in FORMATS:
+            target = os.path.join(directory, f"data.{file_format}")
+            save_times, load_times = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                write_data(target, data, event_types, file_format)
+                save_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                read_data(target, event_types)
+                load_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            read_data(target, event_types, compact=True)
+            compact_load = time.perf_counter() - start
+            results.append({"format": file_format, "size": os.path.getsize(target), "save": min(save_times),
+                            "load": min(load_times), "load_compact": compact_load})
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    from data_manager import EVENT_TYPES
+
+    parser = argparse.ArgumentParser(description="Сравнение форматов файла данных")
+    parser.add_argument("data", help="файл данных в любом поддерживаемом формате")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(f"{'формат':<14}{'размер, КБ':>12}{'запись, с':>12}{'чтение, с':>12}{'чтение compact, с':>20}")
+    for row in benchmark(args.data, EVENT_TYPES, args.repeat):
+        print(f"{row['format']:<14}{row['size'] / 1024:>12.0f}{row['save']:>12.3f}{row['load']:>12.3f}"
+              f"{row['load_compact']:>20.3f}")
@@ -0,0 +1,263 @@
+import hashlib
+import json
+from bisect import bisect_left
+from datetime import datetime
+from compact_model import CompactEventList, json_default
+from event_index import list_ids
+from utils import event_date
+
+STAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SUMMARY_FORMAT = "cactus-sync-summary/1"
+DELTA_FORMAT = "cactus-sync-delta/1"
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=json_default)
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def stamp(cactus_data, field, moment=None):
+    """Remember when a scalar field of a cactus was changed, for last-writer-wins merging"""
+    cactus_data.setdefault("modified", {})[field] = (moment or datetime.now()).strftime(STAMP_FORMAT)
+
+
+def _month(record):
+    return (record.get("date") or "")[:7]
+
+
+def bucket_events(cactus_name, event_type, events):
+    """Group events by month as {month: {event id: record}}"""
+    buckets = {}
+    for event_id, record in zip(list_ids(cactus_name, event_type, events), events):
+        buckets.setdefault(_month(record), {})[event_id] = record
+    return buckets
+
+
+def _bucket_digest(bucket):
+    # Records with an explicit id can change under the same key, so their content is hashed too
+    parts = sorted(key if "id" not in record else f"{key}:{_digest(_canonical(record))}"
+                   for key, record in bucket.items())
+    return _digest("\n".join(parts))
+
+
+def _newer(record, other):
+    """Deterministic winner of two versions of one event, whichever side it is evaluated on"""
+    return (record.get("modified", ""), _canonical(record)) > (other.get("modified", ""), _canonical(other))
+
+
+def merge_events(cactus_name, event_type, events, incoming, deleted=None):
+    """Union of two event lists keyed by event id, minus the ids in deleted
+
+    Return the merged list sorted by date, or None when nothing changed.
+    """
+    merged = dict(zip(list_ids(cactus_name, event_type, events), events))
+    changed = False
+    for event_id, record in zip(list_ids(cactus_name, event_type, incoming), incoming):
+        current = merged.get(event_id)
+        if current is None or (current != record and _newer(record, current)):
+            merged[event_id] = record
+            changed = True
+    for event_id in deleted or ():
+        if merged.pop(event_id, None) is not None:
+            changed = True
+    if not changed:
+        return None
+    return sorted(merged.values(), key=event_date)
+
+
+def merge_deleted(cactus_data, deleted):
+    """Union of the deleted-event ids of a cactus with another copy's; return True if any were new"""
+    changed = False
+    for event_type, stamps in deleted.items():
+        ours = cactus_data.setdefault("deleted", {}).setdefault(event_type, {})
+        for event_id, when in stamps.items():
+            if event_id not in ours:
+                ours[event_id] = when
+                changed = True
+    return changed
+
+
+def merge_fields(cactus_data, fields, event_types):
+    """Last-writer-wins merge of the scalar fields of a cactus; return True if anything changed
+
+    Fields without a modification stamp lose to stamped ones; ties are broken by value so
+    both copies pick the same winner. A cleared field (clear_field) keeps its stamp, so a
+    newer clear removes the field and an older one loses to the value.
+    """
+    ours_stamps = cactus_data.get("modified", {})
+    theirs_stamps = fields.get("modified", {})
+    changed = False
+    for field, theirs_stamp in theirs_stamps.items():
+        if field not in fields and field in cactus_data and theirs_stamp > ours_stamps.get(field, ""):
+            del cactus_data[field]
+            stamp(cactus_data, field, datetime.strptime(theirs_stamp, STAMP_FORMAT))
+            changed = True
+    for field, value in fields.items():
+        if field in ("modified", "deleted") or field in event_types:
+            continue
+        theirs_stamp = theirs_stamps.get(field, "")
+        if field not in cactus_data and ours_stamps.get(field, "") > theirs_stamp:
+            continue  # Cleared here after their change
+        if field in cactus_data:
+            ours_stamp = ours_stamps.get(field, "")
+            if cactus_data[field] == value:
+                if theirs_stamp > ours_stamp:
+                    stamp(cactus_data, field, datetime.strptime(theirs_stamp, STAMP_FORMAT))
+                    changed = True
+                continue
+            if (ours_stamp, _canonical(cactus_data[field])) >= (theirs_stamp, _canonical(value)):
+                continue
+        cactus_data[field] = value
+        if theirs_stamp:
+            stamp(cactus_data, field, datetime.strptime(theirs_stamp, STAMP_FORMAT))
+        changed = True
+    return changed
+
+
+class CollectionSync:
+    """Exchange and merge changes between two copies of the collection file
+
+    Each cactus is summarized by a digest of its scalar fields and of its events grouped by
+    month, so an unchanged cactus is skipped with a single digest comparison and a changed one
+    only ships the months that differ. Events merge as a union keyed by event id, minus events
+    either copy deleted; scalar fields such as notes or watering_frequency merge by
+    last-writer-wins.
+
+    Copies without a shared connection sync through plain files: one side writes a summary,
+    the other answers with a delta of what the summary lacks, and the first applies it.
+
+    Month digests are cached per history. The DataManager listeners drop them when events
+    change; histories changed any other way (undo, archive reads) are detected by their
+    length and last date, like rollups do.
+    """
+
+    def __init__(self, data_manager, event_types):
+        self.data_manager = data_manager
+        self.event_types = event_types
+        self._digests = {}  # (cactus, event type) -> (history signature, {month: digest})
+        data_manager.listeners.append(lambda cactus_name, event_type, record: self.invalidate(cactus_name, event_type))
+
+    def invalidate(self, cactus_name=None, event_type=None):
+        """Drop cached month digests of one history, of one cactus, or of all cactuses"""
+        if cactus_name is None:
+            self._digests.clear()
+            return
+        for name in ([event_type] if event_type is not None else self.event_types):
+            self._digests.pop((cactus_name, name), None)
+
+    def _month_digests(self, name, event_type, events):
+        signature = (len(events), events[-1]["date"] if events else None)
+        cached = self._digests.get((name, event_type))
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        digests = {month: _bucket_digest(bucket) for month, bucket in bucket_events(name, event_type, events).items()}
+        self._digests[(name, event_type)] = (signature, digests)
+        return digests
+
+    def _summarize(self, name, cactus_data):
+        """Summary of one cactus: a digest of everything and one per month of each history"""
+        buckets = {event_type: self._month_digests(name, event_type, cactus_data.get(event_type, ()))
+                   for event_type in self.event_types}
+        fields = {key: value for key, value in cactus_data.items() if key not in self.event_types}
+        return {"digest": _digest(_canonical([fields, buckets])), "buckets": buckets}
+
+    @staticmethod
+    def _month_records(name, event_type, events, month):
+        """Records of one month with their ids; a month never splits a same-date run, so slicing keeps ids exact"""
+        start = bisect_left(events, month, key=event_date)
+        end = bisect_left(events, f"{month}\uffff", key=event_date)
+        return bucket_events(name, event_type, events[start:end]).get(month, {}).values()
+
+    def summary(self):
+        """Digests of every cactus and of each month of its history"""
+        return {"format": SUMMARY_FORMAT,
+                "cactuses": {name: self._summarize(name, cactus_data)
+                             for name, cactus_data in self.data_manager.data["cactuses"].items()}}
+
+    def delta(self, peer_summary):
+        """Everything the peer described by peer_summary lacks
+
+        For each cactus that differs: all scalar fields (they are small) and the events of
+        every month whose digest differs. Cactuses the peer does not have are sent whole.
+        """
+        if peer_summary.get("format") != SUMMARY_FORMAT:
+            raise ValueError("Not a sync summary file")
+        peer = peer_summary["cactuses"]
+        changes = {}
+        for name, cactus_data in self.data_manager.data["cactuses"].items():
+            ours = self._summarize(name, cactus_data)
+            theirs = peer.get(name)
+            if theirs is not None and theirs["digest"] == ours["digest"]:
+                continue
+            # Copied, so merging the other way before this delta is applied cannot change it
+            fields = {key: value for key, value in cactus_data.items() if key not in self.event_types}
+            change = {"fields": json.loads(_canonical(fields)), "events": {}}
+            for event_type in self.event_types:
+                their_months = theirs["buckets"].get(event_type, {}) if theirs is not None else {}
+                events = cactus_data.get(event_type, ())
+                records = [record for month, digest in ours["buckets"][event_type].items()
+                           if their_months.get(month) != digest
+                           for record in self._month_records(name, event_type, events, month)]
+                if records:
+                    change["events"][event_type] = records
+            changes[name] = change
+        return {"format": DELTA_FORMAT, "cactuses": changes}
+
+    def apply(self, delta):
+        """Merge a delta into the collection and save it; return the names of changed cactuses"""
+        if delta.get("format") != DELTA_FORMAT:
+            raise ValueError("Not a sync delta file")
+        cactuses = self.data_manager.data["cactuses"]
+        changed = []
+        for name, change in sorted(delta["cactuses"].items()):
+            cactus_data = cactuses.get(name)
+            if cactus_data is None:
+                cactus_data = cactuses[name] = {event_type: [] for event_type in self.event_types}
+            updated = merge_fields(cactus_data, change["fields"], self.event_types)
+            updated |= merge_deleted(cactus_data, change["fields"].get("deleted", {}))
+            deleted = cactus_data.get("deleted", {})
+            for event_type in self.event_types:
+                records = change["events"].get(event_type, [])
+                if not records and not deleted.get(event_type):
+                    continue
+                events = cactus_data.get(event_type, [])
+                merged = merge_events(name, event_type, events, records, deleted.get(event_type))
+                if merged is None:
+                    continue
+                if isinstance(events, CompactEventList):
+                    merged = CompactEventList(events.pool, merged)
+                cactus_data[event_type] = merged
+                updated = True
+            if updated:
+                self.data_manager.rollups.invalidate(name)
+                self.data_manager.events.invalidate(name)
+                self.invalidate(name)
+                changed.append(name)
+        if changed:
+            self.data_manager.save_data()
+        return changed
+
+    def merge_with(self, other):
+        """Two-way sync with another DataManager; return (changed here, changed there)"""
+        other_sync = other.sync
+        incoming = other_sync.delta(self.summary())
+        outgoing = self.delta(other_sync.summary())
+        return self.apply(incoming), other_sync.apply(outgoing)
+
+
+def save_sync_file(file_path, payload):
+    """Write a summary or delta as JSON"""
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"), default=json_default)
+
+
+def load_sync_file(file_path):
+    """Read a summary or delta; malformed files raise ValueError"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if not isinstance(payload, dict) or payload.get("format") not in (SUMMARY_FORMAT, DELTA_FORMAT):
+        raise ValueError("Not a sync file")
+    return payload
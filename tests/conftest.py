@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_manager import DataManager  # noqa: E402
+
+
+def new_cactus(frequency=7, species="Не указан"):
+    return {
+        "watering": [],
+        "growth": [],
+        "photos": [],
+        "fertilizers": [],
+        "watering_frequency": frequency,
+        "notes": "",
+        "next_repotting": None,
+        "species": species
+    }
+
+
+@pytest.fixture
+def make_manager(tmp_path):
+    """Create a DataManager on a file in tmp_path holding the given cactus names"""
+    def make(file_name="data.json", names=("Астрофитум",), **kwargs):
+        data_manager = DataManager(str(tmp_path / file_name), **kwargs)
+        for name in names:
+            data_manager.data["cactuses"][name] = new_cactus()
+        data_manager.save_data()
+        return data_manager
+    return make
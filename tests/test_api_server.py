@@ -0,0 +1,74 @@
+import asyncio
+import json
+from urllib.parse import quote
+
+import pytest
+
+from api_server import CactusApiServer
+from data_manager import DataManager
+from species_database import SpeciesDatabase
+
+
+@pytest.fixture
+def server(make_manager, tmp_path):
+    data_manager = make_manager(names=("Астрофитум", "Маммиллярия"))
+    return CactusApiServer(data_manager, SpeciesDatabase(str(tmp_path / "species.json")), batch_delay=0)
+
+
+def request(server, method, target, payload=None, body=None):
+    if body is None:
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    return asyncio.run(server.dispatch(method, target, body))
+
+
+def test_list_cactuses(server):
+    status, payload = request(server, "GET", "/cactuses")
+    assert status == 200
+    assert sorted(c["name"] for c in payload) == ["Астрофитум", "Маммиллярия"]
+
+
+def test_add_event_is_saved(server):
+    status, record = request(server, "POST", "/events",
+                             {"cactus": "Астрофитум", "date": "05.06.2026 10:00", "comment": "утро"})
+    assert status == 201
+    assert record["date"] == "2026-06-05 10:00"
+    reloaded = DataManager(server.data_manager.data_file)
+    assert reloaded.data["cactuses"]["Астрофитум"]["watering"][0]["comment"] == "утро"
+    assert not server.persister._tasks
+
+
+def test_bulk_is_all_or_nothing(server):
+    status, _ = request(server, "POST", "/events/bulk", {"events": [
+        {"cactus": "Астрофитум"},
+        {"cactus": "Нет такого"},
+    ]})
+    assert status == 404
+    assert server.data_manager.data["cactuses"]["Астрофитум"]["watering"] == []
+
+
+def test_history_filters_by_type(server):
+    request(server, "POST", "/events", {"cactus": "Астрофитум", "type": "growth",
+                                        "height": 4.5, "date": "2026-06-05 10:00"})
+    status, history = request(server, "GET", f"/cactuses/{quote('Астрофитум')}/history?type=growth")
+    assert status == 200
+    assert [e["height"] for e in history["growth"]] == [4.5]
+
+
+@pytest.mark.parametrize("body", [
+    b"{not json",
+    b"\xff\xfe\xfa",
+    json.dumps({"cactus": ["Астрофитум"]}).encode("utf-8"),
+    json.dumps({"cactus": "Астрофитум", "type": ["watering"]}).encode("utf-8"),
+    json.dumps({"cactus": "Астрофитум", "date": "когда-нибудь"}).encode("utf-8"),
+    json.dumps({"cactus": "Астрофитум", "type": "growth"}).encode("utf-8"),
+    json.dumps(["Астрофитум"]).encode("utf-8"),
+])
+def test_bad_events_are_rejected_with_400(server, body):
+    status, payload = request(server, "POST", "/events", body=body)
+    assert status == 400
+    assert "error" in payload
+
+
+def test_unknown_routes(server):
+    assert request(server, "GET", "/nothing")[0] == 404
+    assert request(server, "DELETE", "/cactuses")[0] == 405
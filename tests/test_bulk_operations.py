@@ -0,0 +1,35 @@
+def test_undo_removes_the_batch(make_manager):
+    data_manager = make_manager(names=("Астрофитум", "Маммиллярия"))
+    data_manager.bulk_apply("frequency", ["Астрофитум"], value="12")
+    data_manager.bulk_add_watering(["Астрофитум", "Маммиллярия"], date="2026-06-01 09:00")
+    notified = []
+    data_manager.listeners.append(lambda name, event_type, record: notified.append(name))
+    entry = data_manager.undo_last_bulk()
+    assert entry["count"] == 2 and entry["not_reverted"] == []
+    assert sorted(notified) == ["Астрофитум", "Маммиллярия"]
+    cactuses = data_manager.data["cactuses"]
+    assert cactuses["Астрофитум"]["watering"] == cactuses["Маммиллярия"]["watering"] == []
+    assert data_manager.undo_last_bulk()["count"] == 1
+    assert cactuses["Астрофитум"]["watering_frequency"] == 7
+
+
+def test_undo_skips_edited_events(make_manager):
+    data_manager = make_manager(names=("Астрофитум", "Маммиллярия"))
+    data_manager.bulk_add_watering(["Астрофитум", "Маммиллярия"], date="2026-06-01 09:00")
+    data_manager.update_event(data_manager.event_ids("Астрофитум", "watering")[0], {"comment": "обильно"})
+    entry = data_manager.undo_last_bulk()
+    assert entry["count"] == 1
+    assert entry["not_reverted"] == [("Астрофитум", "watering")]
+    assert [e["comment"] for e in data_manager.data["cactuses"]["Астрофитум"]["watering"]] == ["обильно"]
+
+
+def test_undone_events_are_removed_from_synced_copies(make_manager):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    ours.bulk_add_watering(["Астрофитум"], date="2026-06-01 09:00")
+    ours.merge_data(theirs.data_file)
+    ours.undo_last_bulk()
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    assert ours.data["cactuses"]["Астрофитум"]["watering"] == []
+    assert theirs.data["cactuses"]["Астрофитум"]["watering"] == []
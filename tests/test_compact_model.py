@@ -0,0 +1,42 @@
+import pytest
+
+from compact_model import CompactEventList, StringPool
+from data_manager import EVENT_TYPES
+from storage import read_data, write_data
+
+RECORDS = [
+    {"date": "2026-06-01 09:00", "height": 4.5, "comment": ""},
+    {"date": "2026-06-02 09:00", "height": 5, "comment": "5.0"},
+    {"date": "2026-06-03 09:00", "height": None, "comment": ""},
+    {"date": "2026-06-04 09:00", "comment": "без замера"},
+    {"date": "2026-06-05 09:00", "height": True, "comment": 1},
+]
+
+
+def exact(records):
+    """Records with each value paired with its type, so 5 and 5.0 compare different"""
+    return [{key: (type(value), value) for key, value in record.items()} for record in records]
+
+
+def test_values_keep_their_type():
+    events = CompactEventList(StringPool(), RECORDS)
+    assert exact(events) == exact(RECORDS)
+    assert list(events[1]) == ["date", "height", "comment"]
+
+
+def test_replaced_and_inserted_records():
+    events = CompactEventList(StringPool(), RECORDS[:1])
+    events.append(RECORDS[2])
+    events[0] = RECORDS[1]
+    events.insert(0, RECORDS[0])
+    assert exact(events) == exact([RECORDS[0], RECORDS[1], RECORDS[2]])
+
+
+@pytest.mark.parametrize("file_format", ["columnar", "indexed", "json"])
+def test_heights_survive_storage(tmp_path, file_format):
+    path = str(tmp_path / "data.bin")
+    data = {"cactuses": {"Астрофитум": {event_type: [] for event_type in EVENT_TYPES}}}
+    data["cactuses"]["Астрофитум"]["growth"] = CompactEventList(StringPool(), RECORDS)
+    write_data(path, data, EVENT_TYPES, file_format)
+    loaded, _ = read_data(path, EVENT_TYPES, compact=True)
+    assert exact(loaded["cactuses"]["Астрофитум"]["growth"]) == exact(RECORDS)
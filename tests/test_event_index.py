@@ -0,0 +1,59 @@
+import pytest
+
+
+def add_twice(data_manager, comment=""):
+    for _ in range(2):
+        data_manager.add_event("Астрофитум", "watering", {"date": "2026-06-01 09:00", "comment": comment})
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_deleting_one_of_two_identical_events_keeps_the_other(make_manager, which):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    add_twice(ours)
+    ours.merge_data(theirs.data_file)
+    ours.delete_event(ours.event_ids("Астрофитум", "watering")[which])
+    ours.merge_data(theirs.data_file)
+    # Any later merge of the cactus applies the tombstones again
+    theirs.load_data()
+    theirs.add_event("Астрофитум", "watering", {"date": "2026-07-01 09:00", "comment": ""})
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    for data_manager in (ours, theirs):
+        dates = [e["date"] for e in data_manager.data["cactuses"]["Астрофитум"]["watering"]]
+        assert dates == ["2026-06-01 09:00", "2026-07-01 09:00"]
+
+
+def test_editing_one_of_two_identical_events(make_manager):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    add_twice(ours)
+    ours.merge_data(theirs.data_file)
+    ours.update_event(ours.event_ids("Астрофитум", "watering")[0], {"comment": "обильно"})
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    for data_manager in (ours, theirs):
+        comments = sorted(e["comment"] for e in data_manager.data["cactuses"]["Астрофитум"]["watering"])
+        assert comments == ["", "обильно"]
+
+
+def test_ids_stay_distinct_after_a_duplicate_is_removed(make_manager):
+    data_manager = make_manager()
+    add_twice(data_manager)
+    data_manager.delete_event(data_manager.event_ids("Астрофитум", "watering")[0])
+    add_twice(data_manager)
+    ids = data_manager.event_ids("Астрофитум", "watering")
+    assert len(set(ids)) == len(ids) == 3
+    for event_id in ids:
+        assert data_manager.get_event(event_id)[0] == "Астрофитум"
+
+
+def test_unknown_id_after_a_cactus_was_replaced(make_manager):
+    data_manager = make_manager(names=("Астрофитум", "Маммиллярия"))
+    assert data_manager.events.locate("нет такого") is None
+    cactuses = data_manager.data["cactuses"]
+    cactuses["Эхинокактус"] = cactuses.pop("Маммиллярия")
+    data_manager.add_event("Эхинокактус", "watering", {"date": "2026-06-01 09:00", "comment": ""})
+    event_id = data_manager.event_ids("Эхинокактус", "watering")[0]
+    data_manager.events.invalidate("Эхинокактус")
+    assert data_manager.get_event(event_id)[0] == "Эхинокактус"
@@ -0,0 +1,40 @@
+import pytest
+
+from growth_analytics import GrowthAnalytics
+from species_database import SpeciesDatabase
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def analytics(make_manager, tmp_path):
+    data_manager = make_manager()
+    for day, height in (("2026-03-01", 2.0), ("2026-04-01", 3.0), ("2026-05-01", 4.0)):
+        data_manager.add_event("Астрофитум", "growth", {"date": f"{day} 09:00", "height": height, "comment": ""})
+    return GrowthAnalytics(data_manager, SpeciesDatabase(str(tmp_path / "species.json")))
+
+
+def rate(analytics):
+    analytics.refresh()
+    return analytics._fits["Астрофитум"][1]["rate"]
+
+
+def test_unchanged_history_is_not_refit(analytics):
+    assert analytics.refresh() == 1
+    assert analytics.refresh() == 0
+
+
+def test_edited_height_is_refit(analytics):
+    before = rate(analytics)
+    data_manager = analytics.data_manager
+    data_manager.update_event(data_manager.event_ids("Астрофитум", "growth")[1], {"height": 6.0})
+    assert rate(analytics) != before
+
+
+def test_reloaded_history_is_refit(analytics):
+    before = rate(analytics)
+    data_manager = analytics.data_manager
+    data_manager.data["cactuses"]["Астрофитум"]["growth"][0]["height"] = 0.5
+    data_manager.save_data()
+    data_manager.load_data()
+    assert rate(analytics) != before
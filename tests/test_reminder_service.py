@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import pytest
+
+from data_manager import DataManager
+
+from reminder_service import ReminderService
+from species_database import SpeciesDatabase
+
+
+@pytest.fixture
+def service(make_manager, tmp_path):
+    data_manager = make_manager(names=("Астрофитум", "Маммиллярия"))
+    data_manager.set_field("Астрофитум", "watering_frequency", 10)
+    # Watered in winter (interval x1.5), due in spring (interval x1.0)
+    data_manager.add_event("Астрофитум", "watering", {"date": "2026-02-25 09:00", "comment": ""})
+    return ReminderService(data_manager, SpeciesDatabase(str(tmp_path / "species.json")))
+
+
+def test_due_date_uses_the_season_of_the_last_watering(service):
+    data_manager = service.data_manager
+    species_db = service.calendar.species_db
+    assert data_manager.next_watering("Астрофитум", species_db) == datetime(2026, 3, 12, 9, 0)
+    assert ("watering", datetime(2026, 3, 12, 9, 0)) in service.deadlines("Астрофитум")
+    due = dict(data_manager.get_due_cactuses(species_db, now=datetime(2026, 3, 13, 10, 0)))
+    assert due["Астрофитум"] == 1
+    assert "Астрофитум" not in dict(data_manager.get_due_cactuses(species_db, now=datetime(2026, 3, 10)))
+
+
+def test_bad_record_does_not_stop_scheduling(service, caplog):
+    service.data_manager.data["cactuses"]["Маммиллярия"]["next_repotting"] = "весной"
+    service.reschedule()
+    assert service.next_deadline()[1] == "Астрофитум"
+    assert "Маммиллярия" in caplog.text
+
+
+def test_scheduling_does_not_decode_a_lazily_loaded_file(service):
+    data_manager = service.data_manager
+    data_manager.add_event("Маммиллярия", "fertilizers",
+                           {"date": "2026-04-01 09:00", "type": "NPK", "dosage": "2 мл", "comment": ""})
+    data_manager.set_field("Маммиллярия", "next_repotting", "2027-03-01")
+    data_manager.file_format = "indexed"
+    data_manager.save_data()
+    lazy = DataManager(data_manager.data_file)
+    lazy_service = ReminderService(lazy, service.calendar.species_db)
+    lazy_service.reschedule()
+    assert not any(lazy.data["cactuses"].is_loaded(name) for name in lazy.data["cactuses"])
+    for name in ("Астрофитум", "Маммиллярия"):
+        assert lazy_service.deadlines(name) == service.deadlines(name)
+    lazy.release()
@@ -0,0 +1,103 @@
+import pytest
+
+from data_manager import DataManager, EVENT_TYPES
+from storage import FORMATS, detect_format, read_data, write_data
+from indexed_store import LazyCactuses
+
+
+def sample_data():
+    return {
+        "cactuses": {
+            "Астрофитум": {
+                "watering": [{"date": "2026-06-01 09:00", "comment": ""},
+                             {"date": "2026-06-08 09:30", "comment": "обильно", "id": "0123456789abcdef"}],
+                "growth": [{"date": "2026-06-01 09:00", "height": 4.5, "comment": ""},
+                           {"date": "2026-07-01 09:00", "height": 5, "comment": ""}],
+                "photos": [{"date": "2026-06-01 09:00", "path": "photos/a.jpg"}],
+                "fertilizers": [{"date": "2026-06-02 10:00", "type": "NPK 5-10-10", "dosage": "2 мл",
+                                 "comment": ""}],
+                "watering_frequency": 10,
+                "notes": "на окне",
+                "next_repotting": None,
+                "species": "Не указан"
+            },
+            "Пустой": {"watering": [], "growth": [], "photos": [], "fertilizers": [],
+                       "watering_frequency": 7, "notes": "", "next_repotting": "2027-03-01",
+                       "species": "Не указан"}
+        },
+        "achievements": {"stable_watering": {"completed": False, "days": 0}}
+    }
+
+
+def plain(data):
+    """Data with every cactus decoded and every event list as plain dicts"""
+    cactuses = data["cactuses"]
+    items = cactuses.items() if not isinstance(cactuses, LazyCactuses) else list(cactuses.items())
+    return dict(data, cactuses={name: {key: list(value) if key in EVENT_TYPES else value
+                                       for key, value in cactus.items()}
+                                for name, cactus in items})
+
+
+@pytest.mark.parametrize("file_format", FORMATS)
+@pytest.mark.parametrize("compact", [False, True])
+def test_round_trip(tmp_path, file_format, compact):
+    path = str(tmp_path / "data.bin")
+    write_data(path, sample_data(), EVENT_TYPES, file_format)
+    assert detect_format(path) == file_format
+    data, loaded_format = read_data(path, EVENT_TYPES, compact=compact, lazy=True)
+    assert loaded_format == file_format
+    assert plain(data) == sample_data()
+    if isinstance(data["cactuses"], LazyCactuses):
+        data["cactuses"].source.close()
+
+
+@pytest.mark.parametrize("file_format", ["columnar", "indexed"])
+def test_data_manager_saves_in_loaded_format(tmp_path, file_format):
+    path = str(tmp_path / "data.bin")
+    write_data(path, sample_data(), EVENT_TYPES, file_format)
+    data_manager = DataManager(path)
+    data_manager.add_event("Пустой", "watering", {"date": "2026-06-05 10:00", "comment": ""})
+    assert detect_format(path) == file_format
+    reloaded = DataManager(path)
+    assert reloaded.data["cactuses"]["Пустой"]["watering"][0]["date"] == "2026-06-05 10:00"
+    assert plain(reloaded.data)["cactuses"]["Астрофитум"] == sample_data()["cactuses"]["Астрофитум"]
+    data_manager.release()
+    reloaded.release()
+
+
+def test_corrupt_file_is_rejected(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_bytes(b"\x1f\x8b garbage")
+    with pytest.raises(ValueError):
+        read_data(str(path), EVENT_TYPES)
+
+
+def test_indexed_header_follows_the_records(tmp_path):
+    path = tmp_path / "data.bin"
+    write_data(str(path), sample_data(), EVENT_TYPES, "indexed")
+    raw = path.read_bytes()
+    header_offset = int.from_bytes(raw[8:16], "little")
+    assert raw[16:header_offset].startswith(b'{"watering":')
+    assert raw[header_offset:].endswith(b"}")
+    path.write_bytes(raw[:header_offset])  # Cut off before the header
+    with pytest.raises(ValueError):
+        read_data(str(path), EVENT_TYPES)
+
+
+def test_indexed_summaries_stand_in_for_undecoded_records(tmp_path):
+    path = str(tmp_path / "data.bin")
+    write_data(path, sample_data(), EVENT_TYPES, "indexed")
+    data_manager = DataManager(path)
+    cactuses = data_manager.data["cactuses"]
+    summary = data_manager.cactus_summary("Астрофитум")
+    assert not cactuses.is_loaded("Астрофитум")
+    assert summary["watering"] == [{"date": "2026-06-08 09:30"}]
+    assert summary["fertilizers"] == [{"date": "2026-06-02 10:00"}]
+    assert summary["watering_frequency"] == 10
+    assert data_manager.cactus_summary("Пустой")["next_repotting"] == "2027-03-01"
+    # Saving keeps the summaries of records that were never decoded
+    cactuses["Пустой"]["notes"] = "новое"
+    data_manager.save_data()
+    assert not cactuses.is_loaded("Астрофитум")
+    assert data_manager.cactus_summary("Астрофитум")["watering"] == [{"date": "2026-06-08 09:30"}]
+    data_manager.release()
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+from sync import load_sync_file, save_sync_file, stamp
+
+
+def history(data_manager, name="Астрофитум", event_type="watering"):
+    return [e["date"] for e in data_manager.data["cactuses"][name][event_type]]
+
+
+def test_merge_is_a_union(make_manager):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    ours.add_event("Астрофитум", "watering", {"date": "2026-06-01 09:00", "comment": ""})
+    theirs.add_event("Астрофитум", "watering", {"date": "2026-06-03 09:00", "comment": ""})
+    changed_here, changed_there = ours.merge_data(theirs.data_file)
+    assert changed_here == ["Астрофитум"] and changed_there == ["Астрофитум"]
+    theirs.load_data()
+    assert history(ours) == history(theirs) == ["2026-06-01 09:00", "2026-06-03 09:00"]
+    assert ours.merge_data(theirs.data_file) == ([], [])
+
+
+def test_deleted_event_stays_deleted(make_manager):
+    ours = make_manager("ours.json")
+    ours.add_event("Астрофитум", "watering", {"date": "2026-06-01 09:00", "comment": ""})
+    ours.add_event("Астрофитум", "watering", {"date": "2026-06-03 09:00", "comment": ""})
+    theirs = make_manager("theirs.json")
+    ours.merge_data(theirs.data_file)
+    ours.delete_event(ours.event_ids("Астрофитум", "watering")[0])
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    assert history(ours) == history(theirs) == ["2026-06-03 09:00"]
+
+
+def test_edited_event_replaces_the_original(make_manager):
+    ours = make_manager("ours.json")
+    ours.add_event("Астрофитум", "watering", {"date": "2026-06-01 09:00", "comment": ""})
+    theirs = make_manager("theirs.json")
+    ours.merge_data(theirs.data_file)
+    ours.update_event(ours.event_ids("Астрофитум", "watering")[0], {"comment": "обильно"})
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    assert [e["comment"] for e in theirs.data["cactuses"]["Астрофитум"]["watering"]] == ["обильно"]
+
+
+def set_field_at(data_manager, field, value, moment):
+    """set_field, or clear_field when value is None, as if done at moment"""
+    if value is None:
+        data_manager.clear_field("Астрофитум", field, save=False)
+    else:
+        data_manager.set_field("Астрофитум", field, value, save=False)
+    stamp(data_manager.data["cactuses"]["Астрофитум"], field, moment)
+    data_manager.save_data()
+
+
+def test_newer_field_wins(make_manager):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    set_field_at(ours, "notes", "старое", datetime(2026, 6, 1, 9, 0))
+    set_field_at(theirs, "notes", "новое", datetime(2026, 6, 2, 9, 0))
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    assert ours.data["cactuses"]["Астрофитум"]["notes"] == "новое"
+    assert theirs.data["cactuses"]["Астрофитум"]["notes"] == "новое"
+
+
+def test_newer_clear_wins(make_manager):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    set_field_at(ours, "watering_frequency", 12, datetime(2026, 6, 1, 9, 0))
+    set_field_at(theirs, "watering_frequency", None, datetime(2026, 6, 2, 9, 0))
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    assert "watering_frequency" not in ours.data["cactuses"]["Астрофитум"]
+    assert "watering_frequency" not in theirs.data["cactuses"]["Астрофитум"]
+
+
+def test_older_clear_loses(make_manager):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json")
+    set_field_at(ours, "watering_frequency", None, datetime(2026, 6, 1, 9, 0))
+    set_field_at(theirs, "watering_frequency", 12, datetime(2026, 6, 2, 9, 0))
+    ours.merge_data(theirs.data_file)
+    theirs.load_data()
+    assert ours.data["cactuses"]["Астрофитум"]["watering_frequency"] == 12
+    assert theirs.data["cactuses"]["Астрофитум"]["watering_frequency"] == 12
+
+
+def test_sync_through_files(make_manager, tmp_path):
+    ours = make_manager("ours.json")
+    theirs = make_manager("theirs.json", names=("Астрофитум", "Эхинокактус"))
+    theirs.add_event("Эхинокактус", "growth", {"date": "2026-06-01 09:00", "height": 3.0, "comment": ""})
+    save_sync_file(str(tmp_path / "summary.json"), ours.sync.summary())
+    delta = theirs.sync.delta(load_sync_file(str(tmp_path / "summary.json")))
+    save_sync_file(str(tmp_path / "delta.json"), delta)
+    assert ours.sync.apply(load_sync_file(str(tmp_path / "delta.json"))) == ["Эхинокактус"]
+    assert history(ours, "Эхинокактус", "growth") == ["2026-06-01 09:00"]
@@ -0,0 +1,29 @@
+import pytest
+
+from utils import normalize_event_date
+
+
+@pytest.mark.parametrize("value", [
+    "2026-06-05 10:00",
+    "2026-06-05T10:00",
+    "2026-06-05T10:00:00",
+    "05.06.2026 10:00",
+    "2026/06/05 10:00",
+])
+def test_normalize_event_date_formats(value):
+    assert normalize_event_date(value) == "2026-06-05 10:00"
+
+
+@pytest.mark.parametrize("value", ["05.06.2026", "2026/06/05", "2026-06-05"])
+def test_normalize_event_date_without_time(value):
+    assert normalize_event_date(value) == "2026-06-05 00:00"
+
+
+@pytest.mark.parametrize("value", ["2026-13-05 10:00", "завтра", "05.06.26 10:0"])
+def test_normalize_event_date_rejects_garbage(value):
+    with pytest.raises(ValueError):
+        normalize_event_date(value)
+
+
+def test_normalize_event_date_defaults_to_now():
+    assert len(normalize_event_date(None)) == 16
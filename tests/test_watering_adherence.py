@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from data_manager import DataManager
+from species_database import SpeciesDatabase
+from utils import DATE_FORMAT
+from watering_adherence import WateringAdherence
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def archived(make_manager, tmp_path):
+    """A collection whose older waterings were moved to the archive, loaded afresh"""
+    now = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
+    data_manager = make_manager(names=("Астрофитум", "Маммиллярия"))
+    for name in ("Астрофитум", "Маммиллярия"):
+        data_manager.set_field(name, "watering_frequency", 10, save=False)
+    # Weekly for two years, with a missed watering 40 days ago that ends the current streak
+    day = now - timedelta(days=730)
+    while day <= now - timedelta(days=3):
+        if not now - timedelta(days=60) < day < now - timedelta(days=40):
+            data_manager.add_event("Астрофитум", "watering", {"date": day.strftime(DATE_FORMAT), "comment": ""},
+                                   save=False)
+        day += timedelta(days=7)
+    # Last watered long ago: overdue, with nothing left in the hot window
+    data_manager.add_event("Маммиллярия", "watering",
+                           {"date": (now - timedelta(days=200)).strftime(DATE_FORMAT), "comment": ""})
+    data_manager.archive.archive_old(hot_days=90)
+    return DataManager(data_manager.data_file), SpeciesDatabase(str(tmp_path / "species.json")), now
+
+
+def test_hot_analysis_does_not_read_the_archive(archived):
+    data_manager, species_db, now = archived
+    years = data_manager.archive.unloaded_years()
+    assert years
+    per_cactus, collection = WateringAdherence(data_manager, species_db).analyze(now, full=False)
+    assert data_manager.archive.unloaded_years() == years
+    assert per_cactus["Маммиллярия"]["overdue"]
+    assert collection["overdue_cactuses"] == ["Маммиллярия"]
+
+
+def test_hot_analysis_matches_the_full_one_inside_the_window(archived):
+    data_manager, species_db, now = archived
+    adherence = WateringAdherence(data_manager, species_db)
+    hot, _ = adherence.analyze(now, full=False)
+    full, _ = adherence.analyze(now)
+    assert not data_manager.archive.unloaded_years()
+    for name in ("Астрофитум", "Маммиллярия"):
+        assert hot[name]["current_streak"] == full[name]["current_streak"]
+        assert hot[name]["overdue"] == full[name]["overdue"]
+    assert hot["Астрофитум"]["waterings"] < full["Астрофитум"]["waterings"]
+    # Once the archive is read, the hot path sees the whole history too
+    assert adherence.analyze(now, full=False)[0] == full
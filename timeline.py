@@ -0,0 +1,108 @@
+import heapq
+from bisect import bisect_left, bisect_right
+from utils import event_date
+
+
+def _descending(events, cactus_name, rank, stop):
+    """Yield merge keys of events[:stop] from newest to oldest"""
+    for position in range(stop - 1, -1, -1):
+        yield events[position]["date"], cactus_name, rank, position
+
+
+class Timeline:
+    """Activity of the whole collection, newest first, merged lazily from the per-plant histories
+
+    Every history list is already sorted by date, so the timeline is a k-way heap merge of the
+    lists read backwards. Each list is positioned by binary search on the page cursor or on the
+    date to jump to, and the merge only pulls as many events as the page shows: browsing recent
+    activity never walks the older history.
+    """
+
+    PAGE_SIZE = 50
+
+    def __init__(self, data_manager, event_types):
+        self.data_manager = data_manager
+        self.event_types = event_types
+
+    def _sources(self, event_types=None, names=None, species=None):
+        """Yield (cactus name, type rank, event list) of the lists passing the filters"""
+        cactuses = self.data_manager.data["cactuses"]
+        if species:
+            names = self.data_manager.bulk_operations.select(species=species, names=names)
+        elif names is None:
+            names = cactuses
+        types = [(rank, event_type) for rank, event_type in enumerate(self.event_types)
+                 if event_types is None or event_type in event_types]
+        for name in names:
+            cactus_data = cactuses.get(name)
+            if cactus_data is None:
+                continue
+            for rank, event_type in types:
+                events = cactus_data.get(event_type)
+                if events:
+                    yield name, rank, events
+
+    @staticmethod
+    def _stop(events, cactus_name, rank, cursor, before):
+        """Number of leading events of a list that come after the cursor in timeline order"""
+        if cursor is not None:
+            date, cursor_name, cursor_rank, run_offset = cursor
+            if (cactus_name, rank) == (cursor_name, cursor_rank):
+                # The cursor counts from the start of its same-date run, so it survives events
+                # being inserted elsewhere in the list (archived years read in, backdated entries)
+                return min(bisect_left(events, date, key=event_date) + run_offset, len(events))
+            if (cactus_name, rank) < (cursor_name, cursor_rank):
+                return bisect_right(events, date, key=event_date)
+            return bisect_left(events, date, key=event_date)
+        if before is not None:
+            return bisect_left(events, before, key=event_date)
+        return len(events)
+
+    def iterate(self, cursor=None, before=None, event_types=None, names=None, species=None):
+        """Yield (date, cactus name, type rank, position) newest first
+
+        Starts right after cursor (as returned by page) or, without one, strictly before the
+        date string before; event_types, names and species restrict the lists merged.
+        """
+        streams = [_descending(events, name, rank, self._stop(events, name, rank, cursor, before))
+                   for name, rank, events in self._sources(event_types, names, species)]
+        return heapq.merge(*streams, reverse=True)
+
+    def _cursor(self, key):
+        """Page cursor for a merge key: its position is made relative to its same-date run"""
+        date, name, rank, position = key
+        events = self.data_manager.data["cactuses"][name][self.event_types[rank]]
+        return date, name, rank, position - bisect_left(events, date, key=event_date)
+
+    def page(self, size=PAGE_SIZE, cursor=None, before=None, event_types=None, names=None, species=None):
+        """Return (entries, cursor of the next page or None)
+
+        Entries are dicts with date, cactus, type, record and id; pass the returned cursor
+        back with the same filters to continue. Archived years are read in as paging reaches them.
+        """
+        cactuses = self.data_manager.data["cactuses"]
+        entries = []
+        last = None
+        for key in self.iterate(cursor, before, event_types, names, species):
+            if len(entries) == size:
+                return entries, self._cursor(last)
+            date, name, rank, position = key
+            event_type = self.event_types[rank]
+            entries.append({
+                "date": date,
+                "cactus": name,
+                "type": event_type,
+                "record": cactuses[name][event_type][position],
+                "id": self.data_manager.events.id_at(name, event_type, position)
+            })
+            last = key
+        if last is not None:
+            cursor = self._cursor(last)
+        archive = self.data_manager.archive
+        if len(entries) == size:
+            return entries, cursor if archive.older_years(cursor[0]) else None
+        # The page ran past the loaded history: read the next archived year and continue from there
+        if archive.thaw_next(cursor[0] if cursor else before):
+            more, next_cursor = self.page(size - len(entries), cursor, before, event_types, names, species)
+            return entries + more, next_cursor
+        return entries, None
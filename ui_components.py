@@ -1,3 +1,4 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime, timedelta, date
@@ -7,6 +8,18 @@ from visualization import VisualizationManager
 from species_database import SpeciesDatabase
 from health_diagnosis import HealthDiagnosis
 from utils import sort_cactuses
+from event_importer import EventImporter
+from bulk_operations import BulkOperationError
+from watering_calendar import WateringCalendar
+from photo_analysis import PhotoHealthAnalyzer
+from growth_analytics import GrowthAnalytics
+from photo_store import PhotoStore
+from profile_view import ProfileView
+from reminder_service import ReminderService, TkSink
+from collection_report import CollectionReport
+from photo_export import PhotoExport
+from timeline import Timeline
+from data_manager import EVENT_TYPES
 
 
 class UIManager:
@@ -15,9 +28,15 @@ class UIManager:
         self.root = app.root
         self.data_manager = app.data_manager
         self.visualization_manager = app.visualization_manager
-        self.achievements_manager = AchievementsManager(app)
         self.species_db = SpeciesDatabase()
-        self.health_diagnosis = HealthDiagnosis()
+        self.achievements_manager = AchievementsManager(app, self.species_db)
+        self.health_diagnosis = HealthDiagnosis(season_model=self.data_manager.season_model)
+        self.watering_calendar = WateringCalendar(self.data_manager, self.species_db)
+        self.photo_analyzer = PhotoHealthAnalyzer(self.data_manager)
+        self.growth_analytics = GrowthAnalytics(self.data_manager, self.species_db)
+        self.reminder_service = ReminderService(self.data_manager, self.species_db, sinks=[TkSink(self.root)],
+                                                calendar=self.watering_calendar)
+        self.photo_store = PhotoStore()
 
     def create_main_window(self):
         """Create the main window"""
@@ -47,24 +66,47 @@ class UIManager:
         self.sort_dropdown.bind("<<ComboboxSelected>>", lambda e: self.update_cactus_dropdown())
 
         ttk.Button(self.cactus_frame, text="Подсказки по уходу", command=self.show_care_tips).pack(side="left", padx=5)
-        ttk.Button(self.cactus_frame, text="Экспорт данных",
-                   command=lambda: self.data_manager.export_data(self.root)).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Экспорт данных", command=self.export_data).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Отчёт с графиками", command=self.export_report).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Экспорт фото", command=self.export_photos).pack(side="left", padx=5)
         ttk.Button(self.cactus_frame, text="Достижения", command=self.achievements_manager.show_achievements).pack(
             side="left", padx=5)
-        ttk.Button(self.cactus_frame, text="Создать резервную копию", command=self.data_manager.backup_data).pack(
+        ttk.Button(self.cactus_frame, text="Создать резервную копию", command=self.backup_data).pack(
             side="left", padx=5)
         ttk.Button(self.cactus_frame, text="Восстановить данные", command=self.restore_data).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Синхронизировать", command=self.merge_data).pack(side="left", padx=5)
         ttk.Button(self.cactus_frame, text="Массовая обработка", command=self.bulk_processing).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Импорт истории", command=self.import_history).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Календарь ухода", command=self.show_calendar).pack(side="left", padx=5)
+        self.analyze_photos_button = ttk.Button(self.cactus_frame, text="Анализ фото", command=self.analyze_photos)
+        self.analyze_photos_button.pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Анализ роста", command=self.show_growth_analysis).pack(side="left", padx=5)
+        ttk.Button(self.cactus_frame, text="Лента событий", command=self.show_timeline).pack(side="left", padx=5)
 
         self.update_cactus_dropdown()
 
         self.content_frame = ttk.Frame(self.root)
         self.content_frame.pack(fill="both", expand=True, padx=20, pady=10)
+        self.profile_view = ProfileView(self, self.content_frame)
+        self.cactus_canvas = self.profile_view.cactus_canvas
+        self.health_indicator = self.profile_view.health_indicator
+        self.freq_entry = self.profile_view.freq_entry
+        self.reminder_label = self.profile_view.reminder_label
+        self.repotting_label = self.profile_view.repotting_label
+        self.notes_text = self.profile_view.notes_text
+        self.history_text = self.profile_view.history_text
+        self.history_lines = {}  # Line of the history pane -> id of the event shown there
+        self.reminder_service.start()
+        for error in (self.species_db.load_error, self.health_diagnosis.load_error):
+            if error:
+                self.root.after_idle(lambda message=error: messagebox.showwarning("Предупреждение", message))
 
     def update_cactus_dropdown(self):
         """Update cactus dropdown with sorted list"""
         cactus_list = sort_cactuses(self.data_manager.data["cactuses"], self.sort_var.get())
         self.cactus_dropdown["values"] = cactus_list
+        if self.cactus_var.get() in self.data_manager.data["cactuses"]:
+            return
         if cactus_list:
             self.cactus_var.set(cactus_list[0])
         else:
@@ -72,114 +114,7 @@ class UIManager:
 
     def show_cactus_profile(self, event):
         """Display selected cactus profile"""
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
-
-        cactus_name = self.cactus_var.get()
-        if not cactus_name:
-            ttk.Label(self.content_frame, text="Добавьте кактус, чтобы получить профиль").pack(pady=20)
-            return
-
-        cactus_data = self.data_manager.data["cactuses"][cactus_name]
-        self.achievements_manager.check_achievements()
-
-        profile_frame = ttk.Frame(self.content_frame)
-        profile_frame.pack(fill="both", expand=True)
-
-        # Visualization frame
-        vis_frame = ttk.LabelFrame(profile_frame, text="Визуализация")
-        vis_frame.pack(side="left", padx=10, pady=10, fill="y")
-        self.cactus_canvas = tk.Canvas(vis_frame, width=200, height=300, bg="white")
-        self.cactus_canvas.pack(pady=5)
-        self.visualization_manager.animate_cactus(cactus_name, self.cactus_canvas)
-
-        # Photo frame
-        photo_frame = ttk.LabelFrame(profile_frame, text="Последнее фото")
-        photo_frame.pack(side="left", padx=10, pady=10, fill="y")
-        if cactus_data["photos"]:
-            img_path = cactus_data["photos"][-1]["path"]
-            try:
-                img = Image.open(img_path).resize((200, 200), Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(img)
-                photo_label = ttk.Label(photo_frame, image=photo)
-                photo_label.image = photo
-                photo_label.pack(pady=5)
-            except FileNotFoundError:
-                ttk.Label(photo_frame, text="Фото не найдено").pack(pady=5)
-        else:
-            ttk.Label(photo_frame, text="Фото отсутствует").pack(pady=5)
-
-        # Info frame
-        info_frame = ttk.LabelFrame(profile_frame, text=f"Профиль: {cactus_name}")
-        info_frame.pack(side="right", fill="both", expand=True, padx=10, pady=10)
-
-        # Display species information
-        species = cactus_data.get("species", "Не указан")
-        species_info = self.species_db.get_species_data(species)
-        species_text = f"Вид: {species}\nОбщее название: {species_info.get('common_name', 'Неизвестно')}"
-        ttk.Label(info_frame, text=species_text).pack(pady=5)
-
-        # Seasonal care recommendations
-        current_month = date.today().month
-        season = "winter" if current_month in [12, 1, 2] else "spring" if current_month in [3, 4, 5] else \
-            "summer" if current_month in [6, 7, 8] else "autumn"
-        seasonal_care = species_info.get("seasonal_care", {}).get(season, "Нет рекомендаций")
-        ttk.Label(info_frame, text=f"Сезонные рекомендации ({season}): {seasonal_care}").pack(pady=5)
-
-        # Fertilizer recommendation
-        fertilizer_rec = species_info.get("fertilizer_recommendation", "Нет рекомендаций")
-        ttk.Label(info_frame, text=f"Рекомендации по удобрениям: {fertilizer_rec}").pack(pady=5)
-
-        health_frame = ttk.Frame(info_frame)
-        health_frame.pack(pady=5)
-        ttk.Label(health_frame, text="Здоровье:").pack(side="left")
-        self.health_indicator = tk.Canvas(health_frame, width=20, height=20)
-        self.health_indicator.pack(side="left", padx=5)
-        self.visualization_manager.update_health_indicator(cactus_name, self.health_indicator)
-
-        ttk.Button(info_frame, text="Добавить полив", command=lambda: self.add_watering(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Записать рост", command=lambda: self.add_growth(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Добавить фото", command=lambda: self.add_photo(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Добавить подкормку", command=lambda: self.add_fertilizer(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Диагностика здоровья", command=lambda: self.diagnose_health(cactus_name)).pack(
-            pady=5)
-        ttk.Button(info_frame, text="Показать графики",
-                   command=lambda: self.visualization_manager.show_graphs(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Фотоальбом", command=lambda: self.show_photo_album(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Редактировать заметки", command=lambda: self.edit_notes(cactus_name)).pack(pady=5)
-        ttk.Button(info_frame, text="Запланировать пересадку", command=lambda: self.plan_repotting(cactus_name)).pack(
-            pady=5)
-
-        ttk.Label(info_frame, text="Частота полива (дней):").pack()
-        self.freq_entry = ttk.Entry(info_frame)
-        seasonal_freq = self.data_manager.get_seasonal_watering_frequency(cactus_name, self.species_db)
-        self.freq_entry.insert(0, str(seasonal_freq))
-        self.freq_entry.pack()
-        ttk.Button(info_frame, text="Сохранить частоту", command=lambda: self.save_frequency(cactus_name)).pack(pady=5)
-
-        self.reminder_label = ttk.Label(info_frame, text="")
-        self.reminder_label.pack(pady=5)
-        self.update_reminder(cactus_name)
-
-        self.repotting_label = ttk.Label(info_frame, text="")
-        self.repotting_label.pack(pady=5)
-        self.update_repotting_reminder(cactus_name)
-
-        growth_count = len(cactus_data["growth"])
-        ttk.Label(info_frame, text=f"Измерений роста: {growth_count}/5 (Рост мастер)").pack(pady=5)
-
-        notes_frame = ttk.LabelFrame(info_frame, text="Заметки")
-        notes_frame.pack(fill="x", pady=5)
-        self.notes_text = tk.Text(notes_frame, height=5, width=40, wrap="word", font=("Arial", 10))
-        self.notes_text.insert("1.0", cactus_data["notes"] or "Нет заметок")
-        self.notes_text.config(state="disabled")
-        self.notes_text.pack(pady=5)
-
-        history_frame = ttk.LabelFrame(self.content_frame, text="История")
-        history_frame.pack(fill="both", expand=True, pady=10)
-        self.history_text = tk.Text(history_frame, height=10, width=80, bg="#ffffff", font=("Arial", 10))
-        self.history_text.pack(pady=5)
-        self.update_history(cactus_name)
+        self.profile_view.show(self.cactus_var.get())
 
     def add_cactus(self):
         """Add a new cactus with species selection"""
@@ -193,10 +128,13 @@ class UIManager:
 
         ttk.Label(window, text="Выберите вид:").pack(pady=5)
         species_var = tk.StringVar()
-        species_dropdown = ttk.Combobox(window, textvariable=species_var, values=self.species_db.get_species_list())
+        species_dropdown = ttk.Combobox(window, textvariable=species_var, values=self.species_db.search_species(""))
         species_dropdown.pack(pady=5)
         species_dropdown.set("")
 
+        def filter_species(event):
+            species_dropdown["values"] = self.species_db.search_species(species_var.get())
+
         ttk.Label(window, text="Частота полива (дней):").pack(pady=5)
         freq_entry = ttk.Entry(window)
         freq_entry.pack(pady=5)
@@ -205,10 +143,13 @@ class UIManager:
             species = species_var.get()
             if species:
                 species_data = self.species_db.get_species_data(species)
+                if not species_data:
+                    return
                 freq_entry.delete(0, tk.END)
                 freq_entry.insert(0, str(species_data.get("watering_frequency", 7)))
 
         species_dropdown.bind("<<ComboboxSelected>>", update_frequency)
+        species_dropdown.bind("<KeyRelease>", filter_species)
 
         def save_cactus():
             name = name_entry.get().strip()
@@ -231,6 +172,7 @@ class UIManager:
                     "species": species if species else "Не указан"
                 }
                 self.data_manager.save_data()
+                self.reminder_service.reschedule(name)
                 self.update_cactus_dropdown()
                 self.cactus_var.set(name)
                 self.show_cactus_profile(None)
@@ -306,14 +248,10 @@ class UIManager:
                 "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
                 "comment": comment
             }
-            self.data_manager.data["cactuses"][cactus_name]["watering"].append(watering)
-            self.data_manager.save_data()
-            self.update_history(cactus_name)
-            self.update_reminder(cactus_name)
-            self.visualization_manager.update_health_indicator(cactus_name, self.health_indicator)
+            self.data_manager.add_event(cactus_name, "watering", watering)
             self.achievements_manager.check_achievements()
-            self.visualization_manager.animate_cactus(cactus_name, self.cactus_canvas)
             self.update_cactus_dropdown()
+            self.show_cactus_profile(None)
             window.destroy()
 
         ttk.Button(window, text="Сохранить", command=save_watering).pack(pady=10)
@@ -341,16 +279,9 @@ class UIManager:
                     "height": height,
                     "comment": comment
                 }
-                self.data_manager.data["cactuses"][cactus_name]["growth"].append(growth)
-                self.data_manager.save_data()
-                self.update_history(cactus_name)
-                self.data_manager.data["achievements"]["growth_master"]["growths"][cactus_name] = len(
-                    self.data_manager.data["cactuses"][cactus_name]["growth"])
-                if self.data_manager.data["achievements"]["growth_master"]["growths"][cactus_name] >= 5 and not \
-                        self.data_manager.data["achievements"]["growth_master"]["completed"]:
-                    self.data_manager.data["achievements"]["growth_master"]["completed"] = True
-                self.data_manager.save_data()
-                self.visualization_manager.animate_cactus(cactus_name, self.cactus_canvas)
+                self.data_manager.add_event(cactus_name, "growth", growth)
+                self.achievements_manager.check_growth_master(cactus_name)
+                self.show_cactus_profile(None)
                 window.destroy()
             except ValueError:
                 messagebox.showerror("Ошибка", "Введите корректное число для роста")
@@ -361,19 +292,72 @@ class UIManager:
         """Add photo"""
         file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.png *.jpg *.jpeg")])
         if file_path:
-            photo = {
-                "date": datetime.now().strftime("%Y-%m-%d %H:%M"),
-                "path": file_path
-            }
-            self.data_manager.data["cactuses"][cactus_name]["photos"].append(photo)
-            self.data_manager.save_data()
-            self.data_manager.data["achievements"]["photo_collector"]["photos"] += 1
-            if self.data_manager.data["achievements"]["photo_collector"]["photos"] >= 10:
-                self.data_manager.data["achievements"]["photo_collector"]["completed"] = True
-            self.data_manager.save_data()
+            result = self.photo_store.ingest([file_path])[0]
+            if result["error"]:
+                messagebox.showerror("Ошибка", f"Не удалось добавить фото: {result['error']}")
+                return
+            added = self.photo_store.add_to_cactus(self.data_manager, cactus_name, [result])
+            if not added:
+                messagebox.showinfo("Фото", "Это фото уже есть в альбоме")
+                return
+            self.count_new_photos(len(added))
             self.show_cactus_profile(None)
             messagebox.showinfo("Успех", "Фото добавлено!")
 
+    def import_photo_folder(self, cactus_name):
+        """Import all photos from a folder in the background"""
+        folder = filedialog.askdirectory(title="Выберите папку с фото")
+        if not folder:
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Импорт фото")
+        window.geometry("300x100")
+        status_label = ttk.Label(window, text="Поиск фото...")
+        status_label.pack(pady=20)
+
+        state = {"done": 0, "total": 0, "results": None}
+
+        def progress(done, total):
+            state["done"], state["total"] = done, total
+
+        def worker():
+            try:
+                state["results"] = self.photo_store.ingest(self.photo_store.find_images(folder), progress)
+            except Exception as e:
+                state["results"] = [{"source": folder, "error": str(e)}]
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                if window.winfo_exists():
+                    status_label.config(text=f"Импорт фото: {state['done']}/{state['total']}")
+                window.after(200, poll)
+                return
+            # Data is only modified here, on the Tk thread
+            added = self.photo_store.add_to_cactus(self.data_manager, cactus_name, state["results"])
+            errors = sum(1 for result in state["results"] if result["error"])
+            self.count_new_photos(len(added))
+            if window.winfo_exists():
+                window.destroy()
+            if self.cactus_var.get() == cactus_name:
+                self.show_cactus_profile(None)
+            messagebox.showinfo("Импорт фото", f"Добавлено фото: {len(added)}\n"
+                                               f"Пропущено дубликатов: {len(state['results']) - len(added) - errors}\n"
+                                               f"Ошибок: {errors}")
+
+        self.root.after(200, poll)
+
+    def count_new_photos(self, count):
+        """Update the photo collector achievement"""
+        if not count:
+            return
+        self.data_manager.data["achievements"]["photo_collector"]["photos"] += count
+        if self.data_manager.data["achievements"]["photo_collector"]["photos"] >= 10:
+            self.data_manager.data["achievements"]["photo_collector"]["completed"] = True
+        self.data_manager.save_data()
+
     def add_fertilizer(self, cactus_name):
         """Add fertilizer record"""
         window = tk.Toplevel(self.root)
@@ -405,9 +389,7 @@ class UIManager:
                 "dosage": dosage,
                 "comment": comment
             }
-            self.data_manager.data["cactuses"][cactus_name]["fertilizers"].append(fertilizer)
-            self.data_manager.save_data()
-            self.update_history(cactus_name)
+            self.data_manager.add_event(cactus_name, "fertilizers", fertilizer)
             self.show_cactus_profile(None)
             window.destroy()
 
@@ -433,7 +415,9 @@ class UIManager:
             if not chosen_symptoms:
                 messagebox.showwarning("Предупреждение", "Выберите хотя бы один симптом")
                 return
-            diagnosis = self.health_diagnosis.diagnose(chosen_symptoms)
+            diagnosis = self.health_diagnosis.diagnose(
+                chosen_symptoms, self.data_manager.data["cactuses"][cactus_name],
+                self.data_manager.get_seasonal_watering_frequency(cactus_name, self.species_db))
             result_window = tk.Toplevel(window)
             result_window.title("Результат диагностики")
             result_window.geometry("400x300")
@@ -449,68 +433,136 @@ class UIManager:
         try:
             freq = int(self.freq_entry.get())
             if freq > 0:
-                self.data_manager.data["cactuses"][cactus_name]["watering_frequency"] = freq
-                self.data_manager.save_data()
-                self.update_reminder(cactus_name)
-                self.visualization_manager.update_health_indicator(cactus_name, self.health_indicator)
+                self.data_manager.set_field(cactus_name, "watering_frequency", freq)
+                self.reminder_service.reschedule(cactus_name)
                 self.achievements_manager.check_achievements()
-                self.visualization_manager.animate_cactus(cactus_name, self.cactus_canvas)
                 self.update_cactus_dropdown()
+                self.show_cactus_profile(None)
             else:
                 messagebox.showerror("Ошибка", "Частота должна быть положительной")
         except ValueError:
             messagebox.showerror("Ошибка", "Введите корректное число")
 
-    def update_reminder(self, cactus_name):
-        """Update watering reminder"""
-        cactus_data = self.data_manager.data["cactuses"][cactus_name]
-        seasonal_freq = self.data_manager.get_seasonal_watering_frequency(cactus_name, self.species_db)
-        if cactus_data["watering"]:
-            last_watering = datetime.strptime(cactus_data["watering"][-1]["date"], "%Y-%m-%d %H:%M")
-            next_watering = last_watering + timedelta(days=seasonal_freq)
+    def reminder_status(self, cactus_name):
+        """Return (text, color) of the watering reminder"""
+        next_watering = self.data_manager.next_watering(cactus_name, self.species_db)
+        if next_watering is not None:
             days_left = (next_watering - datetime.now()).days
             if days_left <= 0:
-                self.reminder_label.config(text="Пора полить кактус!", foreground="red")
-            else:
-                self.reminder_label.config(text=f"Следующий полив через {days_left} дней", foreground="green")
-        else:
-            self.reminder_label.config(text="Добавьте первый полив", foreground="black")
+                return "Пора полить кактус!", "red"
+            return f"Следующий полив через {days_left} дней", "green"
+        return "Добавьте первый полив", "black"
 
-    def update_repotting_reminder(self, cactus_name):
-        """Update repotting reminder"""
+    def update_reminder(self, cactus_name):
+        """Update watering reminder"""
+        text, color = self.reminder_status(cactus_name)
+        self.reminder_label.config(text=text, foreground=color)
+
+    def repotting_status(self, cactus_name):
+        """Return (text, color) of the repotting reminder"""
         cactus_data = self.data_manager.data["cactuses"][cactus_name]
         if cactus_data["next_repotting"]:
             repotting_date = datetime.strptime(cactus_data["next_repotting"], "%Y-%m-%d")
             days_left = (repotting_date - datetime.now()).days
             if days_left < 0:
-                self.repotting_label.config(text="Пора пересаживать кактус!", foreground="red")
+                return "Пора пересаживать кактус!", "red"
             elif days_left <= 7:
-                self.repotting_label.config(text=f"Пересадка через {days_left} дней", foreground="orange")
-            else:
-                self.repotting_label.config(text=f"Пересадка запланирована на {cactus_data['next_repotting']}",
-                                            foreground="green")
-        else:
-            self.repotting_label.config(text="Дата пересадки не установлена", foreground="black")
+                return f"Пересадка через {days_left} дней", "orange"
+            return f"Пересадка запланирована на {cactus_data['next_repotting']}", "green"
+        return "Дата пересадки не установлена", "black"
+
+    def update_repotting_reminder(self, cactus_name):
+        """Update repotting reminder"""
+        text, color = self.repotting_status(cactus_name)
+        self.repotting_label.config(text=text, foreground=color)
 
     def update_history(self, cactus_name):
-        """Update history display"""
+        """Update history display; double-clicking an entry opens it for editing"""
         cactus_data = self.data_manager.data["cactuses"][cactus_name]
+        sections = (
+            ("watering", "Поливы:", lambda w: f"{w['date']} - {w['comment']}"),
+            ("growth", "Рост:", lambda g: f"{g['date']} - {g['height']} см - {g['comment']}"),
+            ("photos", "Фото:", lambda p: f"{p['date']} - {p['path']}"),
+            ("fertilizers", "Подкормки:", lambda f: f"{f['date']} - {f['type']} ({f['dosage']}) - {f['comment']}")
+        )
         self.history_text.delete(1.0, tk.END)
-        self.history_text.insert(tk.END, "Поливы:\n")
-        for w in cactus_data["watering"]:
-            self.history_text.insert(tk.END, f"{w['date']} - {w['comment']}\n")
+        self.history_lines = {}
+        line = 1
+        for event_type, title, describe in sections:
+            if line > 1:
+                self.history_text.insert(tk.END, "\n")
+                line += 1
+            self.history_text.insert(tk.END, f"{title}\n")
+            line += 1
+            events = cactus_data[event_type]
+            for event_id, record in zip(self.data_manager.event_ids(cactus_name, event_type), events):
+                self.history_text.insert(tk.END, f"{describe(record)}\n")
+                self.history_lines[line] = event_id
+                line += 1
+
+    def on_history_double_click(self, event):
+        """Open the history entry under the mouse for editing"""
+        line = int(self.history_text.index(f"@{event.x},{event.y}").split(".")[0])
+        event_id = self.history_lines.get(line)
+        if event_id is not None:
+            self.edit_history_entry(event_id)
+        return "break"
+
+    def edit_history_entry(self, event_id):
+        """Edit, delete or move a single history entry"""
+        try:
+            cactus_name, event_type, record = self.data_manager.get_event(event_id)
+        except KeyError:
+            messagebox.showerror("Ошибка", "Запись не найдена")
+            return
+        window = tk.Toplevel(self.root)
+        window.title(f"Запись истории: {cactus_name}")
+        window.geometry("350x400")
+
+        labels = {"date": "Дата (ГГГГ-ММ-ДД ЧЧ:ММ):", "height": "Рост (см):", "type": "Тип удобрения:",
+                  "dosage": "Дозировка:", "path": "Файл фото:", "comment": "Комментарий:"}
+        entries = {}
+        for field, label in labels.items():
+            if field in record:
+                ttk.Label(window, text=label).pack(pady=2)
+                entry = ttk.Entry(window, width=40)
+                entry.insert(0, str(record[field]))
+                entry.pack(pady=2)
+                entries[field] = entry
+
+        ttk.Label(window, text="Кактус:").pack(pady=2)
+        target_var = tk.StringVar(value=cactus_name)
+        ttk.Combobox(window, textvariable=target_var, state="readonly",
+                     values=sorted(self.data_manager.data["cactuses"])).pack(pady=2)
+
+        def refresh():
+            self.profile_view.invalidate()
+            self.show_cactus_profile(None)
+            window.destroy()
 
-        self.history_text.insert(tk.END, "\nРост:\n")
-        for g in cactus_data["growth"]:
-            self.history_text.insert(tk.END, f"{g['date']} - {g['height']} см - {g['comment']}\n")
+        def save_entry():
+            changes = {field: entry.get().strip() for field, entry in entries.items()
+                       if entry.get().strip() != str(record[field])}
+            target = target_var.get()
+            try:
+                current_id = event_id
+                if changes:
+                    current_id = self.data_manager.update_event(current_id, changes, save=False)["id"]
+                if target != cactus_name:
+                    self.data_manager.move_event(current_id, target, save=False)
+            except ValueError as e:
+                messagebox.showerror("Ошибка", f"Некорректные данные: {e}", parent=window)
+                return
+            self.data_manager.save_data()
+            refresh()
 
-        self.history_text.insert(tk.END, "\nФото:\n")
-        for p in cactus_data["photos"]:
-            self.history_text.insert(tk.END, f"{p['date']} - {p['path']}\n")
+        def delete_entry():
+            if messagebox.askyesno("Удаление", "Удалить эту запись?", parent=window):
+                self.data_manager.delete_event(event_id)
+                refresh()
 
-        self.history_text.insert(tk.END, "\nПодкормки:\n")
-        for f in cactus_data["fertilizers"]:
-            self.history_text.insert(tk.END, f"{f['date']} - {f['type']} ({f['dosage']}) - {f['comment']}\n")
+        ttk.Button(window, text="Сохранить", command=save_entry).pack(pady=5)
+        ttk.Button(window, text="Удалить", command=delete_entry).pack(pady=5)
 
     def plan_repotting(self, cactus_name):
         """Plan repotting"""
@@ -526,9 +578,9 @@ class UIManager:
             date_str = date_entry.get().strip()
             try:
                 repotting_date = datetime.strptime(date_str, "%Y-%m-%d")
-                self.data_manager.data["cactuses"][cactus_name]["next_repotting"] = date_str
-                self.data_manager.save_data()
-                self.update_repotting_reminder(cactus_name)
+                self.data_manager.set_field(cactus_name, "next_repotting", date_str)
+                self.reminder_service.reschedule(cactus_name)
+                self.show_cactus_profile(None)
                 if repotting_date <= datetime.now():
                     self.data_manager.data["achievements"]["repotting_master"]["repottings"] += 1
                     if self.data_manager.data["achievements"]["repotting_master"]["repottings"] >= 3:
@@ -555,8 +607,7 @@ class UIManager:
 
         def save_notes():
             new_notes = notes_entry.get("1.0", "end-1c")
-            self.data_manager.data["cactuses"][cactus_name]["notes"] = new_notes
-            self.data_manager.save_data()
+            self.data_manager.set_field(cactus_name, "notes", new_notes)
             self.show_cactus_profile(None)
             window.destroy()
 
@@ -591,7 +642,8 @@ class UIManager:
         else:
             for photo in photos:
                 try:
-                    img = Image.open(photo["path"]).resize((100, 100), Image.Resampling.LANCZOS)
+                    img = Image.open(photo.get("thumbnail") or photo["path"]).resize(
+                        (100, 100), Image.Resampling.LANCZOS)
                     photo_tk = ImageTk.PhotoImage(img)
                     photo_frame = ttk.Frame(scrollable_frame)
                     photo_frame.pack(pady=5, fill="x")
@@ -624,17 +676,459 @@ class UIManager:
         except FileNotFoundError:
             messagebox.showerror("Ошибка", "Файл изображения не найден")
 
+    def export_data(self):
+        """Export data to CSV or PDF"""
+        formats = [("CSV файл (*.csv)", "*.csv"), ("PDF файл (*.pdf)", "*.pdf")]
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=formats,
+            initialfile="cactus_data_export"
+        )
+        if not file_path:
+            return
+        try:
+            self.data_manager.export_data(file_path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось экспортировать данные: {str(e)}")
+            return
+        messagebox.showinfo("Успех", f"Данные экспортированы в {file_path}")
+
+    def export_report(self):
+        """Build an illustrated PDF or HTML report of the whole collection in the background"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF файл (*.pdf)", "*.pdf"), ("HTML страница (*.html)", "*.html")],
+            title="Сохранить отчёт"
+        )
+        if not file_path:
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Отчёт с графиками")
+        window.geometry("300x100")
+        status_label = ttk.Label(window, text="Подготовка данных...")
+        status_label.pack(pady=20)
+
+        report = CollectionReport(self.data_manager)
+        # Data is read here, on the Tk thread; the worker only renders and writes files
+        sections = report.prepare()
+        state = {"done": 0, "total": 0, "errors": None}
+
+        def progress(done, total):
+            state["done"], state["total"] = done, total
+
+        def worker():
+            try:
+                state["errors"] = report.write(file_path, sections, progress)
+                report.prune(sections)
+            except Exception as e:
+                state["errors"] = {"": str(e)}
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                if window.winfo_exists():
+                    status_label.config(text=f"Графики: {state['done']}/{state['total']}")
+                self.root.after(200, poll)
+                return
+            if window.winfo_exists():
+                window.destroy()
+            if state["errors"]:
+                details = "\n".join(f"{name}: {error}" for name, error in list(state["errors"].items())[:10])
+                messagebox.showerror("Ошибка", f"Не удалось построить часть отчёта:\n{details}")
+            else:
+                messagebox.showinfo("Успех", f"Отчёт сохранён в {file_path}")
+
+        self.root.after(200, poll)
+
+    def export_photos(self):
+        """Pack photos of the current cactus, a species or the whole collection into an archive"""
+        window = tk.Toplevel(self.root)
+        window.title("Экспорт фото")
+        window.geometry("350x260")
+        scope_var = tk.StringVar(value="cactus" if self.cactus_var.get() else "all")
+        ttk.Radiobutton(window, text=f"Текущий кактус ({self.cactus_var.get() or 'не выбран'})",
+                        variable=scope_var, value="cactus").pack(anchor="w", padx=10, pady=2)
+        ttk.Radiobutton(window, text="Вид или род:", variable=scope_var, value="species").pack(
+            anchor="w", padx=10, pady=2)
+        species_entry = ttk.Entry(window)
+        species_entry.pack(padx=30, fill="x")
+        ttk.Radiobutton(window, text="Вся коллекция", variable=scope_var, value="all").pack(
+            anchor="w", padx=10, pady=2)
+        ttk.Label(window, text="Размер фото (пикселей по длинной стороне):").pack(pady=(10, 2))
+        size_var = tk.StringVar(value="Оригинал")
+        ttk.Combobox(window, textvariable=size_var, values=["Оригинал", "2048", "1600", "1024", "800"]).pack()
+        status_label = ttk.Label(window, text="")
+        status_label.pack(pady=5)
+
+        def start():
+            scope = scope_var.get()
+            if scope == "cactus":
+                names = [self.cactus_var.get()] if self.cactus_var.get() else []
+            elif scope == "species":
+                names = self.data_manager.bulk_operations.select(species=species_entry.get())
+            else:
+                names = None
+            max_size = None
+            if size_var.get() != "Оригинал":
+                try:
+                    max_size = int(size_var.get())
+                    if max_size <= 0:
+                        raise ValueError
+                except ValueError:
+                    messagebox.showerror("Ошибка", "Размер должен быть положительным числом", parent=window)
+                    return
+            export = PhotoExport(self.data_manager)
+            # Data is read here, on the Tk thread; the worker only resizes and writes files
+            entries = export.prepare(names)
+            if not entries:
+                messagebox.showinfo("Экспорт фото", "Нет фото для экспорта", parent=window)
+                return
+            file_path = filedialog.asksaveasfilename(
+                parent=window,
+                defaultextension=".zip",
+                filetypes=[("ZIP архив (*.zip)", "*.zip"), ("TAR архив (*.tar.gz)", "*.tar.gz"),
+                           ("TAR архив (*.tar)", "*.tar")],
+                title="Сохранить архив фото"
+            )
+            if not file_path:
+                return
+            export_button.config(state="disabled")
+            state = {"done": 0, "total": len(entries), "errors": None}
+
+            def progress(done, total):
+                state["done"], state["total"] = done, total
+
+            def worker():
+                try:
+                    state["errors"] = export.write(file_path, entries, max_size, progress)
+                except Exception as e:
+                    state["errors"] = {"": str(e)}
+
+            thread = threading.Thread(target=worker, daemon=True)
+            thread.start()
+
+            def poll():
+                if thread.is_alive():
+                    if window.winfo_exists():
+                        status_label.config(text=f"Фото: {state['done']}/{state['total']}")
+                    self.root.after(200, poll)
+                    return
+                if window.winfo_exists():
+                    window.destroy()
+                if "" in state["errors"]:
+                    messagebox.showerror("Ошибка", f"Не удалось создать архив: {state['errors']['']}")
+                elif state["errors"]:
+                    details = "\n".join(f"{path}: {error}" for path, error in list(state["errors"].items())[:10])
+                    messagebox.showwarning("Экспорт фото", f"Архив сохранён в {file_path}\n"
+                                                           f"Пропущено фото: {len(state['errors'])}\n{details}")
+                else:
+                    messagebox.showinfo("Успех", f"Фото ({len(entries)}) сохранены в {file_path}")
+
+            self.root.after(200, poll)
+
+        export_button = ttk.Button(window, text="Экспортировать", command=start)
+        export_button.pack(pady=5)
+
+    def backup_data(self):
+        """Create a backup of the data file"""
+        backup_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON файл (*.json)", "*.json")],
+            initialfile=f"cactus_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        )
+        if backup_path:
+            try:
+                self.data_manager.backup_data(backup_path)
+                messagebox.showinfo("Успех", f"Резервная копия сохранена в {backup_path}")
+            except Exception as e:
+                messagebox.showerror("Ошибка", f"Не удалось создать резервную копию: {str(e)}")
+
     def restore_data(self):
-        """Restore data and refresh UI"""
-        if self.data_manager.restore_data():
+        """Restore data from a backup file and refresh UI"""
+        backup_path = filedialog.askopenfilename(
+            filetypes=[("JSON файл (*.json)", "*.json")],
+            title="Выберите файл резервной копии"
+        )
+        if not backup_path:
+            return
+        try:
+            self.data_manager.restore_data(backup_path)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Недопустимый файл резервной копии")
+            return
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось восстановить данные: {str(e)}")
+            return
+        messagebox.showinfo("Успех", "Данные восстановлены из резервной копии")
+        self.reminder_service.reschedule()
+        self.update_cactus_dropdown()
+        self.show_cactus_profile(None)
+
+    def merge_data(self):
+        """Two-way sync with another copy of the data file, e.g. on a USB stick, and refresh UI"""
+        other_path = filedialog.askopenfilename(
+            filetypes=[("Файл данных", "*.json *.dat"), ("Все файлы", "*.*")],
+            title="Выберите другую копию данных"
+        )
+        if not other_path:
+            return
+        try:
+            changed_here, changed_there = self.data_manager.merge_data(other_path)
+        except ValueError:
+            messagebox.showerror("Ошибка", "Недопустимый файл данных")
+            return
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось синхронизировать данные: {str(e)}")
+            return
+        messagebox.showinfo("Успех", f"Обновлено кактусов: здесь — {len(changed_here)}, "
+                                     f"в выбранном файле — {len(changed_there)}")
+        self.reminder_service.reschedule()
+        self.update_cactus_dropdown()
+        self.show_cactus_profile(None)
+
+    def show_calendar(self):
+        """Show projected waterings and fertilizer windows for the whole collection"""
+        window = tk.Toplevel(self.root)
+        window.title("Календарь ухода")
+        window.geometry("500x500")
+
+        controls = ttk.Frame(window)
+        controls.pack(fill="x", padx=10, pady=5)
+        view_var = tk.StringVar(value="week")
+        state = {"day": date.today()}
+
+        agenda_text = tk.Text(window, wrap="word", font=("Arial", 11))
+        agenda_text.pack(fill="both", expand=True, padx=10, pady=5)
+
+        def render():
+            day = state["day"]
+            if view_var.get() == "week":
+                agenda = self.watering_calendar.week_agenda(day)
+            else:
+                agenda = self.watering_calendar.month_agenda(day)
+            agenda_text.config(state="normal")
+            agenda_text.delete("1.0", tk.END)
+            if not agenda:
+                agenda_text.insert(tk.END, "Нет запланированных событий")
+            for agenda_day, items in agenda.items():
+                agenda_text.insert(tk.END, f"{agenda_day.strftime('%Y-%m-%d')}:\n")
+                for name, kind in items:
+                    label = "Полив" if kind == "watering" else "Подкормка"
+                    agenda_text.insert(tk.END, f"  {label}: {name}\n")
+            agenda_text.config(state="disabled")
+
+        def shift(direction):
+            step = 7 if view_var.get() == "week" else 31
+            day = state["day"] + timedelta(days=direction * step)
+            state["day"] = day if view_var.get() == "week" else day.replace(day=1)
+            render()
+
+        ttk.Button(controls, text="<", width=3, command=lambda: shift(-1)).pack(side="left")
+        ttk.Radiobutton(controls, text="Неделя", variable=view_var, value="week", command=render).pack(side="left")
+        ttk.Radiobutton(controls, text="Месяц", variable=view_var, value="month", command=render).pack(side="left")
+        ttk.Button(controls, text=">", width=3, command=lambda: shift(1)).pack(side="left")
+        render()
+
+    def analyze_photos(self):
+        """Analyze new photos in the background and show plants whose colour drifted"""
+        # Paths are collected here, on the Tk thread; the worker only reads image files
+        pending = self.photo_analyzer.pending_photos()
+        self.analyze_photos_button.config(state="disabled")
+        window = tk.Toplevel(self.root)
+        window.title("Анализ фото")
+        window.geometry("500x400")
+        status_label = ttk.Label(window, text="Анализ фото...")
+        status_label.pack(pady=5)
+        result_text = tk.Text(window, wrap="word", font=("Arial", 11))
+        result_text.pack(fill="both", expand=True, padx=10, pady=5)
+
+        state = {"done": 0, "total": len(pending), "results": {}, "errors": None}
+
+        def progress(done, total):
+            state["done"], state["total"] = done, total
+
+        def worker():
+            try:
+                state["results"], state["errors"] = self.photo_analyzer.analyze_paths(pending, progress)
+            except Exception as e:
+                state["errors"] = {"": str(e)}
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                if window.winfo_exists():
+                    status_label.config(text=f"Анализ фото: {state['done']}/{state['total']}")
+                self.root.after(200, poll)
+                return
+            if state["results"]:
+                self.photo_analyzer.store_results(state["results"])
+            self.analyze_photos_button.config(state="normal")
+            if not window.winfo_exists():
+                return
+            status_label.config(text="Анализ завершён")
+            names = {"yellow": "пожелтение", "brown": "побурение", "pale": "бледность", "green": "потеря зелени"}
+            reports = self.photo_analyzer.collection_report()
+            if not reports:
+                result_text.insert(tk.END, "Нет проанализированных фото")
+            for report in reports:
+                mark = "ВНИМАНИЕ" if report["flagged"] else "норма"
+                signs = ", ".join(names[sign] for sign in report["signs"]) or "без изменений"
+                result_text.insert(tk.END, f"{report['cactus']} ({report['date']}): {mark} — {signs}\n")
+            for path, error in (state["errors"] or {}).items():
+                result_text.insert(tk.END, f"Ошибка {path}: {error}\n")
+            result_text.config(state="disabled")
+
+        poll()
+
+    def show_growth_analysis(self):
+        """Show growth rates of all cactuses compared to their species, problems first"""
+        window = tk.Toplevel(self.root)
+        window.title("Анализ роста")
+        window.geometry("600x400")
+        result_text = tk.Text(window, wrap="word", font=("Arial", 11))
+        result_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        names = {"slow": "растёт медленнее своего вида", "fast": "растёт быстрее своего вида",
+                 "shrinking": "высота уменьшается", "stalled": "рост остановился"}
+        reports = [report for report in self.growth_analytics.report() if report["rate"] is not None]
+        if not reports:
+            result_text.insert(tk.END, "Недостаточно измерений роста (нужно хотя бы два)")
+        for report in reports:
+            line = f"{report['cactus']} ({report['species']}): {report['rate']:+.2f} см/мес"
+            if report["species_median"] is not None:
+                line += f", у вида {report['species_median']:+.2f}"
+            if report["flags"]:
+                line += " — " + ", ".join(names[flag] for flag in report["flags"])
+            result_text.insert(tk.END, line + "\n")
+        result_text.config(state="disabled")
+
+    def show_timeline(self):
+        """Browse the activity of the whole collection page by page, newest first"""
+        window = tk.Toplevel(self.root)
+        window.title("Лента событий")
+        window.geometry("750x500")
+        timeline = Timeline(self.data_manager, EVENT_TYPES)
+        type_names = {"watering": "Полив", "growth": "Рост", "photos": "Фото", "fertilizers": "Подкормка"}
+
+        filters = ttk.Frame(window)
+        filters.pack(fill="x", padx=10, pady=5)
+        ttk.Label(filters, text="Тип:").pack(side="left")
+        type_var = tk.StringVar(value="Все")
+        ttk.Combobox(filters, textvariable=type_var, state="readonly", width=10,
+                     values=["Все"] + list(type_names.values())).pack(side="left", padx=5)
+        ttk.Label(filters, text="Кактус:").pack(side="left")
+        cactus_var = tk.StringVar(value="")
+        ttk.Combobox(filters, textvariable=cactus_var, width=15,
+                     values=[""] + sorted(self.data_manager.data["cactuses"])).pack(side="left", padx=5)
+        ttk.Label(filters, text="Вид или род:").pack(side="left")
+        species_entry = ttk.Entry(filters, width=15)
+        species_entry.pack(side="left", padx=5)
+
+        jump = ttk.Frame(window)
+        jump.pack(fill="x", padx=10, pady=5)
+        ttk.Label(jump, text="Перейти к дате (ГГГГ-ММ-ДД):").pack(side="left")
+        date_entry = ttk.Entry(jump, width=12)
+        date_entry.pack(side="left", padx=5)
+
+        tree = ttk.Treeview(window, columns=("date", "cactus", "type", "details"), show="headings")
+        for column, title, width in (("date", "Дата", 130), ("cactus", "Кактус", 120), ("type", "Событие", 90),
+                                     ("details", "Подробности", 380)):
+            tree.heading(column, text=title)
+            tree.column(column, width=width, anchor="w")
+        tree.pack(fill="both", expand=True, padx=10, pady=5)
+
+        # Cursors of the pages shown so far, to step back without re-merging from the start
+        state = {"cursors": [], "next": None}
+
+        def query():
+            event_type = {title: key for key, title in type_names.items()}.get(type_var.get())
+            return {"event_types": [event_type] if event_type else None,
+                    "names": [cactus_var.get()] if cactus_var.get() else None,
+                    "species": species_entry.get().strip() or None}
+
+        def show(cursor, before=None):
+            entries, state["next"] = timeline.page(cursor=cursor, before=before, **query())
+            tree.delete(*tree.get_children())
+            for entry in entries:
+                record = entry["record"]
+                details = ", ".join(f"{value}" for field, value in record.items()
+                                    if field not in ("date", "id", "modified", "thumbnail") and value != "")
+                tree.insert("", tk.END, iid=entry["id"],
+                            values=(entry["date"], entry["cactus"], type_names[entry["type"]], details))
+            older_button.config(state="normal" if state["next"] else "disabled")
+            newer_button.config(state="normal" if len(state["cursors"]) > 1 else "disabled")
+
+        def first_page(before=None):
+            state["cursors"] = [(None, before)]
+            show(None, before)
+
+        def older():
+            state["cursors"].append((state["next"], None))
+            show(state["next"])
+
+        def newer():
+            state["cursors"].pop()
+            show(*state["cursors"][-1])
+
+        def jump_to_date():
+            try:
+                day = datetime.strptime(date_entry.get().strip(), "%Y-%m-%d")
+            except ValueError:
+                messagebox.showerror("Ошибка", "Введите дату в формате ГГГГ-ММ-ДД", parent=window)
+                return
+            # Everything up to the end of that day, newest first
+            first_page((day + timedelta(days=1)).strftime("%Y-%m-%d 00:00"))
+
+        def open_entry(event):
+            selected = tree.focus()
+            if selected:
+                self.edit_history_entry(selected)
+
+        ttk.Button(jump, text="Перейти", command=jump_to_date).pack(side="left", padx=5)
+        ttk.Button(filters, text="Применить", command=lambda: first_page()).pack(side="left", padx=5)
+        tree.bind("<Double-Button-1>", open_entry)
+        navigation = ttk.Frame(window)
+        navigation.pack(pady=5)
+        newer_button = ttk.Button(navigation, text="← Новее", command=newer)
+        newer_button.pack(side="left", padx=5)
+        older_button = ttk.Button(navigation, text="Старее →", command=older)
+        older_button.pack(side="left", padx=5)
+        first_page()
+
+    def import_history(self):
+        """Import historical events from CSV or NDJSON after a dry-run preview"""
+        file_path = filedialog.askopenfilename(
+            filetypes=[("CSV или NDJSON", "*.csv *.ndjson *.jsonl"), ("Все файлы", "*.*")],
+            title="Выберите файл с историей"
+        )
+        if not file_path:
+            return
+        importer = EventImporter(self.data_manager)
+        try:
+            preview = importer.import_file(file_path, dry_run=True)
+        except (OSError, UnicodeDecodeError) as e:
+            messagebox.showerror("Ошибка", f"Не удалось прочитать файл: {str(e)}")
+            return
+        if not preview.added:
+            messagebox.showinfo("Импорт", preview.summary())
+            return
+        if messagebox.askyesno("Импорт", preview.summary() + "\n\nВыполнить импорт?"):
+            report = importer.import_file(file_path)
+            for name in report.added_by_cactus:
+                self.reminder_service.reschedule(name)
+            messagebox.showinfo("Успех", report.summary())
             self.update_cactus_dropdown()
             self.show_cactus_profile(None)
 
     def bulk_processing(self):
-        """Interface for bulk watering or fertilizing"""
+        """Interface for bulk operations over a selection or a query, with undo"""
         window = tk.Toplevel(self.root)
         window.title("Массовая обработка")
-        window.geometry("400x400")
+        window.geometry("450x750")
 
         ttk.Label(window, text="Выберите кактусы:").pack(pady=5)
         cactus_list = list(self.data_manager.data["cactuses"].keys())
@@ -645,12 +1139,36 @@ class UIManager:
             ttk.Checkbutton(window, text=cactus, variable=var).pack(anchor="w", padx=10)
             selected_cactuses.append((cactus, var))
 
+        query_frame = ttk.LabelFrame(window, text="Выбор по запросу")
+        query_frame.pack(fill="x", padx=10, pady=5)
+        ttk.Label(query_frame, text="Вид или род:").grid(row=0, column=0, sticky="w", padx=5)
+        species_entry = ttk.Entry(query_frame)
+        species_entry.grid(row=0, column=1, padx=5, pady=2)
+        ttk.Label(query_frame, text="Просрочен полив на (дней, от):").grid(row=1, column=0, sticky="w", padx=5)
+        overdue_entry = ttk.Entry(query_frame)
+        overdue_entry.grid(row=1, column=1, padx=5, pady=2)
+
+        def select_by_query():
+            try:
+                overdue_days = int(overdue_entry.get()) if overdue_entry.get().strip() else None
+            except ValueError:
+                messagebox.showerror("Ошибка", "Введите корректное число дней")
+                return
+            matches = set(self.data_manager.bulk_operations.select(
+                species=species_entry.get().strip() or None, overdue_days=overdue_days, species_db=self.species_db))
+            for cactus, var in selected_cactuses:
+                var.set(cactus in matches)
+
+        ttk.Button(query_frame, text="Выбрать", command=select_by_query).grid(row=2, column=0, columnspan=2, pady=5)
+
         ttk.Label(window, text="Действие:").pack(pady=5)
-        action_var = tk.StringVar(value="Полив")
-        ttk.Radiobutton(window, text="Полив", variable=action_var, value="Полив").pack(anchor="w", padx=10)
-        ttk.Radiobutton(window, text="Подкормка", variable=action_var, value="Подкормка").pack(anchor="w", padx=10)
+        actions = [("Полив", "watering"), ("Подкормка", "fertilizer"), ("Рост", "growth"),
+                   ("Частота полива", "frequency"), ("Смена вида", "species"), ("Дата пересадки", "repotting")]
+        action_var = tk.StringVar(value="watering")
+        for label, action in actions:
+            ttk.Radiobutton(window, text=label, variable=action_var, value=action).pack(anchor="w", padx=10)
 
-        ttk.Label(window, text="Комментарий (для полива):").pack(pady=5)
+        ttk.Label(window, text="Комментарий (для полива, подкормки, роста):").pack(pady=5)
         comment_entry = ttk.Entry(window, width=30)
         comment_entry.pack(pady=5)
 
@@ -662,28 +1180,52 @@ class UIManager:
         dosage_entry = ttk.Entry(window)
         dosage_entry.pack(pady=5)
 
+        ttk.Label(window, text="Значение (рост, частота, вид или дата ГГГГ-ММ-ДД):").pack(pady=5)
+        value_entry = ttk.Entry(window)
+        value_entry.pack(pady=5)
+
         def process():
             chosen_cactuses = [cactus for cactus, var in selected_cactuses if var.get()]
             if not chosen_cactuses:
                 messagebox.showwarning("Предупреждение", "Выберите хотя бы один кактус")
                 return
             action = action_var.get()
-            comment = comment_entry.get()
-            fertilizer_type = type_entry.get().strip()
-            dosage = dosage_entry.get().strip()
+            params = {"comment": comment_entry.get()}
+            if action == "fertilizer":
+                params.update(fertilizer_type=type_entry.get().strip(), dosage=dosage_entry.get().strip())
+            elif action == "growth":
+                params["height"] = value_entry.get().strip()
+            elif action in ("frequency", "species", "repotting"):
+                params = {"value": value_entry.get().strip()}
 
-            if action == "Полив":
-                self.data_manager.bulk_add_watering(chosen_cactuses, comment)
-                messagebox.showinfo("Успех", f"Полив добавлен для {len(chosen_cactuses)} кактусов")
-            elif action == "Подкормка":
-                if not fertilizer_type or not dosage:
-                    messagebox.showerror("Ошибка", "Укажите тип удобрения и дозировку")
-                    return
-                self.data_manager.bulk_add_fertilizer(chosen_cactuses, fertilizer_type, dosage, comment)
-                messagebox.showinfo("Успех", f"Подкормка добавлена для {len(chosen_cactuses)} кактусов")
+            try:
+                entry = self.data_manager.bulk_apply(action, chosen_cactuses, **params)
+            except BulkOperationError as e:
+                messagebox.showerror("Ошибка", f"Операция не выполнена: {str(e)}")
+                return
+            messagebox.showinfo("Успех", f"Операция применена к {entry['count']} кактусам")
+            for name in chosen_cactuses:
+                self.reminder_service.reschedule(name)
 
             self.update_cactus_dropdown()
             self.show_cactus_profile(None)
             window.destroy()
 
-        ttk.Button(window, text="Выполнить", command=process).pack(pady=10)
\ No newline at end of file
+        def undo():
+            entry = self.data_manager.undo_last_bulk()
+            if entry is None:
+                messagebox.showinfo("Отмена", "Нет операций для отмены")
+                return
+            message = f"Операция от {entry['date']} отменена для {entry['count']} кактусов"
+            if entry["not_reverted"]:
+                message += ("\n\nИзменены после операции и оставлены как есть: "
+                            + ", ".join(f"{name} ({what})" for name, what in entry["not_reverted"]))
+            messagebox.showinfo("Отмена", message)
+            for name in {change[1] for change in entry["changes"]}:
+                self.reminder_service.reschedule(name)
+            self.profile_view.invalidate()
+            self.update_cactus_dropdown()
+            self.show_cactus_profile(None)
+
+        ttk.Button(window, text="Выполнить", command=process).pack(pady=10)
+        ttk.Button(window, text="Отменить последнюю операцию", command=undo).pack(pady=5)
@@ -20,4 +20,43 @@ def get_last_watering_date(cactuses, cactus_name):
     watering = cactuses[cactus_name]["watering"]
     if watering:
         return datetime.strptime(watering[-1]["date"], "%Y-%m-%d %H:%M")
-    return datetime.min
\ No newline at end of file
+    return datetime.min
+
+
+DATE_FORMAT = "%Y-%m-%d %H:%M"
+_INPUT_DATE_FORMATS = ("%d.%m.%Y %H:%M", "%d.%m.%Y", "%Y/%m/%d %H:%M", "%Y/%m/%d")
+
+
+def event_date(record):
+    """Sort key for event records"""
+    return record["date"]
+
+
+def parse_event_date(value):
+    """Parse an event date in any supported format into a datetime"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value)
+    value = str(value).strip()
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in _INPUT_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Unsupported date format: {value!r}")
+
+
+def normalize_event_date(value):
+    """Normalize an event date to the storage format"""
+    if value is None or value == "":
+        return datetime.now().strftime(DATE_FORMAT)
+    if isinstance(value, str) and len(value) == 16 and value[4] == "-" and value[10] == " ":
+        # Already in storage format: validate without re-formatting
+        datetime.fromisoformat(value)
+        return value
+    return parse_event_date(value).strftime(DATE_FORMAT)
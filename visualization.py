@@ -1,19 +1,95 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from collection_report import draw_charts
+
+
+class CactusRenderer:
+    """Retained-mode cactus drawing: canvas items are created once and moved with coords"""
+
+    BASE_Y = 300  # Bottom of Canvas
+    POT_HEIGHT = 50
+    SPINE_STEP = 20
+    MAX_HEIGHT = 250
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        canvas.delete("all")
+        base_y = self.BASE_Y
+        canvas.create_rectangle(80, base_y - self.POT_HEIGHT, 120, base_y, fill="brown", outline="black")
+        self.body = canvas.create_rectangle(90, base_y - self.POT_HEIGHT, 110, base_y - self.POT_HEIGHT,
+                                            outline="black", tags="cactus")
+        # Enough spine pairs for the tallest cactus; unused ones stay hidden
+        self.spines = []
+        for _ in range((self.MAX_HEIGHT - self.POT_HEIGHT) // self.SPINE_STEP + 1):
+            left = canvas.create_line(0, 0, 0, 0, fill="black", state="hidden", tags="spine")
+            right = canvas.create_line(0, 0, 0, 0, fill="black", state="hidden", tags="spine")
+            self.spines.append((left, right))
+
+    def draw(self, height, color=None):
+        """Move the body and spines to show the cactus at the given pixel height"""
+        canvas = self.canvas
+        top = self.BASE_Y - height
+        bottom = self.BASE_Y - self.POT_HEIGHT
+        if color is not None:
+            canvas.itemconfigure(self.body, fill=color)
+        canvas.coords(self.body, 90, top, 110, bottom)
+        rows = range(int(top), int(bottom), self.SPINE_STEP)
+        for i, (left, right) in enumerate(self.spines):
+            if i < len(rows):
+                y = rows[i]
+                canvas.coords(left, 90, y, 85, y)
+                canvas.coords(right, 110, y, 115, y)
+                canvas.itemconfigure(left, state="normal")
+                canvas.itemconfigure(right, state="normal")
+            else:
+                canvas.itemconfigure(left, state="hidden")
+                canvas.itemconfigure(right, state="hidden")
 
 
 class VisualizationManager:
+    ANIMATION_STEPS = 20
+    ANIMATION_DELAY = 50  # ms between steps
+
     def __init__(self, app):
         self.app = app
         self.data_manager = app.data_manager
+        self._renderers = {}
+        self._animation_id = None
+
+    def get_renderer(self, canvas):
+        """Return the renderer bound to a canvas, creating its items on first use"""
+        key = str(canvas)
+        renderer = self._renderers.get(key)
+        if renderer is None or renderer.canvas is not canvas:
+            renderer = CactusRenderer(canvas)
+            self._renderers[key] = renderer
+            canvas.bind("<Destroy>", lambda e, k=key: self._renderers.pop(k, None), add="+")
+        return renderer
+
+    def cancel_animation(self):
+        """Cancel a pending animation step, if any"""
+        if self._animation_id is not None:
+            try:
+                self.app.root.after_cancel(self._animation_id)
+            except Exception:
+                pass
+            self._animation_id = None
+
+    def is_window_visible(self, widget):
+        """False when the widget's window is minimized or withdrawn"""
+        try:
+            return widget.winfo_toplevel().state() not in ("iconic", "withdrawn")
+        except Exception:
+            return False
 
     def animate_cactus(self, cactus_name, canvas):
         """Animate cactus growth"""
+        self.cancel_animation()
         cactus_data = self.data_manager.data["cactuses"][cactus_name]
-        canvas.delete("all")
+        renderer = self.get_renderer(canvas)
 
         # Determine cactus height
         max_height = max([g["height"] for g in cactus_data["growth"]]) if cactus_data["growth"] else 5
@@ -22,26 +98,27 @@ class VisualizationManager:
         color = self.get_cactus_color(cactus_data)
 
         # Scale height for Canvas
-        cactus_height = min(max_height * 10, 250)  # 1 cm = 10 pixels, max 250
-        base_y = 300  # Bottom of Canvas
-
-        # Draw pot
-        canvas.create_rectangle(80, base_y - 50, 120, base_y, fill="brown", outline="black")
+        cactus_height = min(max_height * 10, CactusRenderer.MAX_HEIGHT)  # 1 cm = 10 pixels, max 250
 
         # Initial cactus position
         current_height = 50
 
+        renderer.draw(current_height, color)
+        if not self.is_window_visible(canvas):
+            # Nobody sees the animation; show the final frame only
+            renderer.draw(cactus_height)
+            return
+
         def grow(step=0):
-            if step <= 20:  # 20 animation steps
-                canvas.delete("cactus")
-                height = current_height + (cactus_height - current_height) * step / 20
-                canvas.create_rectangle(90, base_y - height, 110, base_y - 50,
-                                        fill=color, outline="black", tags="cactus")
-                # Add spines
-                for y in range(int(base_y - height), int(base_y - 50), 20):
-                    canvas.create_line(90, y, 85, y, fill="black")
-                    canvas.create_line(110, y, 115, y, fill="black")
-                self.app.root.after(50, grow, step + 1)
+            self._animation_id = None
+            if not canvas.winfo_exists():
+                return
+            if step <= self.ANIMATION_STEPS and self.is_window_visible(canvas):
+                height = current_height + (cactus_height - current_height) * step / self.ANIMATION_STEPS
+                renderer.draw(height)
+                self._animation_id = self.app.root.after(self.ANIMATION_DELAY, grow, step + 1)
+            else:
+                renderer.draw(cactus_height)
 
         grow()
 
@@ -67,44 +144,18 @@ class VisualizationManager:
         health_indicator.create_oval(2, 2, 18, 18, fill=color, outline="black")
 
     def show_graphs(self, cactus_name):
-        """Display growth and watering graphs"""
-        cactus_data = self.data_manager.data["cactuses"][cactus_name]
+        """Display growth and watering graphs from the per-period rollups"""
+        self.data_manager.archive.ensure_loaded()  # Graphs span the whole history
+        rollups = self.data_manager.rollups
+        period = rollups.period_for_span(cactus_name)
+        series = rollups.series(cactus_name, period)
 
         window = tk.Toplevel(self.app.root)
         window.title(f"Графики для {cactus_name}")
         window.geometry("800x600")
 
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(8, 6))
-
-        if cactus_data["growth"]:
-            dates = [datetime.strptime(g["date"], "%Y-%m-%d %H:%M") for g in cactus_data["growth"]]
-            heights = [g["height"] for g in cactus_data["growth"]]
-            ax1.plot(dates, heights, marker="o", color="green", label="Рост (см)")
-            ax1.set_title("Динамика роста")
-            ax1.set_xlabel("Дата")
-            ax1.set_ylabel("Высота (см)")
-            ax1.legend()
-            ax1.grid(True)
-            plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45)
-        else:
-            ax1.text(0.5, 0.5, "Нет данных о росте", horizontalalignment="center", verticalalignment="center")
-            ax1.set_title("Динамика роста")
-
-        if cactus_data["watering"]:
-            dates = [datetime.strptime(w["date"], "%Y-%m-%d %H:%M") for w in cactus_data["watering"]]
-            watering_counts = [1] * len(dates)
-            ax2.bar(dates, watering_counts, color="blue", label="Поливы")
-            ax2.set_title("Частота полива")
-            ax2.set_xlabel("Дата")
-            ax2.set_ylabel("Количество поливов")
-            ax2.legend()
-            ax2.grid(True)
-            plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45)
-        else:
-            ax2.text(0.5, 0.5, "Нет данных о поливах", horizontalalignment="center", verticalalignment="center")
-            ax2.set_title("Частота полива")
-
-        plt.tight_layout()
+        fig = Figure(figsize=(8, 6))
+        draw_charts(fig, series, period)
 
         canvas = FigureCanvasTkAgg(fig, master=window)
         canvas.draw()
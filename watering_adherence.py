@@ -0,0 +1,153 @@
+from datetime import datetime
+from compact_model import CompactEventList, EPOCH, date_to_minutes
+
+MINUTES_PER_DAY = 1440
+
+
+class WateringAdherence:
+    """Regularity of watering from full interval histories against the seasonal targets
+
+    An interval is late when it lasts more than its target + GRACE_DAYS whole days (the same
+    rule the stable-watering achievement always used) and early when it is shorter than
+    EARLY_RATIO of the target. The target of an interval is the seasonal frequency on the
+    day it started, as DataManager.get_seasonal_watering_frequency computes it.
+    """
+
+    GRACE_DAYS = 1
+    EARLY_RATIO = 0.5
+
+    def __init__(self, data_manager, species_db):
+        self.data_manager = data_manager
+        self.species_db = species_db
+
+    def _watering_minutes(self, events):
+        if isinstance(events, CompactEventList):
+            return events.dates
+        return [date_to_minutes(event["date"]) for event in events]
+
+    def _history(self, name, cactus_data, full):
+        """Watering times of a cactus in minutes; without full, from its last archived watering on"""
+        minutes = self._watering_minutes(cactus_data["watering"])
+        if not full:
+            last = self.data_manager.archive.last_archived(name, "watering")
+            # The hot list already starts with it if the archive was read in the meantime
+            if last and (not len(minutes) or date_to_minutes(last) < minutes[0]):
+                minutes = [date_to_minutes(last), *minutes]
+        return minutes
+
+    def analyze(self, now=None, full=True):
+        """Analyze every cactus in one vectorized pass
+
+        Returns (per-cactus stats, collection stats). Per cactus: waterings, mean and variance
+        of intervals in days, late (missed) and early waterings, longest on-time streak in days,
+        the current streak and whether watering is overdue now. The collection stats give the
+        current and longest run of days during which no plant was overdue.
+
+        With full=False the archive is not read: each history is its hot window preceded by
+        its last archived watering, so overdue states and the intervals since the cutoff are
+        exact, while counts and streaks only cover that span.
+        """
+        import numpy as np
+
+        if full:
+            self.data_manager.archive.ensure_loaded()  # Streaks and intervals span the whole history
+        now = now or datetime.now()
+        now_minutes = int((now - EPOCH).total_seconds()) // 60
+        cactuses = self.data_manager.data["cactuses"]
+        histories = {name: self._history(name, cactus_data, full) for name, cactus_data in cactuses.items()}
+        names = [name for name, minutes in histories.items() if len(minutes)]
+        per_cactus = {name: {"waterings": 0, "intervals": 0, "mean_interval": None, "interval_variance": None,
+                             "missed": 0, "early": 0, "longest_streak": 0, "current_streak": 0, "overdue": False}
+                      for name in cactuses}
+        collection = {"current_streak": 0, "longest_streak": 0, "overdue_cactuses": []}
+        if not names:
+            return per_cactus, collection
+
+        plants = len(names)
+        counts = np.array([len(histories[name]) for name in names], dtype=np.int64)
+        bases = np.array([self.data_manager.get_base_watering_frequency(name, self.species_db) for name in names],
+                         dtype=np.float64)
+        minutes = np.concatenate([np.asarray(histories[name], dtype=np.int64) for name in names])
+        group = np.repeat(np.arange(plants), counts)
+        model = self.data_manager.season_model
+        factor_by_month = np.array([model.factors[model.month_seasons[month]] for month in range(1, 13)])
+
+        def targets(start_minutes, plant):
+            months = (start_minutes // MINUTES_PER_DAY).astype("datetime64[D]").astype("datetime64[M]")
+            factors = factor_by_month[months.astype(np.int64) % 12]
+            return np.maximum(1, (bases[plant] * factors).astype(np.int64))
+
+        # Closed intervals between consecutive waterings of the same plant
+        same_plant = group[1:] == group[:-1]
+        starts = minutes[:-1][same_plant]
+        lengths = (minutes[1:] - minutes[:-1])[same_plant]
+        owner = group[1:][same_plant]
+        target = targets(starts, owner)
+        days = lengths / MINUTES_PER_DAY
+        late = lengths // MINUTES_PER_DAY > target + self.GRACE_DAYS
+        early = days < target * self.EARLY_RATIO
+
+        intervals = np.bincount(owner, minlength=plants)
+        total = np.bincount(owner, days, plants)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / intervals
+            variance = np.bincount(owner, days * days, plants) / intervals - mean * mean
+
+        # Open interval from each plant's last watering until now
+        last = minutes[np.cumsum(counts) - 1]
+        open_target = targets(last, np.arange(plants))
+        open_days = np.maximum(now_minutes - last, 0) / MINUTES_PER_DAY
+        overdue_now = (now_minutes - last) // MINUTES_PER_DAY > open_target + self.GRACE_DAYS
+
+        # Streaks: runs of on-time intervals; a late interval starts a new run
+        run = np.cumsum(late)
+        run_key = owner * (len(lengths) + 1) + run
+        unique_runs, run_index = np.unique(run_key, return_inverse=True)
+        run_days = np.bincount(run_index, np.where(late, 0.0, days), len(unique_runs))
+        longest = np.zeros(plants)
+        np.maximum.at(longest, unique_runs // (len(lengths) + 1), run_days)
+        # Current run: on-time days since the last late interval, plus the open interval if still on time
+        tail = np.zeros(plants)
+        last_run = np.full(plants, -1)
+        np.maximum.at(last_run, owner, run)
+        in_tail = run == last_run[owner]
+        np.add.at(tail, owner[in_tail], np.where(late, 0.0, days)[in_tail])
+        current = np.where(overdue_now, 0.0, tail + open_days)
+        longest = np.maximum(longest, current)
+
+        missed = np.bincount(owner, late, plants).astype(np.int64) + overdue_now
+        early_count = np.bincount(owner, early, plants).astype(np.int64)
+        for i, name in enumerate(names):
+            per_cactus[name] = {
+                "waterings": int(counts[i]),
+                "intervals": int(intervals[i]),
+                "mean_interval": float(mean[i]) if intervals[i] else None,
+                "interval_variance": float(max(variance[i], 0.0)) if intervals[i] else None,
+                "missed": int(missed[i]),
+                "early": int(early_count[i]),
+                "longest_streak": int(longest[i]),
+                "current_streak": int(current[i]),
+                "overdue": bool(overdue_now[i])
+            }
+
+        # Collection: days on which no plant was overdue, from the first recorded watering until now.
+        # A plant counts as overdue from the first day its interval exceeds target + grace.
+        grace_minutes = (target + self.GRACE_DAYS + 1) * MINUTES_PER_DAY
+        overdue_start = np.concatenate([(starts + grace_minutes)[late],
+                                        (last + (open_target + self.GRACE_DAYS + 1) * MINUTES_PER_DAY)[overdue_now]])
+        overdue_end = np.concatenate([(starts + lengths)[late], np.full(int(overdue_now.sum()), now_minutes)])
+        begin = int(minutes.min())
+        if len(overdue_start):
+            order = np.argsort(overdue_start)
+            overdue_start, overdue_end = overdue_start[order], np.maximum.accumulate(overdue_end[order])
+            # Clean stretches lie between one overdue period and the next, overlaps count as none
+            clean = np.concatenate([[overdue_start[0] - begin], overdue_start[1:] - overdue_end[:-1],
+                                    [now_minutes - overdue_end[-1]]])
+            current_minutes = 0 if overdue_now.any() else now_minutes - int(overdue_end[-1])
+            longest_minutes = int(clean.max())
+        else:
+            current_minutes = longest_minutes = now_minutes - begin
+        collection["current_streak"] = max(current_minutes, 0) // MINUTES_PER_DAY
+        collection["longest_streak"] = max(longest_minutes, 0) // MINUTES_PER_DAY
+        collection["overdue_cactuses"] = [name for i, name in enumerate(names) if overdue_now[i]]
+        return per_cactus, collection
@@ -0,0 +1,146 @@
+from datetime import datetime, date, timedelta
+from utils import DATE_FORMAT
+
+
+class SeasonModel:
+    """Map calendar months to seasons and seasons to watering interval factors"""
+
+    NORTHERN_MONTHS = {12: "winter", 1: "winter", 2: "winter", 3: "spring", 4: "spring", 5: "spring",
+                       6: "summer", 7: "summer", 8: "summer", 9: "autumn", 10: "autumn", 11: "autumn"}
+    DEFAULT_FACTORS = {"winter": 1.5, "spring": 1.0, "summer": 0.7, "autumn": 1.0}
+
+    def __init__(self, hemisphere="north", month_seasons=None, factors=None,
+                 fertilizer_seasons=("spring", "summer"), fertilizer_interval=30):
+        month_seasons = dict(month_seasons or self.NORTHERN_MONTHS)
+        if hemisphere == "south":
+            month_seasons = {(month + 5) % 12 + 1: season for month, season in month_seasons.items()}
+        self.hemisphere = hemisphere
+        self.month_seasons = month_seasons
+        self.factors = dict(factors or self.DEFAULT_FACTORS)
+        self.fertilizer_seasons = set(fertilizer_seasons)
+        self.fertilizer_interval = fertilizer_interval
+
+    def season_for(self, day):
+        return self.month_seasons[day.month]
+
+    def watering_interval(self, base_frequency, day):
+        """Watering interval in days for a plant with the given base frequency on a given day"""
+        return max(1, int(base_frequency * self.factors[self.season_for(day)]))
+
+    def next_fertilizer_day(self, day, limit_days=366):
+        """First day on or after day that falls in a fertilizer season"""
+        for offset in range(limit_days):
+            candidate = day + timedelta(days=offset)
+            if self.season_for(candidate) in self.fertilizer_seasons:
+                return candidate
+        return None
+
+    def signature(self):
+        return (tuple(sorted(self.month_seasons.items())), tuple(sorted(self.factors.items())),
+                tuple(sorted(self.fertilizer_seasons)), self.fertilizer_interval)
+
+
+class WateringCalendar:
+    """Project upcoming waterings and fertilizer windows per cactus, cached until the plant changes"""
+
+    def __init__(self, data_manager, species_db, season_model=None, horizon=6):
+        self.data_manager = data_manager
+        self.species_db = species_db
+        self.season_model = season_model or data_manager.season_model
+        self.horizon = horizon
+        self._cache = {}
+
+    def _signature(self, cactus_data, base_frequency, today):
+        watering = cactus_data["watering"]
+        fertilizers = cactus_data["fertilizers"]
+        return (
+            watering[-1]["date"] if watering else None,
+            fertilizers[-1]["date"] if fertilizers else None,
+            base_frequency,
+            today,
+            self.horizon,
+            self.season_model.signature()
+        )
+
+    def project(self, cactus_name, today=None, until=None):
+        """Return {"watering": [dates], "fertilizer": [dates]} for the next horizon events
+
+        If until is given, the projection also extends at least up to that date.
+        """
+        today = today or date.today()
+        until = until or today
+        cactus_data = self.data_manager.cactus_summary(cactus_name)
+        base_frequency = self.data_manager.get_base_watering_frequency(cactus_name, self.species_db)
+        signature = self._signature(cactus_data, base_frequency, today)
+        cached = self._cache.get(cactus_name)
+        if cached and cached[0] == signature and cached[1] >= until:
+            return cached[2]
+        projection = self._compute(cactus_data, base_frequency, today, until)
+        self._cache[cactus_name] = (signature, until, projection)
+        return projection
+
+    def _compute(self, cactus_data, base_frequency, today, until):
+        model = self.season_model
+
+        waterings = []
+        if cactus_data["watering"]:
+            current = datetime.strptime(cactus_data["watering"][-1]["date"], DATE_FORMAT).date()
+            current += timedelta(days=model.watering_interval(base_frequency, current))
+        else:
+            current = today
+        # Overdue plants are due today; the schedule continues from there
+        current = max(current, today)
+        while len(waterings) < self.horizon or current <= until:
+            waterings.append(current)
+            current += timedelta(days=model.watering_interval(base_frequency, current))
+
+        fertilizers = []
+        if cactus_data["fertilizers"]:
+            current = datetime.strptime(cactus_data["fertilizers"][-1]["date"], DATE_FORMAT).date()
+            current += timedelta(days=model.fertilizer_interval)
+        else:
+            current = today
+        current = max(current, today)
+        while len(fertilizers) < self.horizon or current <= until:
+            current = model.next_fertilizer_day(current)
+            if current is None:
+                break
+            fertilizers.append(current)
+            current += timedelta(days=model.fertilizer_interval)
+
+        return {"watering": waterings, "fertilizer": fertilizers}
+
+    def invalidate(self, cactus_name=None):
+        """Drop cached projections for one cactus or for all of them"""
+        if cactus_name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(cactus_name, None)
+
+    def agenda(self, start, end, today=None):
+        """Return {date: [(cactus name, "watering" | "fertilizer")]} for start <= date <= end"""
+        days = {}
+        cactuses = self.data_manager.data["cactuses"]
+        for name in list(self._cache):
+            if name not in cactuses:
+                del self._cache[name]
+        for name in cactuses:
+            projection = self.project(name, today, end)
+            for kind in ("watering", "fertilizer"):
+                for day in projection[kind]:
+                    if day > end:
+                        break
+                    if day >= start:
+                        days.setdefault(day, []).append((name, kind))
+        return dict(sorted(days.items()))
+
+    def week_agenda(self, day=None):
+        day = day or date.today()
+        start = day - timedelta(days=day.weekday())
+        return self.agenda(start, start + timedelta(days=6))
+
+    def month_agenda(self, day=None):
+        day = day or date.today()
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return self.agenda(start, next_month - timedelta(days=1))